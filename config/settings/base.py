@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'two_factor.plugins.email',
     'two_factor.plugins.yubikey', 
     'simple_history',
+    'ninja',
     
     # Local apps
     'theme',
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'quick_catch.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -145,6 +147,19 @@ DATABASES = {
     }
 }
 
+# User change history older than this is removed by `manage.py prune_user_history` (latest row per user kept)
+USER_HISTORY_RETENTION_DAYS = int(os.environ.get('USER_HISTORY_RETENTION_DAYS', '365'))
+
+# Cloudflare Turnstile (login/registration CAPTCHA; disabled unless both keys are set).
+# Verification waits at most TURNSTILE_TIMEOUT seconds; on timeout/outage the policy decides:
+# 'closed' rejects the form, 'open' lets it through.
+TURNSTILE_SITE_KEY = os.environ.get('TURNSTILE_SITE_KEY', '')
+TURNSTILE_SECRET_KEY = os.environ.get('TURNSTILE_SECRET_KEY', '')
+TURNSTILE_TIMEOUT = float(os.environ.get('TURNSTILE_TIMEOUT', '2.0'))
+TURNSTILE_FAILURE_POLICY = os.environ.get('TURNSTILE_FAILURE_POLICY', 'closed')
+TURNSTILE_CACHE_SECONDS = int(os.environ.get('TURNSTILE_CACHE_SECONDS', '300'))
+TURNSTILE_VERIFIER = os.environ.get('TURNSTILE_VERIFIER', 'users.turnstile.TurnstileVerifier')
+
 # Email configuration
 EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = os.environ.get('EMAIL_HOST', '')
@@ -185,3 +200,77 @@ OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL')
 OLLAMA_TIMEOUT = int(os.environ.get('OLLAMA_TIMEOUT', '300'))
 # Optional: Bearer token for hosted Ollama (leave unset for local)
 OLLAMA_API_KEY = os.environ.get('OLLAMA_API_KEY')
+# num_ctx sizes triage requests are rounded up to (few distinct sizes = fewer model reloads)
+QUICK_CATCH_NUM_CTX_BUCKETS = tuple(
+    int(size) for size in os.environ.get('QUICK_CATCH_NUM_CTX_BUCKETS', '4096,8192,16384,32768').split(',') if size.strip()
+)
+
+# Triage prompt A/B split: "version:weight,..." over quick_catch.prompts.PROMPTS (default: all v1).
+# Users are assigned deterministically; change the salt to reshuffle assignments.
+QUICK_CATCH_PROMPT_WEIGHTS = {
+    version.strip(): int(weight)
+    for version, _, weight in (
+        item.partition(':') for item in os.environ.get('QUICK_CATCH_PROMPT_WEIGHTS', 'v1:100').split(',') if item.strip()
+    )
+}
+QUICK_CATCH_PROMPT_SPLIT_SALT = os.environ.get('QUICK_CATCH_PROMPT_SPLIT_SALT', '')
+# Collapse whitespace, dedupe lines and elide URLs/quoted threads before building the prompt
+QUICK_CATCH_COMPRESS_INPUT = os.environ.get('QUICK_CATCH_COMPRESS_INPUT', 'true').lower() in ('true', '1', 'yes')
+# Local category/duration classifier (written by train_task_classifier; ignored if the file is missing).
+# Predictions below the per-field confidence fall back to the model's value or the rule-based scores.
+QUICK_CATCH_CLASSIFIER_PATH = os.environ.get('QUICK_CATCH_CLASSIFIER_PATH', str(BASE_DIR / 'var' / 'task_classifier.npz'))
+QUICK_CATCH_CLASSIFIER_MIN_CONFIDENCE = {
+    'category': float(os.environ.get('QUICK_CATCH_CLASSIFIER_MIN_CATEGORY_CONFIDENCE', '0.6')),
+    'estimated_minutes': float(os.environ.get('QUICK_CATCH_CLASSIFIER_MIN_MINUTES_CONFIDENCE', '0.5')),
+}
+
+# Quick Catch triage queue (bulk/API ingestion, processed by run_triage_worker)
+QUICK_CATCH_BULK_MAX_DUMPS = int(os.environ.get('QUICK_CATCH_BULK_MAX_DUMPS', '100'))
+QUICK_CATCH_JOB_MAX_ATTEMPTS = int(os.environ.get('QUICK_CATCH_JOB_MAX_ATTEMPTS', '3'))
+# A claimed job still running after this long is presumed orphaned (worker crash) and claimed again;
+# keep it above OLLAMA_TIMEOUT. Failed attempts are retried after QUICK_CATCH_JOB_RETRY_SECONDS * 2^(n-1).
+QUICK_CATCH_JOB_LEASE_SECONDS = int(os.environ.get('QUICK_CATCH_JOB_LEASE_SECONDS', '900'))
+QUICK_CATCH_JOB_RETRY_SECONDS = int(os.environ.get('QUICK_CATCH_JOB_RETRY_SECONDS', '30'))
+# Pack up to N short bulk-lane dumps into one model call (1 disables packing)
+QUICK_CATCH_BATCH_MAX_DUMPS = int(os.environ.get('QUICK_CATCH_BATCH_MAX_DUMPS', '6'))
+QUICK_CATCH_BATCH_MAX_TOKENS = int(os.environ.get('QUICK_CATCH_BATCH_MAX_TOKENS', '2000'))
+QUICK_CATCH_BATCH_MAX_DUMP_TOKENS = int(os.environ.get('QUICK_CATCH_BATCH_MAX_DUMP_TOKENS', '400'))
+
+# Server-Timing header with per-request query count and DB time (always sent to staff users)
+QUICK_CATCH_SERVER_TIMING = os.environ.get('QUICK_CATCH_SERVER_TIMING', str(DEBUG)).lower() in ('true', '1', 'yes')
+
+# Prometheus metrics at /metrics (bearer token or staff session). Set a metrics dir
+# shared by all worker processes so the endpoint aggregates every worker.
+QUICK_CATCH_METRICS_TOKEN = os.environ.get('QUICK_CATCH_METRICS_TOKEN')
+QUICK_CATCH_METRICS_DIR = os.environ.get('QUICK_CATCH_METRICS_DIR')
+
+# Email outbox (drained by send_queued_emails; run more instances for more throughput).
+# Batch size = emails per claim and per SMTP connection; lease = seconds a claimed batch is hidden from other workers.
+QUICK_CATCH_EMAIL_BATCH_SIZE = int(os.environ.get('QUICK_CATCH_EMAIL_BATCH_SIZE', '50'))
+QUICK_CATCH_EMAIL_MAX_PER_SECOND = float(os.environ.get('QUICK_CATCH_EMAIL_MAX_PER_SECOND', '0'))
+QUICK_CATCH_EMAIL_LEASE_SECONDS = int(os.environ.get('QUICK_CATCH_EMAIL_LEASE_SECONDS', '300'))
+QUICK_CATCH_EMAIL_MAX_ATTEMPTS = int(os.environ.get('QUICK_CATCH_EMAIL_MAX_ATTEMPTS', '5'))
+QUICK_CATCH_EMAIL_RETRY_SECONDS = int(os.environ.get('QUICK_CATCH_EMAIL_RETRY_SECONDS', '60'))
+# Backend the dispatcher delivers with when EMAIL_BACKEND is quick_catch.emails.OutboxEmailBackend
+QUICK_CATCH_EMAIL_DELIVERY_BACKEND = os.environ.get('QUICK_CATCH_EMAIL_DELIVERY_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+# Daily digest (queue_daily_digests, hourly): local send hour and how far back runs are included
+QUICK_CATCH_DIGEST_HOUR = int(os.environ.get('QUICK_CATCH_DIGEST_HOUR', '7'))
+QUICK_CATCH_DIGEST_LOOKBACK_DAYS = int(os.environ.get('QUICK_CATCH_DIGEST_LOOKBACK_DAYS', '7'))
+
+# Cached per-user lookups (quick_catch.caching): shared-cache TTL and per-process LRU TTL
+QUICK_CATCH_CACHE_SECONDS = int(os.environ.get('QUICK_CATCH_CACHE_SECONDS', '300'))
+QUICK_CATCH_LOCAL_CACHE_SECONDS = float(os.environ.get('QUICK_CATCH_LOCAL_CACHE_SECONDS', '5'))
+
+# Redis open-tasks queue (quick_catch.task_queue): rebuilt from the database at least this often
+QUICK_CATCH_TASK_QUEUE_SECONDS = int(os.environ.get('QUICK_CATCH_TASK_QUEUE_SECONDS', '86400'))
+
+# Admin changelists (quick_catch.admin_tools): on PostgreSQL, results the planner estimates above
+# this many rows show the estimate instead of running COUNT(*)
+QUICK_CATCH_ADMIN_EXACT_COUNT_LIMIT = int(os.environ.get('QUICK_CATCH_ADMIN_EXACT_COUNT_LIMIT', '10000'))
+
+# Cold-start budget checked by `manage.py startup_profile` (median ms to import config.wsgi and load the URLconf)
+QUICK_CATCH_BOOT_BUDGET_MS = float(os.environ.get('QUICK_CATCH_BOOT_BUDGET_MS', '1500'))
+
+# Mobile delta sync (/api/sync)
+QUICK_CATCH_SYNC_PAGE_SIZE = int(os.environ.get('QUICK_CATCH_SYNC_PAGE_SIZE', '500'))
+QUICK_CATCH_SYNC_TOMBSTONE_DAYS = int(os.environ.get('QUICK_CATCH_SYNC_TOMBSTONE_DAYS', '30'))
@@ -15,10 +15,25 @@ SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 SECURE_HSTS_PRELOAD = True
 
 # Static files configuration for production
-STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+# collectstatic writes content-hashed copies (styles.3f2a1b9c0d4e.css) plus .gz and .br variants;
+# WhiteNoise serves the smallest variant the client accepts, and hashed files get
+# `Cache-Control: max-age=315360000, public, immutable` (a new build means a new URL).
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+# Unhashed files (e.g. favicon.ico at a fixed URL) are only cached briefly
+WHITENOISE_MAX_AGE = int(os.environ.get('WHITENOISE_MAX_AGE', '3600'))
 
-# Add whitenoise for static file serving (if using)
-MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+# WhiteNoise serves /static/ straight from STATIC_ROOT, right after the security middleware
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+)
 
 # Production database configuration (expects environment variables)
 DATABASES = {
@@ -36,7 +51,10 @@ DATABASES = {
 }
 
 # Email configuration for production
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# All mail to registered users (magic links, 2FA tokens) goes to the outbox table and is
+# delivered over SMTP by `manage.py send_queued_emails` (run e.g. one `--kind auth` worker too).
+EMAIL_BACKEND = 'quick_catch.emails.OutboxEmailBackend'
+QUICK_CATCH_EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST')
 EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
 EMAIL_USE_TLS = True
@@ -102,6 +120,9 @@ LOGGING = {
     },
 }
 
+# Per-process metrics snapshots, merged by /metrics across gunicorn workers
+QUICK_CATCH_METRICS_DIR = os.environ.get('QUICK_CATCH_METRICS_DIR', str(BASE_DIR / 'metrics'))
+
 # Create logs directory if it doesn't exist
 import os
 logs_dir = BASE_DIR / 'logs'
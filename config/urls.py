@@ -5,6 +5,8 @@ from django.shortcuts import render
 from two_factor.admin import AdminSiteOTPRequiredMixin
 from two_factor.urls import urlpatterns as tf_urls
 from unfold.sites import UnfoldAdminSite
+from quick_catch.api import api as quick_catch_api
+from quick_catch.views import metrics_view
 
 
 class OTPRequiredUnfoldAdminSite(AdminSiteOTPRequiredMixin, UnfoldAdminSite):
@@ -23,6 +25,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('users/', include('users.urls')),
     path('catch/', include('quick_catch.urls')),
+    path('api/', quick_catch_api.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('', include(tf_urls)),
 ]
 
@@ -1,7 +1,18 @@
 from django.contrib import admin
-from unfold.admin import ModelAdmin
+from django.shortcuts import redirect
+from django.urls import path
+from django.utils.html import format_html, format_html_join
+from django.views.generic import TemplateView
+from unfold.admin import ModelAdmin, TabularInline
+from unfold.decorators import action
+from unfold.views import UnfoldModelAdminViewMixin
 
-from .models import BrainDump, Email, Profile, TriageRun, TriageTask
+from .admin_tools import LargeTableAdmin, RecentValuesFieldListFilter
+from .models import BrainDump, Email, Profile, TriageJob, TriageRun, TriageRunHourlyStats, TriageTask
+from .stats import REPORT_GROUPS, performance_report, report_window
+
+
+REPORT_WINDOWS_DAYS = (1, 7, 30, 90)
 
 
 @admin.register(Profile)
@@ -11,60 +22,169 @@ class ProfileAdmin(ModelAdmin):
     search_fields = ("user__email", "user__first_name", "user__last_name")
     readonly_fields = ("created_at", "updated_at")
     autocomplete_fields = ("user",)
+    list_select_related = ("user",)
 
 
 @admin.register(BrainDump)
-class BrainDumpAdmin(ModelAdmin):
+class BrainDumpAdmin(LargeTableAdmin):
     list_display = ("id", "user", "energy_level", "source", "word_count", "created_at")
     list_filter = ("energy_level", "source", "created_at")
     search_fields = ("user__email", "input_text")
+    text_search_fields = ("input_text",)
     readonly_fields = ("id", "word_count", "created_at")
     autocomplete_fields = ("user",)
-    date_hierarchy = "created_at"
+    list_select_related = ("user",)
 
 
-class TriageTaskInline(admin.TabularInline):
+class TriageTaskInline(TabularInline):
     model = TriageTask
     extra = 0
+    per_page = 20
     readonly_fields = ("id", "created_at")
     fields = ("title", "rank_order", "is_top3", "best_energy", "estimated_minutes", "category")
     show_change_link = True
 
 
-class EmailInline(admin.TabularInline):
+class EmailInline(TabularInline):
     model = Email
     extra = 0
+    per_page = 10
     readonly_fields = ("id", "created_at", "send_after")
     fields = ("to_email", "subject", "status", "send_after", "provider_message_id", "error_message")
     show_change_link = True
 
 
+class TriagePerformanceView(UnfoldModelAdminViewMixin, TemplateView):
+    """Latency percentiles, parse failures and throughput from hourly stats buckets."""
+
+    title = "Triage performance"
+    permission_required = ("quick_catch.view_triagerun",)
+    template_name = "admin/quick_catch/triagerun/performance.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        params = self.request.GET
+        try:
+            days = int(params.get("days", 7))
+        except ValueError:
+            days = 7
+        if days not in REPORT_WINDOWS_DAYS:
+            days = 7
+        group_by = tuple(g for g in params.getlist("group") if g in REPORT_GROUPS)
+        group_by = group_by or ("model_name", "prompt_version")
+        model_name = params.get("model_name") or None
+        prompt_version = params.get("prompt_version") or None
+        context.update({
+            "rows": performance_report(
+                report_window(days),
+                group_by=group_by,
+                model_name=model_name,
+                prompt_version=prompt_version,
+            ),
+            "days": days,
+            "windows": REPORT_WINDOWS_DAYS,
+            "group_by": group_by,
+            "groups": REPORT_GROUPS,
+            "model_name": model_name or "",
+            "prompt_version": prompt_version or "",
+            "model_names": TriageRunHourlyStats.objects.order_by().values_list("model_name", flat=True).distinct(),
+            "prompt_versions": TriageRunHourlyStats.objects.order_by().values_list("prompt_version", flat=True).distinct(),
+        })
+        return context
+
+
 @admin.register(TriageRun)
-class TriageRunAdmin(ModelAdmin):
+class TriageRunAdmin(LargeTableAdmin):
     list_display = ("id", "dump", "user", "model_name", "prompt_version", "detected_crisis", "created_at")
-    list_filter = ("prompt_version", "detected_crisis", "created_at")
+    list_filter = (
+        ("prompt_version", RecentValuesFieldListFilter),
+        ("num_ctx", RecentValuesFieldListFilter),
+        "detected_crisis",
+        "created_at",
+    )
     search_fields = ("user__email", "summary_one_liner", "action_plan_md")
-    readonly_fields = ("id", "created_at", "latency_ms", "token_in", "token_out")
+    text_search_fields = ("summary_one_liner", "action_plan_md")
+    readonly_fields = (
+        "id", "created_at", "parse_failed", "latency_ms", "token_in", "token_out",
+        "num_ctx", "prompt_tokens_saved", "trace_waterfall",
+    )
+    exclude = ("trace",)
     autocomplete_fields = ("dump", "user")
-    date_hierarchy = "created_at"
+    list_select_related = ("dump", "user")
     inlines = (TriageTaskInline, EmailInline)
+    actions_list = ("open_performance_report",)
+
+    @action(description="Performance report", url_path="open-performance-report")
+    def open_performance_report(self, request):
+        return redirect("admin:quick_catch_triagerun_performance")
+
+    @admin.display(description="Trace")
+    def trace_waterfall(self, obj):
+        if not obj.trace:
+            return "-"
+        origin = min(start for _, start, _, _ in obj.trace)
+        total = max(start + dur for _, start, dur, _ in obj.trace) - origin or 1
+        rows = format_html_join(
+            "",
+            '<div style="display:flex;align-items:center;gap:8px;font-size:12px;line-height:20px">'
+            '<span style="width:140px;padding-left:{}px">{}</span>'
+            '<span style="flex:1;position:relative;height:12px">'
+            '<span style="position:absolute;left:{}%;width:{}%;min-width:2px;height:12px;background:#6366f1;border-radius:2px"></span>'
+            '</span><span style="width:80px;text-align:right">{} ms</span></div>',
+            (
+                (depth * 12, name, f"{(start - origin) / total * 100:.2f}", f"{dur / total * 100:.2f}", f"{dur:.1f}")
+                for name, start, dur, depth in obj.trace
+            ),
+        )
+        return format_html('<div style="min-width:480px">{}</div>', rows)
+
+    def get_urls(self):
+        performance_view = self.admin_site.admin_view(
+            TriagePerformanceView.as_view(model_admin=self)
+        )
+        return [
+            path("performance/", performance_view, name="quick_catch_triagerun_performance"),
+        ] + super().get_urls()
 
 
 @admin.register(TriageTask)
-class TriageTaskAdmin(ModelAdmin):
+class TriageTaskAdmin(LargeTableAdmin):
     list_display = ("title", "triage_run", "user", "rank_order", "is_top3", "best_energy", "category", "created_at")
-    list_filter = ("is_top3", "best_energy", "category", "created_at")
+    list_filter = ("is_top3", "best_energy", ("category", RecentValuesFieldListFilter), "labels_source", "created_at")
     search_fields = ("title", "user__email")
+    text_search_fields = ("title",)
     readonly_fields = ("id", "created_at")
     autocomplete_fields = ("triage_run", "user")
-    date_hierarchy = "created_at"
+    list_select_related = ("triage_run", "user")
+    # The model ordering follows triage_run to TriageRun.created_at, a join no index can serve.
+    ordering = ("-created_at",)
+
+    def save_model(self, request, obj, form, change):
+        # Hand-corrected labels are training data for train_task_classifier and survive rescoring.
+        if change and {"category", "estimated_minutes"} & set(form.changed_data):
+            obj.labels_source = "manual"
+        super().save_model(request, obj, form, change)
 
 
 @admin.register(Email)
-class EmailAdmin(ModelAdmin):
-    list_display = ("id", "user", "triage_run", "to_email", "subject", "status", "send_after", "created_at")
-    list_filter = ("status", "created_at")
+class EmailAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "kind", "triage_run", "to_email", "subject", "status", "attempts", "send_after", "created_at")
+    list_filter = ("status", "kind", "created_at")
     search_fields = ("user__email", "to_email", "subject")
-    readonly_fields = ("id", "created_at")
+    text_search_fields = ("subject",)
+    email_search_fields = ("user__email", "to_email")
+    readonly_fields = ("id", "created_at", "attempts", "sent_at", "provider_message_id")
+    # Bodies of auth emails carry login links and one-time codes.
+    exclude = ("body_md", "message")
     autocomplete_fields = ("user", "triage_run")
-    date_hierarchy = "created_at"
+    list_select_related = ("user", "triage_run")
+
+
+@admin.register(TriageJob)
+class TriageJobAdmin(LargeTableAdmin):
+    list_display = ("id", "dump", "user", "lane", "status", "attempts", "created_at", "finished_at")
+    list_filter = ("status", "lane", "created_at")
+    search_fields = ("user__email",)
+    readonly_fields = ("id", "created_at", "started_at", "finished_at", "attempts", "triage_run")
+    autocomplete_fields = ("dump", "user")
+    list_select_related = ("dump", "user")
@@ -0,0 +1,95 @@
+"""
+Changelist helpers that keep the admin flat on multi-million-row tables.
+
+- EstimatedCountPaginator: on PostgreSQL, large result sets are counted from the
+  planner's row estimate instead of COUNT(*). Smaller ones, and other databases,
+  are counted exactly.
+- IndexedSearchMixin: search only through indexed paths. Terms containing '@'
+  match email fields exactly (unique index), falling back to a substring match.
+  Other terms use icontains on text_search_fields. PostgreSQL serves substring
+  matches from the pg_trgm GIN indexes on UPPER(col::text) in quick_catch
+  migration 0015 and users migration 0006.
+- RecentValuesFieldListFilter: list_filter choices drawn from the newest rows
+  instead of a DISTINCT over the whole table.
+"""
+
+import json
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from unfold.admin import ModelAdmin
+
+
+# Rows sampled (newest first) for RecentValuesFieldListFilter choices.
+RECENT_VALUES_SAMPLE = 10_000
+
+
+def planner_row_estimate(queryset: QuerySet) -> int | None:
+    """PostgreSQL's estimated row count for the queryset (EXPLAIN, not executed); None elsewhere."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, QuerySet):
+            estimate = planner_row_estimate(self.object_list)
+            if estimate is not None and estimate > getattr(settings, "QUICK_CATCH_ADMIN_EXACT_COUNT_LIMIT", 10_000):
+                return estimate
+        return super().count
+
+
+class RecentValuesFieldListFilter(admin.AllValuesFieldListFilter):
+    """AllValuesFieldListFilter whose choices come from the newest RECENT_VALUES_SAMPLE rows."""
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        values = model._default_manager.order_by("-created_at").values_list(field_path, flat=True)
+        self.lookup_choices = sorted(set(values[:RECENT_VALUES_SAMPLE]), key=lambda v: (v is None, v))
+
+
+class IndexedSearchMixin:
+    # Fields searched with icontains for terms without '@' (each needs a trigram index on PostgreSQL).
+    text_search_fields: tuple[str, ...] = ()
+    # Fields searched for terms containing '@' (or for every term if there are no text fields).
+    email_search_fields: tuple[str, ...] = ("user__email",)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if "@" in term or not self.text_search_fields:
+            # A full address is served by the unique/btree indexes; anything else
+            # (partial address, domain) falls back to the trigram substring search.
+            exact = Q()
+            for field in self.email_search_fields:
+                exact |= Q(**{f"{field}__in": {term, term.lower()}})
+            if queryset.filter(exact).exists():
+                return queryset.filter(exact), False
+            fields = self.email_search_fields
+        else:
+            fields = self.text_search_fields
+        q = Q()
+        for field in fields:
+            q |= Q(**{f"{field}__icontains": term})
+        return queryset.filter(q), False
+
+
+class LargeTableAdmin(IndexedSearchMixin, ModelAdmin):
+    """Base for admins of tables that grow with usage: estimated counts, no full-table COUNT(*)."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -6,6 +6,7 @@ Parses structured JSON output into TriageRun and TriageTask data.
 """
 
 import json
+import logging
 import re
 import time
 from dataclasses import dataclass
@@ -14,32 +15,18 @@ from typing import Any
 import requests
 from django.conf import settings
 
+from .compression import CompressedText, compress_dump
+from .metrics import ollama_http_errors, triage_latency, triage_parse_failures
+from .prompts import PromptVersion, get_prompt
+from .tokens import NUM_CTX_BUCKETS, choose_num_ctx, estimate_messages_tokens, estimate_tokens, num_predict_for
+from .tracing import span
 
-SYSTEM_PROMPT = """You are a cognitive triage engine for neurodivergent founders.
-Input is an unfiltered brain dump.
-Your job:
-1. Extract all actionable tasks.
-2. Identify the 3 most important tasks (based on urgency, consequences, and cognitive load).
-3. Detect hidden blockers, emotional friction, or avoidance triggers.
-4. Reshape tasks into "micro-missions" based on user energy:
-   - LOW energy → tiny, non-intimidating wins
-   - MEDIUM energy → steady progress tasks
-   - HIGH energy → leverage high-focus tasks
-5. Produce a "10-Minute Action Plan" that removes overwhelm.
-
-Tone: calm, non-judgmental, shame-free, concise.
-
-You MUST respond with exactly one JSON object and no other text before or after. Use this schema:
-{
-  "extracted_tasks": [{"title": "string", "micro_steps": ["string"]}],
-  "top_3_indices": [0, 1, 2],
-  "blockers": ["string"],
-  "action_plan": "markdown string for the 10-Minute Action Plan"
-}
-- extracted_tasks: all actionable tasks from the dump; each has "title" and "micro_steps" (array of short steps).
-- top_3_indices: zero-based indices into extracted_tasks for the 3 most important.
-- blockers: list of detected blockers/emotional friction/avoidance.
-- action_plan: single markdown string, calm and concise."""
+
+logger = logging.getLogger(__name__)
+
+
+# parse_error value for responses that arrived but did not contain valid JSON
+JSON_PARSE_FAILED = "JSON parse failed"
 
 
 @dataclass
@@ -54,15 +41,22 @@ class TriageResult:
     latency_ms: int | None = None
     raw_content: str = ""
     parse_error: str | None = None
+    token_in: int | None = None
+    token_out: int | None = None
+    prompt_version: str = ""
+    temperature: float | None = None
+    compressed: CompressedText | None = None  # model input (see quick_catch.compression)
+    num_ctx: int | None = None
+    request_failed: bool = False  # the model call itself failed (no response to parse)
 
 
-def _build_user_message(dump_text: str, energy_level: str) -> str:
-    energy = energy_level.strip().upper() or "MEDIUM"
-    return f"""Brain dump (energy level: {energy}):
-
-{dump_text}
+@dataclass
+class ChatResponse:
+    """Assistant message content plus Ollama token counts (when reported)."""
 
-Return only the JSON object as specified. No markdown code fence, no explanation."""
+    content: str
+    prompt_eval_count: int | None = None
+    eval_count: int | None = None
 
 
 def _parse_json_from_response(content: str) -> dict[str, Any] | None:
@@ -89,11 +83,11 @@ def _ollama_chat(
     timeout: int,
     api_key: str | None,
     options: dict[str, Any] | None = None,
-) -> str:
+) -> ChatResponse:
     """
     Call Ollama native POST /api/chat. base_url is the server root
     (e.g. https://your-ollama.com with no trailing path).
-    Returns the assistant message content.
+    Returns the assistant message content and prompt/eval token counts.
     """
     url = f"{base_url.rstrip('/')}/api/chat"
     body = {
@@ -106,105 +100,274 @@ def _ollama_chat(
     headers = {"Content-Type": "application/json"}
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
-    resp = requests.post(url, json=body, headers=headers, timeout=timeout)
-    resp.raise_for_status()
-    data = resp.json()
+    with span("ollama.http"):
+        resp = requests.post(url, json=body, headers=headers, timeout=timeout)
+        resp.raise_for_status()
+        data = resp.json()
     message = data.get("message") or {}
-    return (message.get("content") or "").strip()
+    return ChatResponse(
+        content=(message.get("content") or "").strip(),
+        prompt_eval_count=data.get("prompt_eval_count"),
+        eval_count=data.get("eval_count"),
+    )
 
 
-def run_triage(dump_text: str, energy_level: str) -> TriageResult:
-    """
-    Call Ollama via native API (POST /api/chat). Works with any Ollama server;
-    set OLLAMA_BASE_URL to the server root (e.g. https://your-host.com).
-    """
+def _ollama_settings() -> tuple[str, str, int, str | None]:
     base_url = getattr(settings, "OLLAMA_BASE_URL", None) or "http://localhost:11434"
     base_url = (base_url or "").strip().rstrip("/") or "http://localhost:11434"
     model = getattr(settings, "OLLAMA_MODEL", "qwen3:4b")
     timeout = getattr(settings, "OLLAMA_TIMEOUT", 300)
     api_key = getattr(settings, "OLLAMA_API_KEY", None)
-    user_message = _build_user_message(dump_text, energy_level)
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": user_message},
-    ]
+    return base_url, model, timeout, api_key
+
+
+def _compress(dump_text: str) -> CompressedText:
+    if getattr(settings, "QUICK_CATCH_COMPRESS_INPUT", True):
+        return compress_dump(dump_text)
+    return CompressedText(text=dump_text, original=dump_text)
+
+
+def _sized_options(prompt: PromptVersion, messages, num_predict: int) -> tuple[dict[str, Any], int]:
+    """Model options with num_ctx rounded up to a bucket that fits the prompt plus num_predict."""
+    prompt_tokens = estimate_messages_tokens(messages)
+    buckets = getattr(settings, "QUICK_CATCH_NUM_CTX_BUCKETS", None) or NUM_CTX_BUCKETS
+    num_ctx = choose_num_ctx(prompt_tokens, num_predict, buckets)
+    if prompt_tokens + num_predict > num_ctx:
+        logger.warning(
+            "Triage prompt (~%d tokens + %d output) exceeds the largest num_ctx bucket %d; input may be truncated",
+            prompt_tokens, num_predict, num_ctx,
+        )
+    return {**prompt.options, "num_ctx": num_ctx, "num_predict": num_predict}, num_ctx
+
+
+def _request_error_message(e: Exception) -> str:
+    """Count the failure in ollama_http_errors and describe it for the action plan."""
+    if not isinstance(e, requests.RequestException):
+        return str(e)
+    if getattr(e, "response", None) is not None:
+        ollama_http_errors.inc(status=e.response.status_code)
+    elif isinstance(e, requests.Timeout):
+        ollama_http_errors.inc(status="timeout")
+    else:
+        ollama_http_errors.inc(status="connection")
+    err_msg = str(e).strip()
+    if hasattr(e, "response") and e.response is not None:
+        try:
+            detail = e.response.json()
+            err_msg = f"Error code: {e.response.status_code} - {detail}"
+        except Exception:
+            err_msg = f"Error code: {e.response.status_code} - {e.response.text or err_msg}"
+    if "timed out" in err_msg.lower() or "timeout" in err_msg.lower():
+        err_msg = f"{err_msg} Increase OLLAMA_TIMEOUT (e.g. 300 or 600) if the model is slow or loading."
+    return err_msg
+
+
+def _triage_fields(data: dict[str, Any]) -> dict[str, Any]:
+    """Normalize one parsed triage object into TriageResult fields."""
+    tasks = data.get("extracted_tasks") or []
+    if not isinstance(tasks, list):
+        tasks = []
+    top_3 = data.get("top_3_indices") or []
+    if not isinstance(top_3, list):
+        top_3 = []
+    top_3 = [int(x) for x in top_3 if isinstance(x, int) or (isinstance(x, (str, float)) and str(x).isdigit())][:3]
+    blockers = data.get("blockers") or []
+    if not isinstance(blockers, list):
+        blockers = [str(blockers)] if blockers else []
+    blockers = [str(b) for b in blockers]
+    action_plan = (data.get("action_plan") or "").strip() or "No action plan generated."
+    return {
+        "extracted_tasks": tasks,
+        "top_3_indices": top_3,
+        "blockers": blockers,
+        "action_plan": action_plan,
+    }
+
+
+def run_triage(dump_text: str, energy_level: str, prompt: PromptVersion | None = None) -> TriageResult:
+    """
+    Call Ollama via native API (POST /api/chat). Works with any Ollama server;
+    set OLLAMA_BASE_URL to the server root (e.g. https://your-host.com).
+    prompt defaults to the default registered version (see quick_catch.prompts.select_prompt).
+    """
+    prompt = prompt or get_prompt()
+    base_url, model, timeout, api_key = _ollama_settings()
+    with span("compress"):
+        compressed = _compress(dump_text)
+    with span("prompt.build"):
+        messages = prompt.build_messages(compressed.text, energy_level)
+        options, num_ctx = _sized_options(prompt, messages, num_predict_for(estimate_tokens(compressed.text)))
+    common = {
+        "model_name": model,
+        "prompt_version": prompt.version,
+        "temperature": prompt.temperature,
+        "compressed": compressed,
+        "num_ctx": num_ctx,
+    }
 
     start = time.perf_counter()
     try:
-        raw_content = _ollama_chat(
+        chat = _ollama_chat(
             base_url=base_url,
             model=model,
             messages=messages,
             timeout=timeout,
             api_key=api_key,
-            options={"temperature": 0.2},
-        )
-    except requests.RequestException as e:
-        err_msg = str(e).strip()
-        if hasattr(e, "response") and e.response is not None:
-            try:
-                detail = e.response.json()
-                err_msg = f"Error code: {e.response.status_code} - {detail}"
-            except Exception:
-                err_msg = f"Error code: {e.response.status_code} - {e.response.text or err_msg}"
-        if "timed out" in err_msg.lower() or "timeout" in err_msg.lower():
-            err_msg = f"{err_msg} Increase OLLAMA_TIMEOUT (e.g. 300 or 600) if the model is slow or loading."
-        return TriageResult(
-            extracted_tasks=[],
-            top_3_indices=[],
-            blockers=[],
-            action_plan=f"AI request failed: {err_msg}",
-            model_name=model,
-            latency_ms=None,
-            raw_content="",
-            parse_error=str(e),
+            options=options,
         )
     except Exception as e:
         return TriageResult(
             extracted_tasks=[],
             top_3_indices=[],
             blockers=[],
-            action_plan=f"AI request failed: {e!s}",
-            model_name=model,
+            action_plan=f"AI request failed: {_request_error_message(e)}",
             latency_ms=None,
             raw_content="",
             parse_error=str(e),
+            request_failed=True,
+            **common,
         )
 
     latency_ms = int((time.perf_counter() - start) * 1000)
-    data = _parse_json_from_response(raw_content)
+    triage_latency.observe(latency_ms / 1000, model=model, backend="ollama")
+    raw_content = chat.content
+    with span("parse"):
+        data = _parse_json_from_response(raw_content)
 
     if not data:
+        triage_parse_failures.inc(model=model)
         return TriageResult(
             extracted_tasks=[],
             top_3_indices=[],
             blockers=[],
             action_plan=raw_content or "No response from model.",
-            model_name=model,
             latency_ms=latency_ms,
             raw_content=raw_content,
-            parse_error="JSON parse failed",
+            parse_error=JSON_PARSE_FAILED,
+            token_in=chat.prompt_eval_count,
+            token_out=chat.eval_count,
+            **common,
         )
 
-    tasks = data.get("extracted_tasks") or []
-    if not isinstance(tasks, list):
-        tasks = []
-    top_3 = data.get("top_3_indices") or []
-    if not isinstance(top_3, list):
-        top_3 = []
-    top_3 = [int(x) for x in top_3 if isinstance(x, int) or (isinstance(x, (str, float)) and str(x).isdigit())][:3]
-    blockers = data.get("blockers") or []
-    if not isinstance(blockers, list):
-        blockers = [str(blockers)] if blockers else []
-    blockers = [str(b) for b in blockers]
-    action_plan = (data.get("action_plan") or "").strip() or "No action plan generated."
-
     return TriageResult(
-        extracted_tasks=tasks,
-        top_3_indices=top_3,
-        blockers=blockers,
-        action_plan=action_plan,
-        model_name=model,
         latency_ms=latency_ms,
         raw_content=raw_content,
+        token_in=chat.prompt_eval_count,
+        token_out=chat.eval_count,
+        **_triage_fields(data),
+        **common,
     )
+
+
+BATCH_SYSTEM_SUFFIX = """
+
+You will receive several brain dumps at once, each introduced by a line "### DUMP <id>" and given in the usual format.
+Triage every dump independently, exactly as described above, and respond with one JSON object keyed by dump id:
+{"results": {"<id>": {"extracted_tasks": [...], "top_3_indices": [...], "blockers": [...], "action_plan": "..."}}}
+Include every id. Never mix tasks between dumps."""
+BATCH_NUM_PREDICT_MAX = 8192
+
+
+def pack_batches(items, max_dumps: int, max_tokens: int, max_dump_tokens: int):
+    """
+    Split (key, dump_text, energy_level) items into packs for run_triage_batch.
+    Dumps larger than max_dump_tokens are returned as packs of one (triaged individually).
+    """
+    packs, current, current_tokens = [], [], 0
+    for item in items:
+        tokens = estimate_tokens(item[1])
+        if tokens > max_dump_tokens:
+            packs.append([item])
+            continue
+        if current and (len(current) >= max_dumps or current_tokens + tokens > max_tokens):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def run_triage_batch(items, prompt: PromptVersion | None = None) -> dict[str, TriageResult]:
+    """
+    Triage several short dumps in one /api/chat call to amortize the system prompt
+    prefill and per-request overhead. items: [(key, dump_text, energy_level), ...];
+    returns {key: TriageResult}. Dumps missing from (or unparseable in) the packed
+    response are re-run individually with run_triage. Meant for non-interactive lanes:
+    each result waits for the whole pack.
+    """
+    prompt = prompt or get_prompt()
+    items = list(items)
+    if len(items) < 2:
+        return {key: run_triage(text, energy, prompt) for key, text, energy in items}
+
+    base_url, model, timeout, api_key = _ollama_settings()
+    with span("compress"):
+        compressed = {key: _compress(text) for key, text, _ in items}
+    with span("prompt.build"):
+        # Each dump is rendered with the prompt version's own user template, as in run_triage.
+        sections = [
+            f"### DUMP {key}\n" + prompt.build_messages(compressed[key].text, energy)[1]["content"]
+            for key, _, energy in items
+        ]
+        messages = [
+            {"role": "system", "content": prompt.system + BATCH_SYSTEM_SUFFIX},
+            {"role": "user", "content": "\n\n".join(sections) + "\n\nReturn only the JSON object as specified."},
+        ]
+        input_tokens = {key: estimate_tokens(c.text) for key, c in compressed.items()}
+        num_predict = min(sum(num_predict_for(n) for n in input_tokens.values()), BATCH_NUM_PREDICT_MAX)
+        options, num_ctx = _sized_options(prompt, messages, num_predict)
+
+    results: dict[str, TriageResult] = {}
+    start = time.perf_counter()
+    try:
+        chat = _ollama_chat(
+            base_url=base_url,
+            model=model,
+            messages=messages,
+            timeout=timeout,
+            api_key=api_key,
+            options=options,
+        )
+    except Exception as e:
+        logger.warning(
+            "Packed triage request for %d dumps failed (%s); falling back to single calls",
+            len(items), _request_error_message(e),
+        )
+        chat = None
+
+    if chat is not None:
+        latency_ms = int((time.perf_counter() - start) * 1000)
+        triage_latency.observe(latency_ms / 1000, model=model, backend="ollama-batch")
+        with span("parse"):
+            data = _parse_json_from_response(chat.content)
+        packed = data.get("results") if isinstance(data, dict) else None
+        if not isinstance(packed, dict):
+            triage_parse_failures.inc(model=model)
+            packed = {}
+        # Every run waited for the whole request, so each records its real latency; token
+        # counts are per request and are attributed by share of the input instead.
+        total_input = sum(input_tokens.values()) or 1
+        for key, _, _ in items:
+            item = packed.get(str(key))
+            if not isinstance(item, dict) or not isinstance(item.get("extracted_tasks"), list):
+                continue
+            share = input_tokens[key] / total_input
+            results[key] = TriageResult(
+                model_name=model,
+                prompt_version=prompt.version,
+                temperature=prompt.temperature,
+                compressed=compressed[key],
+                num_ctx=num_ctx,
+                latency_ms=latency_ms,
+                raw_content=json.dumps(item, ensure_ascii=False),
+                token_in=round(chat.prompt_eval_count * share) if chat.prompt_eval_count else None,
+                token_out=round(chat.eval_count * share) if chat.eval_count else None,
+                **_triage_fields(item),
+            )
+
+    for key, text, energy in items:
+        if key not in results:
+            results[key] = run_triage(text, energy, prompt)
+    return results
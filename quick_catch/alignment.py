@@ -0,0 +1,137 @@
+"""
+Align extracted tasks back to the brain dump they came from.
+
+The dump is tokenized once into an inverted index of normalized word keys
+(lowercased, light suffix stripping, truncated prefix) so paraphrased titles like
+"Book dentist appointment" still find "need to call the dentist about booking".
+For each task title and micro-step the index yields candidate positions; the
+densest window of distinct query keys is then checked with difflib and, if it is
+close enough, stored as an evidence span [{"start", "end", "text"}] with offsets
+into BrainDump.input_text. Work is proportional to query hits, not dump size.
+"""
+
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+
+# Minimum share of a query's content words that must appear in the window.
+MIN_COVERAGE = 0.5
+# Minimum difflib ratio between the query and the window text (after key normalization).
+MIN_SIMILARITY = 0.35
+MAX_SPANS_PER_TASK = 4
+KEY_LENGTH = 6
+# Keys occurring in more than this share of dump tokens (at least COMMON_MIN_COUNT
+# times) carry no location signal and are ignored, like stopwords.
+COMMON_KEY_SHARE = 0.01
+COMMON_MIN_COUNT = 20
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by do for from get go have i if in into is it me my need of on or "
+    "so that the their then this to up we with you your".split()
+)
+_WORD_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)?", re.UNICODE)
+_SUFFIXES = ("ing", "ed", "es", "s")
+
+
+@lru_cache(maxsize=65536)
+def word_key(word: str) -> str:
+    word = word.lower()
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            word = word[: -len(suffix)]
+            break
+    return word[:KEY_LENGTH]
+
+
+class DumpIndex:
+    """Token offsets and key -> token positions for one dump."""
+
+    def __init__(self, text: str):
+        self.text = text or ""
+        matches = list(_WORD_RE.finditer(self.text))
+        self.starts = [m.start() for m in matches]
+        self.ends = [m.end() for m in matches]
+        self.keys = [word_key(m.group()) for m in matches]
+        self.positions: dict[str, list[int]] = {}
+        for i, key in enumerate(self.keys):
+            self.positions.setdefault(key, []).append(i)
+
+    def find(self, query: str) -> dict | None:
+        """Best evidence span for a query, or None when nothing matches well enough."""
+        query_keys = []
+        for m in _WORD_RE.finditer(query or ""):
+            word = m.group().lower()
+            if word not in STOPWORDS:
+                key = word_key(word)
+                if key not in query_keys:
+                    query_keys.append(key)
+        common = max(COMMON_MIN_COUNT, int(len(self.keys) * COMMON_KEY_SHARE))
+        informative = [k for k in query_keys if len(self.positions.get(k, ())) <= common]
+        if not informative:
+            if not query_keys:
+                return None
+            # Only common words: anchor on the rarest one.
+            informative = [min(query_keys, key=lambda k: len(self.positions[k]))]
+        query_keys = informative
+
+        hits = sorted((pos, key) for key in query_keys for pos in self.positions.get(key, ()))
+        if not hits:
+            return None
+        needed = max(1, round(len(query_keys) * MIN_COVERAGE))
+        window = 2 * len(query_keys) + 3
+
+        # Two pointers over hit positions: the window with the most distinct query keys.
+        best = None
+        counts: dict[str, int] = {}
+        left = 0
+        for pos, key in hits:
+            counts[key] = counts.get(key, 0) + 1
+            while pos - hits[left][0] >= window:
+                left_key = hits[left][1]
+                counts[left_key] -= 1
+                if not counts[left_key]:
+                    del counts[left_key]
+                left += 1
+            distinct = len(counts)
+            span = (hits[left][0], pos)
+            if best is None or (distinct, span[0] - span[1]) > (best[0], best[1][0] - best[1][1]):
+                best = (distinct, span)
+        distinct, (first, last) = best
+        if distinct < needed:
+            return None
+
+        window_keys = [k for k in self.keys[first:last + 1] if k]
+        ratio = SequenceMatcher(None, " ".join(query_keys), " ".join(window_keys), autojunk=False).ratio()
+        if ratio < MIN_SIMILARITY and distinct < len(query_keys):
+            return None
+        start, end = self.starts[first], self.ends[last]
+        return {"start": start, "end": end, "text": self.text[start:end]}
+
+
+def _merge(spans: list[dict], text: str) -> list[dict]:
+    merged = []
+    for span in sorted(spans, key=lambda s: s["start"]):
+        if merged and span["start"] <= merged[-1]["end"]:
+            last = merged[-1]
+            last["end"] = max(last["end"], span["end"])
+            last["text"] = text[last["start"]:last["end"]]
+        else:
+            merged.append(dict(span))
+    return merged
+
+
+def task_evidence(index: DumpIndex, title: str, micro_steps=()) -> list[dict]:
+    """Evidence spans for one task: its title first, then micro-steps, merged and capped."""
+    spans = []
+    for query in [title, *micro_steps]:
+        span = index.find(str(query))
+        if span:
+            spans.append(span)
+    return _merge(spans, index.text)[:MAX_SPANS_PER_TASK]
+
+
+def align_tasks(text: str, tasks) -> list[list[dict]]:
+    """tasks: [(title, micro_steps), ...] -> evidence_spans per task (one index for the whole dump)."""
+    index = DumpIndex(text)
+    return [task_evidence(index, title, steps or ()) for title, steps in tasks]
@@ -0,0 +1,107 @@
+"""
+JSON API for Quick Catch (django-ninja), mounted at /api/.
+Session-authenticated; bulk ingestion queues triage instead of running it inline.
+"""
+
+from typing import Literal
+from uuid import UUID
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from ninja import Field, NinjaAPI, Schema
+from ninja.errors import HttpError
+from ninja.security import django_auth
+
+from .jobs import enqueue_dumps
+from .models import BrainDump, TriageJob, count_words
+from .sync import InvalidCursor, build_sync_payload, etag_matches, sync_etag
+
+
+api = NinjaAPI(title="Quick Catch API", urls_namespace="quick_catch_api", auth=django_auth)
+
+
+class DumpIn(Schema):
+    input_text: str = Field(..., min_length=1)
+    energy_level: Literal["low", "medium", "high"] = "medium"
+    source: Literal["api", "mobile"] = "api"
+
+
+class BulkDumpsIn(Schema):
+    dumps: list[DumpIn] = Field(..., min_length=1)
+
+
+class JobOut(Schema):
+    job_id: UUID
+    dump_id: UUID
+    status: str
+    triage_run_id: UUID | None = None
+    poll_url: str
+    result_url: str | None = None
+
+
+def _job_out(job):
+    return {
+        "job_id": job.id,
+        "dump_id": job.dump_id,
+        "status": job.status,
+        "triage_run_id": job.triage_run_id,
+        "poll_url": reverse("quick_catch_api:job_status", kwargs={"job_id": job.id}),
+        "result_url": (
+            reverse("quick_catch:result", kwargs={"dump_id": job.dump_id})
+            if job.status == "done" else None
+        ),
+    }
+
+
+@api.post("/dumps/bulk", response={202: list[JobOut]})
+def bulk_create_dumps(request, payload: BulkDumpsIn):
+    """Insert many dumps in one statement and queue each for triage; returns job handles to poll."""
+    max_batch = getattr(settings, "QUICK_CATCH_BULK_MAX_DUMPS", 100)
+    if len(payload.dumps) > max_batch:
+        raise HttpError(413, f"At most {max_batch} dumps per request.")
+    dumps = []
+    for item in payload.dumps:
+        text = item.input_text.strip()
+        if not text:
+            raise HttpError(422, "input_text must not be blank.")
+        dumps.append(BrainDump(
+            user=request.user,
+            input_text=text,
+            energy_level=item.energy_level,
+            source=item.source,
+            word_count=count_words(text),
+        ))
+    with transaction.atomic():
+        BrainDump.objects.bulk_create(dumps)
+        jobs = enqueue_dumps(dumps, lane="bulk")
+    return 202, [_job_out(job) for job in jobs]
+
+
+@api.get("/jobs/{job_id}", response=JobOut, url_name="job_status")
+def job_status(request, job_id: UUID):
+    """Poll a triage job queued by bulk ingestion."""
+    job = get_object_or_404(TriageJob, id=job_id, user=request.user)
+    return _job_out(job)
+
+
+@api.get("/sync")
+def sync(request, cursor: str | None = None):
+    """
+    Delta sync: dumps ("d"), runs ("r"), tasks ("t") and tombstones ("x") changed since
+    `cursor`, as positional rows described by "k". Honors If-None-Match with 304.
+    """
+    try:
+        etag = sync_etag(request.user, cursor)
+        if etag_matches(etag, request.headers.get("If-None-Match")):
+            response = HttpResponseNotModified()
+        else:
+            payload = build_sync_payload(request.user, cursor)
+            response = JsonResponse(payload, json_dumps_params={"separators": (",", ":")})
+    except InvalidCursor:
+        raise HttpError(400, "Invalid sync cursor.")
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
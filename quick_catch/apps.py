@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class QuickCatchConfig(AppConfig):
     name = 'quick_catch'
+
+    def ready(self):
+        from . import signals  # noqa: F401
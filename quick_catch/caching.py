@@ -0,0 +1,152 @@
+"""
+Two-tier cache for hot per-user lookups (profile, latest run of a dump).
+
+Tier 1 is a small per-process LRU with a short TTL (QUICK_CATCH_LOCAL_CACHE_SECONDS),
+so repeated requests in one worker skip the network entirely. Tier 2 is Django's
+default cache (Redis in production, QUICK_CATCH_CACHE_SECONDS). On a miss only
+one caller per key loads from the database: other threads wait on that key's
+in-flight load (no lock is held across the database round trip, so unrelated keys
+never queue behind it) and a cache.add() lock makes other processes wait briefly
+for the value instead of stampeding. Signals invalidate both tiers when the underlying rows change
+(other workers' LRUs expire within the local TTL). Hits and misses per tier are
+counted in quick_catch_cache_requests_total.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import record_cache
+
+
+# Wait at most this long for another process to fill a key before loading it ourselves.
+LOCK_WAIT_SECONDS = 1.0
+LOCK_POLL_SECONDS = 0.05
+LOCK_TIMEOUT_SECONDS = 10
+
+
+class LocalLRU:
+    """Thread-safe LRU with per-entry expiry."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(found, value)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TwoTierCache:
+    def __init__(self, name, maxsize=1024):
+        self.name = name
+        self.local = LocalLRU(maxsize)
+        # key -> Event set when this process's in-flight load of the key finishes.
+        self._inflight: dict = {}
+        self._inflight_lock = threading.Lock()
+        _caches.append(self)
+
+    def _cache_key(self, key):
+        return f"qc:{self.name}:{key}"
+
+    def get_or_load(self, key, loader):
+        """Cached value for key, calling loader() on a miss in both tiers (None is cached too)."""
+        found, value = self.local.get(key)
+        record_cache(f"{self.name}:local", found)
+        if found:
+            return copy.copy(value)
+
+        with self._inflight_lock:
+            found, value = self.local.get(key)  # filled by another thread meanwhile
+            if found:
+                return copy.copy(value)
+            done = self._inflight.get(key)
+            leader = done is None
+            if leader:
+                done = self._inflight[key] = threading.Event()
+        if not leader:
+            # Another thread is loading this key: wait for it, then load ourselves if it gave up.
+            done.wait(LOCK_WAIT_SECONDS)
+            found, value = self.local.get(key)
+            if found:
+                return copy.copy(value)
+
+        try:
+            cache_key = self._cache_key(key)
+            wrapped = cache.get(cache_key)
+            record_cache(f"{self.name}:shared", wrapped is not None)
+            if wrapped is None:
+                wrapped = self._load_once(cache_key, loader)
+            self.local.set(key, wrapped[0], getattr(settings, "QUICK_CATCH_LOCAL_CACHE_SECONDS", 5))
+            return copy.copy(wrapped[0])
+        finally:
+            if leader:
+                with self._inflight_lock:
+                    self._inflight.pop(key, None)
+                done.set()
+
+    def _load_once(self, cache_key, loader):
+        lock_key = f"{cache_key}:lock"
+        locked = cache.add(lock_key, 1, LOCK_TIMEOUT_SECONDS)
+        if not locked:
+            deadline = time.monotonic() + LOCK_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_SECONDS)
+                wrapped = cache.get(cache_key)
+                if wrapped is not None:
+                    return wrapped
+        try:
+            wrapped = (loader(),)  # tuple so a cached None is distinguishable from a miss
+            cache.set(cache_key, wrapped, getattr(settings, "QUICK_CATCH_CACHE_SECONDS", 300))
+            return wrapped
+        finally:
+            if locked:
+                cache.delete(lock_key)
+
+    def invalidate(self, key):
+        self.local.delete(key)
+        cache.delete(self._cache_key(key))
+
+
+_caches: list[TwoTierCache] = []
+
+
+def clear_local_caches():
+    """Drop every process-local tier (tests, or after bulk changes made outside signals)."""
+    for c in _caches:
+        c.local.clear()
+
+
+# user_id -> Profile
+profile_cache = TwoTierCache("profile")
+# dump_id -> latest TriageRun of the dump (or None)
+latest_run_cache = TwoTierCache("latest_run")
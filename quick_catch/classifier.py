@@ -0,0 +1,150 @@
+"""
+Local task classifier for TriageTask.category and estimated_minutes.
+
+Two multinomial naive Bayes heads over hashed word unigrams and bigrams of the
+task title and micro-steps, trained by the train_task_classifier command from
+tasks a person labelled (category / duration corrected in the admin, which marks
+them labels_source="manual"). The triage prompts do not ask the model for labels,
+so there is no LLM-labelled data. The trained counts are stored as one compressed
+.npz file (QUICK_CATCH_CLASSIFIER_PATH) and loaded once per process. Predictions
+below the confidence thresholds leave the rule-based scores in place.
+"""
+
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+
+N_FEATURES = 2 ** 16
+DURATION_BUCKETS = (5, 10, 15, 30, 45, 60, 90, 120, 240)
+DEFAULT_MIN_CONFIDENCE = {"category": 0.6, "estimated_minutes": 0.5}
+
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+def hashed_features(title: str, micro_steps=()) -> np.ndarray:
+    """Feature bucket indices (with repeats) for one task."""
+    words = _WORD_RE.findall(" ".join([title or "", *map(str, micro_steps or ())]).lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return np.fromiter((zlib.crc32(g.encode()) % N_FEATURES for g in grams), dtype=np.int64, count=len(grams))
+
+
+def duration_bucket(minutes: int) -> int:
+    """Index of the duration bucket nearest to minutes."""
+    return int(np.abs(np.array(DURATION_BUCKETS) - minutes).argmin())
+
+
+class NaiveBayesHead:
+    """Multinomial naive Bayes over hashed features with Laplace smoothing."""
+
+    def __init__(self, classes, feature_counts, class_counts, alpha=1.0):
+        self.classes = list(classes)
+        counts = np.asarray(feature_counts, dtype=np.float64)
+        self.log_prior = np.log((np.asarray(class_counts, dtype=np.float64) + 1) / (np.sum(class_counts) + len(self.classes)))
+        self.log_likelihood = np.log(
+            (counts + alpha) / (counts.sum(axis=1, keepdims=True) + alpha * counts.shape[1])
+        ).astype(np.float32)
+
+    def predict(self, feature_rows: list[np.ndarray]) -> list[tuple[object, float]]:
+        """(label, probability) per row."""
+        if not feature_rows:
+            return []
+        scores = np.stack([
+            self.log_prior + self.log_likelihood[:, row].sum(axis=1) for row in feature_rows
+        ])
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        return [(self.classes[i], float(probs[n, i])) for n, i in enumerate(best)]
+
+
+def count_features(examples, classes) -> tuple[np.ndarray, np.ndarray]:
+    """examples: [(feature_indices, label)] -> (classes x N_FEATURES counts, per-class counts)."""
+    position = {c: i for i, c in enumerate(classes)}
+    feature_counts = np.zeros((len(classes), N_FEATURES), dtype=np.float32)
+    class_counts = np.zeros(len(classes), dtype=np.int64)
+    for features, label in examples:
+        i = position[label]
+        np.add.at(feature_counts[i], features, 1)
+        class_counts[i] += 1
+    return feature_counts, class_counts
+
+
+def save_artifact(path, heads: dict[str, tuple[list, np.ndarray, np.ndarray]], alpha: float = 1.0, meta=None) -> None:
+    """heads: {field: (classes, feature_counts, class_counts)}; written as one compressed .npz."""
+    arrays = {"alpha": np.array(alpha)}
+    for field, (classes, feature_counts, class_counts) in heads.items():
+        arrays[f"{field}__classes"] = np.array([str(c) for c in classes])
+        arrays[f"{field}__features"] = feature_counts
+        arrays[f"{field}__counts"] = class_counts
+    arrays["meta"] = np.array([f"{k}={v}" for k, v in (meta or {}).items()])
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class TaskClassifier:
+    heads: dict[str, NaiveBayesHead]
+
+    def predict(self, tasks) -> dict[str, list[tuple[object, float]]]:
+        rows = [hashed_features(t.title, t.micro_steps) for t in tasks]
+        return {field: head.predict(rows) for field, head in self.heads.items()}
+
+
+def classifier_path() -> str | None:
+    return getattr(settings, "QUICK_CATCH_CLASSIFIER_PATH", None)
+
+
+@lru_cache(maxsize=4)
+def _load(path: str, mtime: float) -> TaskClassifier | None:
+    with np.load(path) as data:
+        alpha = float(data["alpha"]) if "alpha" in data else 1.0
+        heads = {}
+        for field in ("category", "estimated_minutes"):
+            if f"{field}__classes" not in data:
+                continue
+            classes = list(data[f"{field}__classes"])
+            if field == "estimated_minutes":
+                classes = [int(c) for c in classes]
+            heads[field] = NaiveBayesHead(classes, data[f"{field}__features"], data[f"{field}__counts"], alpha)
+    return TaskClassifier(heads) if heads else None
+
+
+def get_classifier() -> TaskClassifier | None:
+    """Trained classifier for this process (reloaded only if the artifact file changes), or None."""
+    path = classifier_path()
+    if not path:
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    return _load(path, mtime)
+
+
+def classify_tasks(tasks) -> None:
+    """
+    Set category / estimated_minutes on TriageTask instances in place where the
+    classifier is confident (otherwise the rule-based value stays), and labels_source
+    to "classifier" if it set either field, else "rules".
+    """
+    tasks = list(tasks)
+    thresholds = {**DEFAULT_MIN_CONFIDENCE, **(getattr(settings, "QUICK_CATCH_CLASSIFIER_MIN_CONFIDENCE", None) or {})}
+    classifier = get_classifier()
+    predictions = classifier.predict(tasks) if classifier and tasks else {}
+
+    for n, task in enumerate(tasks):
+        task.labels_source = "rules"
+        for field in ("category", "estimated_minutes"):
+            predicted = predictions.get(field)
+            if predicted and predicted[n][1] >= thresholds[field]:
+                setattr(task, field, predicted[n][0])
+                task.labels_source = "classifier"
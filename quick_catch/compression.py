@@ -0,0 +1,146 @@
+"""
+Normalize and shrink brain dump text before it is sent to the model.
+
+Dumps pasted from notes apps and mail clients carry whitespace runs, repeated
+lines and paragraphs, long tracking URLs, quoted reply threads and signatures,
+all of which cost prefill time without helping triage. compress_dump() removes
+or replaces them with short placeholders. Only the compressed text goes to the
+model; evidence spans are aligned against the original input_text locally
+(quick_catch.alignment), so no offset map is kept.
+"""
+
+import re
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from .tokens import estimate_tokens
+
+
+# URLs longer than this are replaced by "[link: host]".
+URL_MAX_CHARS = 40
+# Repeated lines shorter than this are kept (headings such as "Work:" may legitimately repeat).
+DEDUPE_MIN_LINE_CHARS = 8
+# Runs of at least this many "> " lines count as a quoted thread.
+QUOTE_MIN_LINES = 2
+
+QUOTED_PLACEHOLDER = "[quoted text]"
+SIGNATURE_PLACEHOLDER = "[signature]"
+
+_URL_RE = re.compile(r"https?://[^\s<>\"'()\[\]]+")
+_QUOTE_LINE_RE = re.compile(r"^\s*>")
+_REPLY_HEADER_RE = re.compile(r"^\s*On\b.{0,200}\bwrote:\s*$")
+_SIGNATURE_RE = re.compile(r"^(--\s?|Sent from my [\w ]+|Get Outlook for \w+)$")
+_WORD_RE = re.compile(r"\S+|[ \t\r\f\v]+")
+
+
+@dataclass
+class CompressedText:
+    """Text sent to the model and the dump it was compressed from."""
+
+    text: str
+    original: str
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(estimate_tokens(self.original) - estimate_tokens(self.text), 0)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def _lines(text: str) -> list[tuple[int, int]]:
+    spans = []
+    pos = 0
+    for line in text.split("\n"):
+        spans.append((pos, pos + len(line)))
+        pos += len(line) + 1
+    return spans
+
+
+def _blocks(text: str) -> list[list[tuple[int, int]]]:
+    """Paragraphs: runs of non-blank lines as (start, end) offsets."""
+    blocks, current = [], []
+    for start, end in _lines(text):
+        if text[start:end].strip():
+            current.append((start, end))
+        elif current:
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def _emit_line(parts: list[str], text: str, start: int, end: int) -> None:
+    """Append a line verbatim except for collapsed whitespace runs and elided long URLs."""
+    line = text[start:end]
+    lead = len(line) - len(line.lstrip())
+    trail = len(line.rstrip())
+    for m in _WORD_RE.finditer(line, lead, trail):
+        s, e = start + m.start(), start + m.end()
+        token = m.group()
+        if token[0].isspace():
+            parts.append(" ")
+            continue
+        pos = s
+        for url in _URL_RE.finditer(text, s, e):
+            if url.end() - url.start() <= URL_MAX_CHARS:
+                continue
+            host = urlsplit(url.group()).hostname or "url"
+            parts.append(text[pos:url.start()] + f"[link: {host}]")
+            pos = url.end()
+        parts.append(text[pos:e])
+
+
+def compress_dump(text: str) -> CompressedText:
+    text = text or ""
+    parts: list[str] = []
+    seen_blocks: set[str] = set()
+    seen_lines: set[str] = set()
+    first_block = True
+
+    for block in _blocks(text):
+        block_key = _normalize(text[block[0][0]:block[-1][1]])
+        if block_key in seen_blocks:
+            continue
+        seen_blocks.add(block_key)
+
+        lines_out = []  # (start, end) of a kept line, or a placeholder string
+        i = 0
+        while i < len(block):
+            start, end = block[i]
+            line = text[start:end].strip()
+            if _SIGNATURE_RE.match(line):
+                lines_out.append(SIGNATURE_PLACEHOLDER)
+                break
+            if _REPLY_HEADER_RE.match(line) or _QUOTE_LINE_RE.match(line):
+                j = i + 1 if _REPLY_HEADER_RE.match(line) else i
+                while j < len(block) and _QUOTE_LINE_RE.match(text[block[j][0]:block[j][1]]):
+                    j += 1
+                if j - i >= QUOTE_MIN_LINES:
+                    lines_out.append(QUOTED_PLACEHOLDER)
+                    i = j
+                    continue
+            key = _normalize(line)
+            if len(key) >= DEDUPE_MIN_LINE_CHARS and key in seen_lines:
+                i += 1
+                continue
+            seen_lines.add(key)
+            lines_out.append((start, end))
+            i += 1
+
+        if not lines_out:
+            continue
+        if not first_block:
+            parts.append("\n\n")
+        first_block = False
+        for n, item in enumerate(lines_out):
+            if n:
+                parts.append("\n")
+            if isinstance(item, str):
+                parts.append(item)
+            else:
+                _emit_line(parts, text, *item)
+    return CompressedText(text="".join(parts), original=text)
+
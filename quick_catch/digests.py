@@ -0,0 +1,130 @@
+"""
+Daily digest emails for opted-in users.
+
+queue_daily_digests (run hourly) finds the timezones whose local digest hour
+falls in the coming window, then walks the matching profiles in user-id chunks.
+Each chunk is built with a fixed number of queries whatever its size: already
+queued digests, each user's latest runs (limited per user in SQL), their open
+top-3 tasks, and one bulk INSERT of Email rows whose send_after is the local
+send time. Delivery is left to send_queued_emails.
+"""
+
+import logging
+from datetime import timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import Email, Profile, TriageRun, TriageTask
+
+
+logger = logging.getLogger(__name__)
+
+DIGEST_RUNS_PER_USER = 3
+
+
+def _zone(name):
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning("Unknown profile timezone %r; using UTC for digests", name)
+        return dt_timezone.utc
+
+
+def due_send_times(timezones, now, hour, window) -> dict:
+    """{send_at (UTC): [timezone names]} for zones whose next local `hour`:00 is in [now, now + window)."""
+    groups: dict = {}
+    for name in timezones:
+        local = now.astimezone(_zone(name))
+        send_local = local.replace(hour=hour, minute=0, second=0, microsecond=0)
+        if send_local < local:
+            send_local += timedelta(days=1)
+        send_at = send_local.astimezone(dt_timezone.utc)
+        if send_at < now + window:
+            groups.setdefault(send_at, []).append(name)
+    return groups
+
+
+def digest_body(runs, titles) -> str:
+    """Markdown digest: per recent run, its summary and the top-3 tasks that are still open."""
+    sections = ["Here is what is still open from your recent brain dumps."]
+    for run in runs:
+        open_titles = [titles[tid] for tid in run["top_3_task_ids"] or [] if tid in titles]
+        if not open_titles:
+            continue
+        heading = f"## {run['created_at']:%b} {run['created_at'].day}"
+        if run["summary_one_liner"]:
+            heading += f": {run['summary_one_liner']}"
+        sections.append(heading + "\n" + "\n".join(f"- {title}" for title in open_titles))
+    return "\n\n".join(sections) if len(sections) > 1 else ""
+
+
+def queue_digest_chunk(users, send_at, since, subject) -> int:
+    """users: [(user_id, email)]. Queue digests for one chunk in four queries; returns emails created."""
+    user_ids = [user_id for user_id, _ in users]
+    queued = set(
+        Email.objects.filter(user_id__in=user_ids, kind="digest", send_after=send_at).values_list("user_id", flat=True)
+    )
+    runs_by_user: dict = {}
+    rows = (
+        TriageRun.objects.filter(user_id__in=[u for u in user_ids if u not in queued], created_at__gte=since)
+        .annotate(recent=Window(RowNumber(), partition_by=F("user_id"), order_by=F("created_at").desc()))
+        .filter(recent__lte=DIGEST_RUNS_PER_USER)
+        .order_by("user_id", "-created_at")
+        .values("id", "user_id", "created_at", "summary_one_liner", "top_3_task_ids")
+    )
+    for row in rows:
+        runs_by_user.setdefault(row["user_id"], []).append(row)
+    task_ids = [tid for runs in runs_by_user.values() for run in runs for tid in run["top_3_task_ids"] or []]
+    titles = {
+        str(task_id): title
+        for task_id, title in TriageTask.objects.filter(id__in=task_ids, completed_at__isnull=True).order_by().values_list("id", "title")
+    } if task_ids else {}
+
+    emails = []
+    for user_id, address in users:
+        runs = runs_by_user.get(user_id)
+        body = digest_body(runs, titles) if runs else ""
+        if not body or not address:
+            continue
+        emails.append(Email(
+            user_id=user_id,
+            triage_run_id=runs[0]["id"],
+            kind="digest",
+            to_email=address,
+            subject=subject,
+            body_md=body,
+            send_after=send_at,
+        ))
+    Email.objects.bulk_create(emails, batch_size=1000)
+    return len(emails)
+
+
+def queue_daily_digests(now=None, hour=None, window=timedelta(hours=1), chunk_size=1000) -> dict:
+    """Queue digests for every timezone whose send hour is in [now, now + window). Returns {send_at: count}."""
+    now = now or timezone.now()
+    hour = getattr(settings, "QUICK_CATCH_DIGEST_HOUR", 7) if hour is None else hour
+    since = now - timedelta(days=getattr(settings, "QUICK_CATCH_DIGEST_LOOKBACK_DAYS", 7))
+    opted_in = Profile.objects.filter(email_opt_in=True, user__is_active=True)
+    zones = opted_in.order_by().values_list("timezone", flat=True).distinct()
+    created = {}
+    for send_at, names in sorted(due_send_times(zones, now, hour, window).items()):
+        # Zones in one group share the UTC offset at send time, hence the local date.
+        local = send_at.astimezone(_zone(names[0]))
+        subject = f"Your Quick Catch digest for {local:%A, %b} {local.day}"
+        profiles = opted_in.filter(timezone__in=names).order_by("user_id").values_list("user_id", "user__email")
+        count, last_id = 0, None
+        while True:
+            page = profiles.filter(user_id__gt=last_id) if last_id is not None else profiles
+            users = list(page[:chunk_size])
+            if not users:
+                break
+            count += queue_digest_chunk(users, send_at, since, subject)
+            if len(users) < chunk_size:
+                break
+            last_id = users[-1][0]
+        created[send_at] = count
+    return created
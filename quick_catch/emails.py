@@ -0,0 +1,290 @@
+"""
+Email outbox: rows in the emails table are queued by the app and delivered by
+the send_queued_emails command.
+
+Workers claim due rows with SELECT ... FOR UPDATE SKIP LOCKED and lease them by
+moving send_after forward, so several dispatchers can drain the backlog in
+parallel without double-sending. A worker that dies mid-batch only delays
+its rows until the lease runs out. Each batch goes through one
+connection from get_connection(). Failures are retried with exponential
+backoff until QUICK_CATCH_EMAIL_MAX_ATTEMPTS.
+
+Auth emails (magic links, 2FA tokens) go through the same table with
+kind="auth", so a login request only pays for one INSERT. Set EMAIL_BACKEND to
+OUTBOX_BACKEND to route everything sent with send_mail() (e.g. django-otp email
+tokens) through the outbox. The dispatcher then delivers with
+QUICK_CATCH_EMAIL_DELIVERY_BACKEND. Auth rows hold credentials, so their body is
+cleared once they are sent or have failed for good, and the admin never shows it.
+"""
+
+import base64
+import logging
+import re
+from datetime import timedelta
+from email.utils import make_msgid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.utils import DNS_NAME
+from django.db import transaction
+from django.db.models import F
+from django.utils.html import escape
+from django.utils import timezone
+
+from .metrics import email_delivery_latency, emails_sent
+from .models import Email, TriageTask
+
+
+logger = logging.getLogger(__name__)
+
+TRIAGE_EMAIL_SUBJECT = "Your Quick Catch action plan"
+OUTBOX_BACKEND = "quick_catch.emails.OutboxEmailBackend"
+
+
+def triage_email_body(run) -> str:
+    """Markdown body for the "Email me this" message of a triage run."""
+    parts = []
+    if run.summary_one_liner:
+        parts.append(run.summary_one_liner)
+    if run.action_plan_md:
+        parts.append(run.action_plan_md.strip())
+    if run.top_3_task_ids:
+        titles = {str(k): v for k, v in TriageTask.objects.filter(id__in=run.top_3_task_ids).values_list("id", "title")}
+        top = [titles[tid] for tid in run.top_3_task_ids if tid in titles]
+        if top:
+            parts.append("## Top 3 tasks\n" + "\n".join(f"- {title}" for title in top))
+    if run.blockers:
+        parts.append("## Blockers / friction\n" + "\n".join(f"- {b}" for b in run.blockers))
+    return "\n\n".join(parts)
+
+
+def queue_triage_email(run, user):
+    """Queue the run's action plan for user, unless the same email is already waiting to be sent."""
+    existing = Email.objects.filter(triage_run=run, user=user, status="queued").first()
+    if existing:
+        return existing
+    return Email.objects.create(
+        user=user,
+        triage_run=run,
+        to_email=user.email,
+        subject=TRIAGE_EMAIL_SUBJECT,
+        body_md=triage_email_body(run),
+    )
+
+
+def queue_email(user, subject, body, kind="auth", to_email=None):
+    """Queue a one-off email to user (one INSERT; delivered by send_queued_emails)."""
+    return Email.objects.create(
+        user=user,
+        kind=kind,
+        to_email=to_email or user.email,
+        subject=subject,
+        body_md=body,
+    )
+
+
+def serialize_message(message) -> dict | None:
+    """
+    JSON for the parts of an EmailMessage an outbox row has no column for, or None if
+    it cannot be stored (MIME-object attachments) and must be sent right away.
+    """
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            return None
+        filename, content, mimetype = attachment
+        if isinstance(content, bytes):
+            attachments.append([filename, base64.b64encode(content).decode("ascii"), mimetype, True])
+        else:
+            attachments.append([filename, content, mimetype, False])
+    return {
+        "from_email": message.from_email,
+        "reply_to": list(message.reply_to),
+        "headers": dict(message.extra_headers),
+        "alternatives": [[content, mimetype] for content, mimetype in getattr(message, "alternatives", [])],
+        "attachments": attachments,
+    }
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """
+    EMAIL_BACKEND that queues mail for registered users as kind="auth" outbox rows.
+    Messages with a recipient who is not a user, or that cannot be serialized, are
+    sent right away with the delivery backend.
+    """
+
+    def send_messages(self, email_messages):
+        email_messages = list(email_messages or [])
+        addresses = {address for message in email_messages for address in message.recipients()}
+        user_ids = dict(
+            get_user_model().objects.filter(email__in=addresses).values_list("email", "id")
+        ) if addresses else {}
+        rows, direct = [], []
+        for message in email_messages:
+            recipients = message.recipients()
+            stored = serialize_message(message)
+            if stored is not None and recipients and all(address in user_ids for address in recipients):
+                rows.extend(
+                    Email(
+                        user_id=user_ids[address],
+                        kind="auth",
+                        to_email=address,
+                        subject=message.subject,
+                        body_md=message.body,
+                        message=stored,
+                    )
+                    for address in recipients
+                )
+            else:
+                direct.append(message)
+        Email.objects.bulk_create(rows)
+        sent = len([m for m in email_messages if m not in direct])
+        if direct:
+            sent += delivery_connection(fail_silently=self.fail_silently).send_messages(direct) or 0
+        return sent
+
+
+def delivery_connection(**kwargs):
+    """Connection that really delivers mail (never the outbox backend itself)."""
+    if settings.EMAIL_BACKEND != OUTBOX_BACKEND:
+        return get_connection(**kwargs)
+    backend = getattr(settings, "QUICK_CATCH_EMAIL_DELIVERY_BACKEND", None)
+    if not backend or backend == OUTBOX_BACKEND:
+        raise ImproperlyConfigured("QUICK_CATCH_EMAIL_DELIVERY_BACKEND must name a real backend when EMAIL_BACKEND is the outbox.")
+    return get_connection(backend, **kwargs)
+
+
+def claim_emails(limit, lease_seconds=None, kind=None):
+    """Lease up to `limit` due queued emails to this worker and return them (oldest first)."""
+    if lease_seconds is None:
+        lease_seconds = getattr(settings, "QUICK_CATCH_EMAIL_LEASE_SECONDS", 300)
+    now = timezone.now()
+    with transaction.atomic():
+        due = Email.objects.select_for_update(skip_locked=True).filter(status="queued", send_after__lte=now)
+        if kind:
+            due = due.filter(kind=kind)
+        ids = list(due.order_by("send_after").values_list("id", flat=True)[:limit])
+        if not ids:
+            return []
+        Email.objects.filter(id__in=ids).update(
+            send_after=now + timedelta(seconds=lease_seconds),
+            attempts=F("attempts") + 1,
+        )
+    return list(Email.objects.filter(id__in=ids).order_by("created_at"))
+
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_LIST_ITEM = re.compile(r"^\s*(?:([-*])|\d+[.)])\s+(.*)$")
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+
+
+def _inline_html(text: str) -> str:
+    return _BOLD.sub(r"<strong>\1</strong>", escape(text.strip()))
+
+
+def markdown_html(text: str) -> str:
+    """
+    HTML for the Markdown subset our emails contain: "#" headings, "-"/"*" and numbered
+    lists (nested items are flattened), one paragraph per other line, and **bold**.
+    Anything else is shown as escaped text.
+    """
+    blocks, items, list_tag = [], [], None
+    for line in text.splitlines() + [""]:
+        heading, item = _HEADING.match(line), _LIST_ITEM.match(line)
+        tag = item and ("ul" if item.group(1) else "ol")
+        if items and tag != list_tag:
+            blocks.append(f"<{list_tag}>" + "".join(f"<li>{i}</li>" for i in items) + f"</{list_tag}>")
+            items = []
+        if heading:
+            level = len(heading.group(1))
+            blocks.append(f"<h{level}>{_inline_html(heading.group(2))}</h{level}>")
+        elif item:
+            items.append(_inline_html(item.group(2)))
+            list_tag = tag
+        elif line.strip():
+            blocks.append(f"<p>{_inline_html(line)}</p>")
+    return "\n".join(blocks)
+
+
+def retry_delay(attempts) -> timedelta:
+    base = getattr(settings, "QUICK_CATCH_EMAIL_RETRY_SECONDS", 60)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), 6 * 3600))
+
+
+def build_message(email):
+    """
+    EmailMultiAlternatives for an outbox row, with a fresh Message-ID. Rows queued by
+    OutboxEmailBackend are rebuilt as sent; app-built ones get an HTML alternative.
+    """
+    stored = email.message or {}
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body_md,
+        from_email=stored.get("from_email"),
+        to=[email.to_email],
+        reply_to=stored.get("reply_to"),
+        headers={**stored.get("headers", {}), "Message-ID": make_msgid(domain=DNS_NAME)},
+    )
+    if email.message is None:
+        message.attach_alternative(markdown_html(email.body_md), "text/html")
+    for content, mimetype in stored.get("alternatives", []):
+        message.attach_alternative(content, mimetype)
+    for filename, content, mimetype, is_base64 in stored.get("attachments", []):
+        message.attach(filename, base64.b64decode(content) if is_base64 else content, mimetype)
+    return message
+
+
+def send_batch(limit=50, kind=None):
+    """Claim and deliver one batch over a single connection. Returns (sent, failed)."""
+    emails = claim_emails(limit, kind=kind)
+    if not emails:
+        return 0, 0
+    max_attempts = getattr(settings, "QUICK_CATCH_EMAIL_MAX_ATTEMPTS", 5)
+    messages = [build_message(email) for email in emails]
+    errors: dict = {}
+    connection = delivery_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning("Could not open email connection", exc_info=True)
+        errors = {email.id: f"connection: {e}" for email in emails}
+    else:
+        try:
+            # One message per call: a failure is attributed to its row and earlier rows are not resent.
+            for email, message in zip(emails, messages):
+                message.connection = connection
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    errors[email.id] = str(e) or e.__class__.__name__
+        finally:
+            connection.close()
+
+    now = timezone.now()
+    for email, message in zip(emails, messages):
+        error = errors.get(email.id)
+        if error is None:
+            email.status = "sent"
+            email.sent_at = now
+            email.provider_message_id = message.extra_headers["Message-ID"]
+            email.error_message = None
+            if email.kind != "digest":  # digests are queued ahead of their send time on purpose
+                email_delivery_latency.observe((now - email.created_at).total_seconds(), kind=email.kind)
+        elif email.attempts < max_attempts:
+            email.send_after = now + retry_delay(email.attempts)
+            email.error_message = error[:2000]
+        else:
+            email.status = "failed"
+            email.error_message = error[:2000]
+        if email.kind == "auth" and email.status != "queued":
+            # do not keep login links / one-time codes once delivered or given up on
+            email.body_md = ""
+            email.message = None
+        emails_sent.inc(result="retry" if email.status == "queued" else email.status)
+    Email.objects.bulk_update(
+        emails, ["status", "sent_at", "provider_message_id", "error_message", "send_after", "body_md", "message"]
+    )
+    return len(emails) - len(errors), len(errors)
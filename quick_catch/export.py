@@ -0,0 +1,197 @@
+"""
+Streaming export of triage history (dumps, runs, tasks) as NDJSON or CSV.
+Rows are read with .iterator(chunk_size=...) and tasks are prefetched per chunk,
+so memory use stays flat however long a user's history is.
+"""
+
+import csv
+import json
+import zlib
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from django.db.models import Prefetch
+
+from .models import BrainDump, TriageRun, TriageTask
+
+
+EXPORT_FORMATS = ("ndjson", "csv")
+DEFAULT_CHUNK_SIZE = 500
+# Encoded bytes buffered before yielding (gzip output is sync-flushed at each yield)
+STREAM_BUFFER_BYTES = 64 * 1024
+
+CSV_COLUMNS = (
+    "record_type",
+    "id",
+    "parent_id",
+    "user_id",
+    "created_at",
+    "energy_level",
+    "source",
+    "word_count",
+    "text",
+    "model_name",
+    "prompt_version",
+    "latency_ms",
+    "token_in",
+    "token_out",
+    "blockers",
+    "top_3_task_ids",
+    "rank_order",
+    "is_top3",
+    "micro_steps",
+)
+
+
+def _dump_record(dump: BrainDump) -> dict[str, Any]:
+    return {
+        "record_type": "dump",
+        "id": str(dump.id),
+        "parent_id": None,
+        "user_id": dump.user_id,
+        "created_at": dump.created_at.isoformat(),
+        "energy_level": dump.energy_level,
+        "source": dump.source,
+        "word_count": dump.word_count,
+        "text": dump.input_text,
+    }
+
+
+def _run_record(run: TriageRun) -> dict[str, Any]:
+    return {
+        "record_type": "run",
+        "id": str(run.id),
+        "parent_id": str(run.dump_id),
+        "user_id": run.user_id,
+        "created_at": run.created_at.isoformat(),
+        "text": run.action_plan_md,
+        "model_name": run.model_name,
+        "prompt_version": run.prompt_version,
+        "latency_ms": run.latency_ms,
+        "token_in": run.token_in,
+        "token_out": run.token_out,
+        "blockers": run.blockers,
+        "top_3_task_ids": run.top_3_task_ids,
+    }
+
+
+def _task_record(task: TriageTask) -> dict[str, Any]:
+    return {
+        "record_type": "task",
+        "id": str(task.id),
+        "parent_id": str(task.triage_run_id),
+        "user_id": task.user_id,
+        "created_at": task.created_at.isoformat(),
+        "text": task.title,
+        "rank_order": task.rank_order,
+        "is_top3": task.is_top3,
+        "micro_steps": task.micro_steps,
+    }
+
+
+def history_queryset(user=None):
+    """Dumps oldest first, with runs and their tasks prefetched per iterator chunk."""
+    dumps = BrainDump.objects.order_by("created_at", "id").prefetch_related(
+        Prefetch(
+            "triage_runs",
+            queryset=TriageRun.objects.order_by("created_at").prefetch_related(
+                Prefetch("triage_tasks", queryset=TriageTask.objects.order_by("rank_order", "created_at"))
+            ),
+        )
+    )
+    if user is not None:
+        dumps = dumps.filter(user=user)
+    return dumps
+
+
+def iter_history_records(user=None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict[str, Any]]:
+    """Yield dump, run and task records in parent-before-child order."""
+    for dump in history_queryset(user).iterator(chunk_size=chunk_size):
+        yield _dump_record(dump)
+        for run in dump.triage_runs.all():
+            yield _run_record(run)
+            for task in run.triage_tasks.all():
+                yield _task_record(task)
+
+
+def iter_ndjson(records: Iterable[dict[str, Any]]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer streaming."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(records: Iterable[dict[str, Any]]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for record in records:
+        row = []
+        for column in CSV_COLUMNS:
+            value = record.get(column)
+            if isinstance(value, (list, dict)):
+                value = json.dumps(value, ensure_ascii=False)
+            row.append("" if value is None else value)
+        yield writer.writerow(row)
+
+
+def gzip_accepted(accept_encoding: str | None) -> bool:
+    """Whether an Accept-Encoding header allows gzip (q-values honored; "gzip;q=0" refuses it)."""
+    qualities = {}
+    for item in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def iter_encoded(lines: Iterable[str], gzip: bool = False) -> Iterator[bytes]:
+    """
+    UTF-8 encode lines into ~STREAM_BUFFER_BYTES chunks, optionally gzip-compressed on
+    the fly. Each gzip chunk ends with a sync flush, so the client receives it right away.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if gzip else None
+    buffer = bytearray()
+    for line in lines:
+        buffer += line.encode("utf-8")
+        if len(buffer) >= STREAM_BUFFER_BYTES:
+            if compressor:
+                chunk = compressor.compress(bytes(buffer)) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            else:
+                chunk = bytes(buffer)
+            buffer.clear()
+            yield chunk
+    tail = bytes(buffer)
+    if compressor:
+        tail = compressor.compress(tail) + compressor.flush()
+    if tail:
+        yield tail
+
+
+def stream_history(
+    user=None,
+    fmt: str = "ndjson",
+    gzip: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Byte stream of a user's (or everyone's, if user is None) full triage history."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    records = iter_history_records(user, chunk_size=chunk_size)
+    lines = iter_csv(records) if fmt == "csv" else iter_ndjson(records)
+    return iter_encoded(lines, gzip=gzip)
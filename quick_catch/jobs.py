@@ -0,0 +1,209 @@
+"""
+Database-backed triage queue.
+Bulk and API ingestion enqueue TriageJob rows instead of calling the model inline;
+run_triage_worker claims them with SELECT ... FOR UPDATE SKIP LOCKED so several
+workers can drain the queue in parallel without processing a dump twice.
+A claim is a lease: jobs still "running" QUICK_CATCH_JOB_LEASE_SECONDS after they
+were claimed (the worker died) are claimed again. Failed attempts are retried
+after an exponential backoff (run_after). A run and its job's completion are
+saved in one transaction, so a failure never leaves a partial run behind.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .ai import pack_batches, run_triage, run_triage_batch
+from .metrics import queue_wait
+from .models import TriageJob
+from .persistence import save_triage_result
+from .prompts import get_prompt, select_prompt
+from .tracing import add_span, span, trace
+
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_dumps(dumps, lane="bulk"):
+    """Create one queued TriageJob per dump (single INSERT)."""
+    jobs = [TriageJob(dump=dump, user_id=dump.user_id, lane=lane) for dump in dumps]
+    return TriageJob.objects.bulk_create(jobs)
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and another worker claimed it; this worker's result is discarded."""
+
+
+class TriageRequestFailed(Exception):
+    """The model request failed; the attempt is retried instead of saving an error run."""
+
+
+def retry_delay(attempts) -> timedelta:
+    base = getattr(settings, "QUICK_CATCH_JOB_RETRY_SECONDS", 30)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), 3600))
+
+
+def claim_jobs(limit, lane=None):
+    """
+    Atomically mark up to `limit` due jobs as running and return them (oldest first).
+    Due: queued with run_after in the past, or running with an expired lease.
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=getattr(settings, "QUICK_CATCH_JOB_LEASE_SECONDS", 900))
+    max_attempts = getattr(settings, "QUICK_CATCH_JOB_MAX_ATTEMPTS", 3)
+    with transaction.atomic():
+        # Crashed on its last attempt: give up instead of running it again.
+        TriageJob.objects.filter(status="running", started_at__lt=expired, attempts__gte=max_attempts).update(
+            status="failed", error_message="Worker lease expired", finished_at=now,
+        )
+        due = TriageJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status="queued", run_after__lte=now) | Q(status="running", started_at__lt=expired)
+        )
+        if lane:
+            due = due.filter(lane=lane)
+        ids = list(due.order_by("created_at").values_list("id", flat=True)[:limit])
+        if not ids:
+            return []
+        TriageJob.objects.filter(id__in=ids).update(
+            status="running",
+            started_at=now,
+            attempts=F("attempts") + 1,
+        )
+    return list(TriageJob.objects.filter(id__in=ids).select_related("dump", "dump__user").order_by("created_at"))
+
+
+def _finish(job, run=None, error=None):
+    """Record the attempt's outcome, if this worker still holds the job's lease (raises LeaseLost otherwise)."""
+    max_attempts = getattr(settings, "QUICK_CATCH_JOB_MAX_ATTEMPTS", 3)
+    now = timezone.now()
+    if error is None:
+        job.status = "done"
+    elif job.attempts < max_attempts:
+        job.status = "queued"
+        job.run_after = now + retry_delay(job.attempts)
+    else:
+        job.status = "failed"
+    job.triage_run = run
+    job.error_message = error
+    job.finished_at = now if job.status != "queued" else None
+    updated = TriageJob.objects.filter(pk=job.pk, status="running", started_at=job.started_at).update(
+        status=job.status,
+        triage_run=run,
+        error_message=error,
+        finished_at=job.finished_at,
+        run_after=job.run_after,
+    )
+    if not updated:
+        raise LeaseLost(job.pk)
+
+
+def _save_and_finish(job, result):
+    """Persist the run and mark the job done in one transaction (rolled back if the lease was lost)."""
+    if result.request_failed:
+        raise TriageRequestFailed(result.parse_error)
+    with transaction.atomic():
+        run = save_triage_result(job.dump, result)
+        _finish(job, run=run)
+    return run
+
+
+def _fail(job, error):
+    try:
+        _finish(job, error=error)
+    except LeaseLost:
+        logger.warning("Triage job %s was reclaimed by another worker; dropping its failure", job.id)
+
+
+def _wait_seconds(job):
+    return (job.started_at - job.created_at).total_seconds() if job.started_at else 0.0
+
+
+def process_job(job):
+    """Run triage for a claimed job and persist the result; failed attempts are re-queued."""
+    dump = job.dump
+    wait_seconds = _wait_seconds(job)
+    queue_wait.observe(wait_seconds, lane=job.lane)
+    try:
+        with trace():
+            add_span("queue.wait", -wait_seconds * 1000, wait_seconds * 1000)
+            with span("triage"):
+                result = run_triage(dump.input_text, dump.energy_level, select_prompt(dump.user_id))
+            return _save_and_finish(job, result)
+    except LeaseLost:
+        logger.warning("Triage job %s was reclaimed by another worker; discarding its result", job.id)
+        return None
+    except Exception as e:
+        logger.exception("Triage job %s failed", job.id)
+        _fail(job, str(e))
+        return None
+
+
+def process_packed(jobs, prompt):
+    """
+    Triage several jobs with one packed model call (see ai.run_triage_batch) and
+    persist one TriageRun per job. Each run's trace starts with the shared batch stages.
+    """
+    try:
+        with trace() as batch_trace:
+            with span("triage.batch"):
+                results = run_triage_batch(
+                    [(str(job.id), job.dump.input_text, job.dump.energy_level) for job in jobs],
+                    prompt,
+                )
+    except Exception:
+        logger.exception("Packed triage of %d jobs failed; processing individually", len(jobs))
+        return [process_job(job) for job in jobs]
+
+    runs = []
+    for job in jobs:
+        wait_seconds = _wait_seconds(job)
+        queue_wait.observe(wait_seconds, lane=job.lane)
+        try:
+            with trace(parent=batch_trace):
+                add_span("queue.wait", -wait_seconds * 1000, wait_seconds * 1000)
+                run = _save_and_finish(job, results[str(job.id)])
+        except LeaseLost:
+            logger.warning("Triage job %s was reclaimed by another worker; discarding its result", job.id)
+            run = None
+        except Exception as e:
+            logger.exception("Triage job %s failed", job.id)
+            _fail(job, str(e))
+            run = None
+        runs.append(run)
+    return runs
+
+
+def process_batch(limit=10, lane=None):
+    """
+    Claim and process one batch. Returns the number of jobs handled.
+    Small dumps from non-interactive lanes are packed into shared model calls
+    (QUICK_CATCH_BATCH_* settings); interactive jobs are always triaged one by one.
+    """
+    jobs = claim_jobs(limit, lane=lane)
+    max_dumps = getattr(settings, "QUICK_CATCH_BATCH_MAX_DUMPS", 1)
+    packable: dict[str, list] = {}
+    for job in jobs:
+        if job.lane == "interactive" or max_dumps < 2:
+            process_job(job)
+        else:
+            packable.setdefault(select_prompt(job.user_id).version, []).append(job)
+
+    for version, version_jobs in packable.items():
+        by_id = {str(job.id): job for job in version_jobs}
+        packs = pack_batches(
+            [(key, job.dump.input_text, job.dump.energy_level) for key, job in by_id.items()],
+            max_dumps=max_dumps,
+            max_tokens=getattr(settings, "QUICK_CATCH_BATCH_MAX_TOKENS", 2000),
+            max_dump_tokens=getattr(settings, "QUICK_CATCH_BATCH_MAX_DUMP_TOKENS", 400),
+        )
+        for pack in packs:
+            pack_jobs = [by_id[key] for key, _, _ in pack]
+            if len(pack_jobs) == 1:
+                process_job(pack_jobs[0])
+            else:
+                process_packed(pack_jobs, get_prompt(version))
+    return len(jobs)
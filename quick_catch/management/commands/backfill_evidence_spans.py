@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from quick_catch.alignment import DumpIndex, task_evidence
+from quick_catch.models import BrainDump, TriageTask
+
+
+class Command(BaseCommand):
+    help = "Align existing tasks with empty evidence_spans back to their brain dump text."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Re-align every task, not just ones without spans.")
+        parser.add_argument("--chunk-size", type=int, default=200, help="Dumps per transaction.")
+
+    def handle(self, *args, **options):
+        tasks = TriageTask.objects.all()
+        if not options["all"]:
+            tasks = tasks.filter(evidence_spans=[])
+        dumps = (
+            BrainDump.objects.filter(triage_runs__triage_tasks__in=tasks)
+            .distinct()
+            .order_by("created_at")
+            .only("id", "input_text")
+        )
+
+        dump_count = task_count = 0
+        chunk = []
+        for dump in dumps.iterator(chunk_size=options["chunk_size"]):
+            chunk.append(dump)
+            if len(chunk) >= options["chunk_size"]:
+                task_count += self._align(chunk, tasks)
+                dump_count += len(chunk)
+                chunk = []
+        if chunk:
+            task_count += self._align(chunk, tasks)
+            dump_count += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Aligned {task_count} task(s) across {dump_count} dump(s)."))
+
+    def _align(self, dumps, tasks):
+        by_dump = {dump.id: dump for dump in dumps}
+        now = timezone.now()
+        changed = []
+        indexes = {}
+        rows = tasks.filter(triage_run__dump_id__in=by_dump).select_related("triage_run").only(
+            "id", "title", "micro_steps", "evidence_spans", "triage_run__dump_id",
+        )
+        for task in rows:
+            dump_id = task.triage_run.dump_id
+            index = indexes.get(dump_id)
+            if index is None:
+                index = indexes[dump_id] = DumpIndex(by_dump[dump_id].input_text)
+            task.evidence_spans = task_evidence(index, task.title, task.micro_steps or [])
+            task.updated_at = now  # bulk_update bypasses auto_now; sync clients need the change
+            changed.append(task)
+        with transaction.atomic():
+            TriageTask.objects.bulk_update(changed, ["evidence_spans", "updated_at"], batch_size=500)
+        return len(changed)
@@ -0,0 +1,43 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from quick_catch.export import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, stream_history
+
+
+class Command(BaseCommand):
+    help = "Stream triage history (dumps, runs, tasks) as NDJSON or CSV with constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Email of the user to export (default: all users).")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+        parser.add_argument("--output", default="-", help="Output file path, or - for stdout.")
+        parser.add_argument("--gzip", action="store_true", help="Gzip-compress the output on the fly.")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            User = get_user_model()
+            try:
+                user = User.objects.get(email=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user with email {options['user']}")
+
+        chunks = stream_history(
+            user,
+            fmt=options["format"],
+            gzip=options["gzip"],
+            chunk_size=options["chunk_size"],
+        )
+        if options["output"] == "-":
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+            return
+        with open(options["output"], "wb") as out:
+            for chunk in chunks:
+                out.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported to {options['output']}"))
@@ -0,0 +1,34 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from quick_catch.models import TriageRun
+from quick_catch.tracing import trace_events
+
+
+class Command(BaseCommand):
+    help = "Export stored triage stage timings in Trace Event Format (open in Perfetto or chrome://tracing)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default="-", help="Output file path, or - for stdout.")
+        parser.add_argument("--days", type=int, default=1, help="Only runs created in the last N days.")
+        parser.add_argument("--limit", type=int, default=500, help="Maximum number of runs (most recent first).")
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options["days"])
+        runs = (
+            TriageRun.objects.filter(created_at__gte=since)
+            .exclude(trace=[])
+            .only("id", "created_at", "model_name", "prompt_version", "trace")
+            .order_by("-created_at")[: options["limit"]]
+        )
+        data = trace_events(runs)
+        if options["output"] == "-":
+            self.stdout.write(json.dumps(data, separators=(",", ":")))
+            return
+        with open(options["output"], "w") as out:
+            json.dump(data, out, separators=(",", ":"))
+        runs_count = sum(1 for e in data["traceEvents"] if e["ph"] == "M")
+        self.stderr.write(self.style.SUCCESS(f"Exported {runs_count} run traces to {options['output']}"))
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from quick_catch.digests import queue_daily_digests
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue daily digest emails for opted-in users whose local digest hour falls in the next window. "
+        "Run hourly (e.g. from cron); already queued digests are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hour", type=int, default=None, help="Local send hour 0-23 (default: QUICK_CATCH_DIGEST_HOUR).")
+        parser.add_argument("--window-hours", type=float, default=1.0, help="Look-ahead; should match the run interval.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Users per batch of queries.")
+
+    def handle(self, *args, **options):
+        created = queue_daily_digests(
+            hour=options["hour"],
+            window=timedelta(hours=options["window_hours"]),
+            chunk_size=options["chunk_size"],
+        )
+        for send_at, count in created.items():
+            self.stdout.write(f"{send_at:%Y-%m-%d %H:%M} UTC: queued {count} digest(s).")
+        self.stdout.write(self.style.SUCCESS(f"Queued {sum(created.values())} digest(s)."))
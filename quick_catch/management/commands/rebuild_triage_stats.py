@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from quick_catch.stats import rebuild_buckets, report_window
+
+
+class Command(BaseCommand):
+    help = "Rebuild hourly triage performance buckets from triage_runs (e.g. after a backfill)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Only rebuild buckets for the last N days (default: all history).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        since = report_window(options["days"]) if options["days"] else None
+        count = rebuild_buckets(since=since, chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt hourly stats from {count} triage runs."))
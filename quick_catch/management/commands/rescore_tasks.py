@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from quick_catch import task_queue
+from quick_catch.models import TriageRun, TriageTask
+from quick_catch.scoring import SCORE_FIELDS, SCORE_VERSION, apply_scores, user_category_priors
+
+
+class Command(BaseCommand):
+    help = "Recompute local task scores (rank, friction, energy, minutes, category) for tasks scored by an older SCORE_VERSION."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Rescore every task, not just outdated ones.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Runs per transaction.")
+
+    def handle(self, *args, **options):
+        runs = TriageRun.objects.order_by("created_at").select_related("dump")
+        if not options["all"]:
+            outdated = Q(score_version__isnull=True) | Q(score_version__lt=SCORE_VERSION)
+            runs = runs.filter(id__in=TriageTask.objects.filter(outdated).values("triage_run_id"))
+
+        priors: dict = {}
+        run_count = task_count = 0
+        chunk = []
+        for run in runs.iterator(chunk_size=options["chunk_size"]):
+            chunk.append(run)
+            if len(chunk) >= options["chunk_size"]:
+                task_count += self._rescore(chunk, priors)
+                run_count += len(chunk)
+                chunk = []
+        if chunk:
+            task_count += self._rescore(chunk, priors)
+            run_count += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Rescored {task_count} task(s) in {run_count} run(s) (v{SCORE_VERSION})."))
+
+    def _rescore(self, runs, priors):
+        tasks_by_run: dict = {}
+        for task in TriageTask.objects.filter(triage_run__in=runs).order_by():
+            tasks_by_run.setdefault(task.triage_run_id, []).append(task)
+        now = timezone.now()
+        changed = []
+        for run in runs:
+            tasks = tasks_by_run.get(run.id, [])
+            if run.user_id not in priors:
+                priors[run.user_id] = user_category_priors(run.user_id)
+            apply_scores(tasks, run.dump.energy_level, priors[run.user_id])
+            for task in tasks:
+                task.updated_at = now  # bulk_update bypasses auto_now; sync clients need the change
+            changed.extend(tasks)
+        with transaction.atomic():
+            TriageTask.objects.bulk_update(changed, SCORE_FIELDS, batch_size=500)
+        # bulk_update sends no signals: drop the affected Redis queues so they rebuild with the new scores.
+        task_queue.invalidate_users({run.user_id for run in runs})
+        return len(changed)
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quick_catch.jobs import process_batch
+from quick_catch.models import JOB_LANE_CHOICES
+
+
+class Command(BaseCommand):
+    help = "Process queued triage jobs (bulk/API ingestion). Safe to run several instances in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lane", choices=JOB_LANE_CHOICES, default=None, help="Only process this lane.")
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Process a single batch and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            handled = process_batch(limit=options["batch_size"], lane=options["lane"])
+            if handled:
+                self.stdout.write(f"Processed {handled} triage job(s).")
+            if options["once"]:
+                return
+            if not handled:
+                time.sleep(options["sleep"])
@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from quick_catch.emails import send_batch
+from quick_catch.models import EMAIL_KIND_CHOICES
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails in batches. Safe to run several instances in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Emails claimed and sent per connection (default: QUICK_CATCH_EMAIL_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--max-per-second",
+            type=float,
+            default=None,
+            help="Send rate cap for this worker, 0 = unlimited (default: QUICK_CATCH_EMAIL_MAX_PER_SECOND).",
+        )
+        parser.add_argument(
+            "--kind",
+            choices=EMAIL_KIND_CHOICES,
+            default=None,
+            help="Only send this kind, e.g. a dedicated low-latency worker for auth emails.",
+        )
+        parser.add_argument("--sleep", type=float, default=5.0, help="Seconds to wait when nothing is due.")
+        parser.add_argument("--once", action="store_true", help="Send a single batch and exit.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"] or getattr(settings, "QUICK_CATCH_EMAIL_BATCH_SIZE", 50)
+        rate = options["max_per_second"]
+        if rate is None:
+            rate = getattr(settings, "QUICK_CATCH_EMAIL_MAX_PER_SECOND", 0)
+        while True:
+            started = time.monotonic()
+            sent, failed = send_batch(limit=batch_size, kind=options["kind"])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} email(s), {failed} failed.")
+            if options["once"]:
+                return
+            if not (sent or failed):
+                time.sleep(options["sleep"])
+            elif rate > 0:
+                time.sleep(max(0.0, (sent + failed) / rate - (time.monotonic() - started)))
@@ -0,0 +1,75 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Imports the entry point and resolves the URLconf (what a worker does before serving its first request).
+BOOT_SNIPPET = "import {module}; from django.urls import get_resolver; get_resolver().url_patterns"
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """`-X importtime` output -> [(module, self_us, cumulative_us, depth)] in import order."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            rows.append((name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip())) // 2))
+        except ValueError:
+            continue  # header line
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile cold start: per-module import time (python -X importtime) for config.wsgi or config.asgi "
+        "plus URLconf loading, and wall-clock boot time checked against QUICK_CATCH_BOOT_BUDGET_MS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entry", choices=("wsgi", "asgi"), default="wsgi")
+        parser.add_argument("--top", type=int, default=25, help="Modules to list.")
+        parser.add_argument("--sort", choices=("cumulative", "self"), default="cumulative")
+        parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreter boots to time.")
+        parser.add_argument("--budget-ms", type=float, default=None, help="Fail if the median boot exceeds this.")
+
+    def _run(self, code, *flags):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings")}
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, *flags, "-c", code], env=env, cwd=settings.BASE_DIR, capture_output=True, text=True
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if proc.returncode:
+            raise CommandError(f"Boot failed:\n{proc.stderr[-2000:]}")
+        return elapsed_ms, proc.stderr
+
+    def handle(self, *args, **options):
+        code = BOOT_SNIPPET.format(module=f"config.{options['entry']}")
+
+        _, stderr = self._run(code, "-X", "importtime")
+        rows = parse_importtime(stderr)
+        index = 2 if options["sort"] == "cumulative" else 1
+        total_us = sum(r[1] for r in rows)
+        self.stdout.write(f"{len(rows)} modules imported, {total_us / 1000:.0f} ms self time in total")
+        self.stdout.write(f"{'self ms':>9} {'cum ms':>9}  module")
+        for name, self_us, cumulative_us, _ in sorted(rows, key=lambda r: -r[index])[:options["top"]]:
+            self.stdout.write(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+
+        baseline_ms, _ = self._run("pass")
+        boots = [self._run(code)[0] - baseline_ms for _ in range(max(1, options["repeat"]))]
+        median = statistics.median(boots)
+        self.stdout.write(
+            f"Boot (config.{options['entry']} + URLconf, interpreter start subtracted): "
+            f"median {median:.0f} ms, min {min(boots):.0f} ms over {len(boots)} run(s)"
+        )
+        budget = options["budget_ms"] or getattr(settings, "QUICK_CATCH_BOOT_BUDGET_MS", None)
+        if budget:
+            if median > budget:
+                raise CommandError(f"Boot median {median:.0f} ms exceeds the {budget:.0f} ms budget.")
+            self.stdout.write(self.style.SUCCESS(f"Within the {budget:.0f} ms boot budget."))
@@ -0,0 +1,81 @@
+import zlib
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from quick_catch.classifier import (
+    DURATION_BUCKETS,
+    NaiveBayesHead,
+    count_features,
+    duration_bucket,
+    hashed_features,
+    save_artifact,
+)
+from quick_catch.models import TriageTask
+
+
+class Command(BaseCommand):
+    help = (
+        "Train the local category/duration classifier from manually labelled tasks "
+        "(admin corrections) and write the .npz artifact."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Artifact path (default: QUICK_CATCH_CLASSIFIER_PATH).")
+        parser.add_argument(
+            "--include-rules",
+            action="store_true",
+            help="Also learn from rule-scored labels (by default only manual labels are used).",
+        )
+        parser.add_argument("--min-examples", type=int, default=20, help="Minimum examples per class to keep it.")
+        parser.add_argument("--alpha", type=float, default=1.0, help="Laplace smoothing.")
+        parser.add_argument("--holdout", type=int, default=10, help="Percent of tasks held out to report accuracy.")
+
+    def handle(self, *args, **options):
+        output = options["output"] or settings.QUICK_CATCH_CLASSIFIER_PATH
+        if not output:
+            raise CommandError("No --output and QUICK_CATCH_CLASSIFIER_PATH is not set.")
+        sources = ["manual"] + (["rules"] if options["include_rules"] else [])
+        rows = (
+            TriageTask.objects.filter(labels_source__in=sources)
+            .order_by()
+            .values_list("id", "title", "micro_steps", "category", "estimated_minutes")
+        )
+
+        train = {"category": [], "estimated_minutes": []}
+        test = {"category": [], "estimated_minutes": []}
+        for task_id, title, micro_steps, category, minutes in rows.iterator(chunk_size=2000):
+            features = hashed_features(title, micro_steps or [])
+            # Deterministic split by task id, so reruns report comparable accuracy.
+            split = test if zlib.crc32(task_id.bytes) % 100 < options["holdout"] else train
+            if category:
+                split["category"].append((features, category))
+            if minutes:
+                split["estimated_minutes"].append((features, DURATION_BUCKETS[duration_bucket(minutes)]))
+
+        heads = {}
+        for field, examples in train.items():
+            counts: dict = {}
+            for _, label in examples:
+                counts[label] = counts.get(label, 0) + 1
+            classes = sorted(label for label, n in counts.items() if n >= options["min_examples"])
+            if len(classes) < 2:
+                self.stdout.write(self.style.WARNING(f"{field}: not enough labelled examples; head skipped."))
+                continue
+            kept = [(f, label) for f, label in examples if label in classes]
+            feature_counts, class_counts = count_features(kept, classes)
+            heads[field] = (classes, feature_counts, class_counts)
+
+            held_out = [(f, label) for f, label in test[field] if label in classes]
+            summary = ", ".join(f"{c}={counts[c]}" for c in classes)
+            if held_out:
+                head = NaiveBayesHead(classes, feature_counts, class_counts, options["alpha"])
+                predictions = head.predict([f for f, _ in held_out])
+                accuracy = sum(p == label for (p, _), (_, label) in zip(predictions, held_out)) / len(held_out)
+                summary += f"; holdout accuracy {accuracy:.1%} on {len(held_out)}"
+            self.stdout.write(f"{field}: {len(kept)} example(s) ({summary})")
+
+        if not heads:
+            raise CommandError("Nothing to train; artifact not written.")
+        save_artifact(output, heads, alpha=options["alpha"], meta={"sources": ",".join(sources)})
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
@@ -0,0 +1,327 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Updates are plain dict operations under one uncontended lock, so they are cheap
+enough for the request and triage hot paths. To aggregate across worker
+processes, a daemon thread in each process writes a snapshot of its cumulative
+values to QUICK_CATCH_METRICS_DIR every FLUSH_INTERVAL_SECONDS (one JSON file per
+pid, replaced atomically); the /metrics view sums every snapshot and deletes those
+of pids that no longer exist, so the directory must not be shared between hosts.
+Counters of an exited process disappear with it, which Prometheus treats as a
+counter reset. Without a metrics dir, only the serving process's own values are
+exposed.
+"""
+
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count
+
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+TRIAGE_LATENCY_BUCKETS = (0.5, 1, 2, 4, 8, 15, 30, 60, 120, 300)
+QUEUE_WAIT_BUCKETS = (1, 5, 15, 30, 60, 300, 900, 3600)
+
+FLUSH_INTERVAL_SECONDS = 5.0
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry, name, help_text, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels):
+        return (self.name, tuple(str(labels.get(n, "")) for n in self.labelnames))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        self.registry._add(self._key(labels), amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, help_text, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.registry._observe(self._key(labels), index, len(self.buckets) + 1, value)
+
+
+class Gauge(_Metric):
+    """Value computed at scrape time by a collector callable returning {label tuple: value}."""
+
+    kind = "gauge"
+
+    def __init__(self, registry, name, help_text, labelnames=(), collect=None):
+        super().__init__(registry, name, help_text, labelnames)
+        self.collect = collect
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._values: dict[tuple, float] = {}
+        self._histograms: dict[tuple, list] = {}  # key -> [bucket counts..., sum]
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+        os.register_at_fork(after_in_child=self._forked)
+
+    # -- definition ---------------------------------------------------------
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(self, name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, labelnames=(), collect=None):
+        return self._register(Gauge(self, name, help_text, labelnames, collect))
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    # -- hot path -----------------------------------------------------------
+
+    def _add(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def _observe(self, key, index, size, value):
+        with self._lock:
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * size + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    # -- multi-process snapshots -------------------------------------------
+
+    def _metrics_dir(self):
+        return getattr(settings, "QUICK_CATCH_METRICS_DIR", None)
+
+    def _start_flusher(self):
+        """Start this process's snapshot thread (once per pid; a forked child needs its own)."""
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        if self._metrics_dir():
+            threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL_SECONDS)
+            self.flush()
+
+    def _forked(self):
+        # The child starts from zero: the parent's values are still reported in the parent's snapshot.
+        self._lock = threading.Lock()
+        self._values.clear()
+        self._histograms.clear()
+        self._flusher_pid = None
+
+    def _snapshot(self):
+        with self._lock:
+            return {
+                "values": [[k[0], list(k[1]), v] for k, v in self._values.items()],
+                "histograms": [[k[0], list(k[1]), list(c)] for k, c in self._histograms.items()],
+            }
+
+    def flush(self):
+        """Write this process's cumulative values to its snapshot file (if a metrics dir is set)."""
+        directory = self._metrics_dir()
+        if not directory:
+            return
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._snapshot(), f, separators=(",", ":"))
+            os.replace(tmp_path, os.path.join(directory, f"metrics-{os.getpid()}.json"))
+        except OSError:
+            pass  # metrics must never break the request path
+
+    def _collect_snapshots(self):
+        directory = self._metrics_dir()
+        if not directory:
+            return [self._snapshot()]
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+            try:
+                pid = int(os.path.basename(path)[len("metrics-"):-len(".json")])
+                if not _pid_alive(pid):
+                    os.remove(path)
+                    continue
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    # -- exposition ---------------------------------------------------------
+
+    def render(self) -> str:
+        """All metrics, summed across process snapshots, in Prometheus text format 0.0.4."""
+        values: dict[tuple, float] = {}
+        histograms: dict[tuple, list] = {}
+        for snap in self._collect_snapshots():
+            for name, labels, value in snap.get("values", []):
+                key = (name, tuple(labels))
+                values[key] = values.get(key, 0.0) + value
+            for name, labels, counts in snap.get("histograms", []):
+                key = (name, tuple(labels))
+                merged = histograms.get(key)
+                if merged is None or len(merged) != len(counts):
+                    histograms[key] = list(counts)
+                else:
+                    histograms[key] = [a + b for a, b in zip(merged, counts)]
+
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if isinstance(metric, Gauge):
+                series = metric.collect() if metric.collect else {}
+                for label_values, value in series.items():
+                    lines.append(f"{metric.name}{_labels(metric.labelnames, label_values)} {_num(value)}")
+            elif isinstance(metric, Histogram):
+                for (name, label_values), counts in sorted(histograms.items()):
+                    if name != metric.name:
+                        continue
+                    cumulative = 0
+                    for bound, n in zip(metric.buckets + ("+Inf",), counts[:-1]):
+                        cumulative += n
+                        le = bound if bound == "+Inf" else _num(bound)
+                        labels = _labels(metric.labelnames + ("le",), label_values + (le,))
+                        lines.append(f"{name}_bucket{labels} {cumulative}")
+                    labels = _labels(metric.labelnames, label_values)
+                    lines.append(f"{name}_sum{labels} {_num(counts[-1])}")
+                    lines.append(f"{name}_count{labels} {cumulative}")
+            else:
+                for (name, label_values), value in sorted(values.items()):
+                    if name == metric.name:
+                        lines.append(f"{name}{_labels(metric.labelnames, label_values)} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _num(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+registry = MetricsRegistry()
+
+
+def _queue_depth():
+    from .models import TriageJob
+
+    rows = TriageJob.objects.filter(status="queued").order_by().values_list("lane").annotate(n=Count("id"))
+    return {(lane,): n for lane, n in rows}
+
+
+triage_latency = registry.histogram(
+    "quick_catch_triage_latency_seconds",
+    "Model call latency per triage run.",
+    ("model", "backend"),
+    buckets=TRIAGE_LATENCY_BUCKETS,
+)
+triage_parse_failures = registry.counter(
+    "quick_catch_triage_parse_failures_total",
+    "Triage responses that did not contain valid JSON.",
+    ("model",),
+)
+queue_depth = registry.gauge(
+    "quick_catch_triage_queue_depth",
+    "Queued triage jobs per lane (read from the database at scrape time).",
+    ("lane",),
+    collect=_queue_depth,
+)
+queue_wait = registry.histogram(
+    "quick_catch_triage_queue_wait_seconds",
+    "Time triage jobs spent queued before a worker claimed them.",
+    ("lane",),
+    buckets=QUEUE_WAIT_BUCKETS,
+)
+ollama_http_errors = registry.counter(
+    "quick_catch_ollama_http_errors_total",
+    "Failed Ollama /api/chat requests by HTTP status (or timeout/connection).",
+    ("status",),
+)
+cache_requests = registry.counter(
+    "quick_catch_cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ("cache", "result"),
+)
+emails_sent = registry.counter(
+    "quick_catch_emails_total",
+    "Outbox delivery attempts by result (sent, retry, failed).",
+    ("result",),
+)
+email_delivery_latency = registry.histogram(
+    "quick_catch_email_delivery_latency_seconds",
+    "Time from queueing an outbox email to its delivery, by kind (digests excluded).",
+    ("kind",),
+    buckets=QUEUE_WAIT_BUCKETS,
+)
+turnstile_verifications = registry.counter(
+    "turnstile_verifications_total",
+    "Turnstile checks by result (success, failure, cached, missing, replayed, error_allowed, error_rejected).",
+    ("result",),
+)
+turnstile_latency = registry.histogram(
+    "turnstile_siteverify_seconds",
+    "Cloudflare siteverify round trip (including timeouts).",
+)
+view_db_time = registry.histogram(
+    "quick_catch_view_db_seconds",
+    "Database time per request, by view.",
+    ("view",),
+)
+
+
+def record_cache(cache_name: str, hit: bool) -> None:
+    cache_requests.inc(cache=cache_name, result="hit" if hit else "miss")
@@ -0,0 +1,104 @@
+"""
+Per-request query count, DB time and total time.
+Adds a Server-Timing header (when enabled) and keeps a rolling in-process
+summary per view, readable with timing_summary().
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import view_db_time
+
+
+# Requests remembered per view for the rolling summary
+SUMMARY_WINDOW = 500
+
+_samples: dict[str, deque] = {}
+_samples_lock = threading.Lock()
+
+
+def _view_samples(view_name: str) -> deque:
+    samples = _samples.get(view_name)
+    if samples is None:
+        with _samples_lock:
+            samples = _samples.setdefault(view_name, deque(maxlen=SUMMARY_WINDOW))
+    return samples
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def timing_summary() -> dict[str, dict[str, float]]:
+    """Rolling per-view stats over the last SUMMARY_WINDOW requests of this process."""
+    summary = {}
+    for view_name, samples in list(_samples.items()):
+        rows = list(samples)
+        if not rows:
+            continue
+        queries = [r[0] for r in rows]
+        db_ms = [r[1] for r in rows]
+        total_ms = [r[2] for r in rows]
+        summary[view_name] = {
+            "requests": len(rows),
+            "queries_avg": sum(queries) / len(rows),
+            "queries_max": max(queries),
+            "db_ms_avg": sum(db_ms) / len(rows),
+            "total_ms_avg": sum(total_ms) / len(rows),
+            "total_ms_p95": _percentile(total_ms, 0.95),
+        }
+    return summary
+
+
+class _QueryRecorder:
+    """connection.execute_wrapper callable that counts queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestTimingMiddleware:
+    """Record query count, DB time and total time for every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header_enabled = getattr(settings, "QUICK_CATCH_SERVER_TIMING", settings.DEBUG)
+
+    def __call__(self, request):
+        recorder = _QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = recorder.duration * 1000
+
+        match = getattr(request, "resolver_match", None)
+        view_name = (match.view_name or match._func_path) if match else "unresolved"
+        _view_samples(view_name).append((recorder.count, db_ms, total_ms))
+        view_db_time.observe(recorder.duration, view=view_name)
+        request.timing = {"view": view_name, "queries": recorder.count, "db_ms": db_ms, "total_ms": total_ms}
+
+        user = getattr(request, "user", None)
+        if self.header_enabled or (user is not None and user.is_staff):
+            response["Server-Timing"] = (
+                f'db;dur={db_ms:.1f};desc="{recorder.count} queries", '
+                f"app;dur={total_ms - db_ms:.1f}, total;dur={total_ms:.1f}"
+            )
+        return response
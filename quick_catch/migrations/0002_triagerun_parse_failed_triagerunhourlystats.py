@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triagerun',
+            name='parse_failed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='TriageRunHourlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('model_name', models.CharField(max_length=128)),
+                ('prompt_version', models.CharField(max_length=32)),
+                ('run_count', models.PositiveIntegerField(default=0)),
+                ('parse_failure_count', models.PositiveIntegerField(default=0)),
+                ('latency_count', models.PositiveIntegerField(default=0)),
+                ('latency_sum_ms', models.BigIntegerField(default=0)),
+                ('latency_histogram', models.JSONField(default=list, help_text='Run counts per latency bucket (see quick_catch.stats.LATENCY_BUCKETS_MS).')),
+                ('token_in_sum', models.BigIntegerField(default=0)),
+                ('token_out_sum', models.BigIntegerField(default=0)),
+                ('token_latency_sum_ms', models.BigIntegerField(default=0, help_text='Latency of runs that reported token_out (for tokens per second).')),
+            ],
+            options={
+                'verbose_name_plural': 'triage run hourly stats',
+                'db_table': 'triage_run_hourly_stats',
+                'ordering': ['-hour'],
+                'constraints': [models.UniqueConstraint(fields=('hour', 'model_name', 'prompt_version'), name='triage_run_hourly_stats_uniq')],
+            },
+        ),
+    ]
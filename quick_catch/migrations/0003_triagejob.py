@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:21
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0002_triagerun_parse_failed_triagerunhourlystats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TriageJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('lane', models.CharField(choices=[('interactive', 'interactive'), ('bulk', 'bulk')], default='bulk', max_length=16)),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], default='queued', max_length=16)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('dump', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='triage_jobs', to='quick_catch.braindump')),
+                ('triage_run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='quick_catch.triagerun')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='triage_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'triage_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'lane', 'created_at'], name='triage_jobs_status_lane_idx'), models.Index(fields=['user', '-created_at'], name='triage_jobs_user_created_idx')],
+            },
+        ),
+    ]
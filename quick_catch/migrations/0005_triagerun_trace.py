@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0004_updated_at_synctombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triagerun',
+            name='trace',
+            field=models.JSONField(blank=True, default=list, help_text='Stage timings: [[name, start_ms, duration_ms, depth], ...] (see quick_catch.tracing).'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0005_triagerun_trace'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triagerun',
+            name='prompt_tokens_saved',
+            field=models.PositiveIntegerField(blank=True, help_text='Estimated prompt tokens removed by input compression (see quick_catch.compression).', null=True),
+        ),
+        migrations.AddField(
+            model_name='triagerunhourlystats',
+            name='tokens_saved_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0006_prompt_tokens_saved'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triagerun',
+            name='num_ctx',
+            field=models.PositiveIntegerField(blank=True, help_text='Context window bucket requested from the model (see quick_catch.tokens.NUM_CTX_BUCKETS).', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0007_triagerun_num_ctx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triagetask',
+            name='score_version',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='quick_catch.scoring.SCORE_VERSION that produced the local scores.', null=True),
+        ),
+    ]
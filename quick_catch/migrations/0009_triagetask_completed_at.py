@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0008_triagetask_score_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triagetask',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='triagetask',
+            index=models.Index(fields=['user', 'completed_at', '-rank_score'], name='triage_tasks_user_open_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0009_triagetask_completed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triagetask',
+            name='labels_source',
+            field=models.CharField(blank=True, choices=[('rules', 'rules'), ('classifier', 'classifier'), ('llm', 'llm'), ('manual', 'manual')], help_text='Where category / estimated_minutes came from (rules, classifier, llm, manual).', max_length=16, null=True),
+        ),
+    ]
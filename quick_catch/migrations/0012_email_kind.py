@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0011_email_dispatch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='email',
+            name='kind',
+            field=models.CharField(choices=[('triage', 'triage'), ('digest', 'digest')], default='triage', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(fields=['user', 'kind', 'send_after'], name='emails_user_kind_send_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0012_email_kind'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='email',
+            name='kind',
+            field=models.CharField(choices=[('triage', 'triage'), ('digest', 'digest'), ('auth', 'auth')], default='triage', max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='email',
+            name='triage_run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='emails', to='quick_catch.triagerun'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    """Profiles are now created with the user; give existing users without one a default profile."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Profile = apps.get_model("quick_catch", "Profile")
+    missing = User.objects.filter(quick_catch_profile__isnull=True).values_list("pk", flat=True)
+    batch = []
+    for user_id in missing.iterator(chunk_size=2000):
+        batch.append(Profile(user_id=user_id))
+        if len(batch) >= 2000:
+            Profile.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    Profile.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0013_email_auth_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
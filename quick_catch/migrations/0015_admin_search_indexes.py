@@ -0,0 +1,77 @@
+from django.db import migrations, models
+
+# Standalone created_at indexes for changelist ordering and date range filters, and
+# to_email for exact address search.
+BTREE_INDEXES = [
+    ("braindump", models.Index(fields=["-created_at"], name="brain_dumps_created_idx")),
+    ("triagerun", models.Index(fields=["-created_at"], name="triage_runs_created_idx")),
+    ("triagejob", models.Index(fields=["-created_at"], name="triage_jobs_created_idx")),
+    ("triagetask", models.Index(fields=["-created_at"], name="triage_tasks_created_idx")),
+    ("email", models.Index(fields=["-created_at"], name="emails_created_idx")),
+    ("email", models.Index(fields=["to_email"], name="emails_to_email_idx")),
+]
+
+# PostgreSQL only: pg_trgm GIN indexes behind the admin's icontains search. Django compiles
+# icontains to UPPER("col"::text) LIKE UPPER(%s), so the index is on that expression.
+# Not part of the model state, as other databases cannot build them.
+TRIGRAM_INDEXES = [
+    ("brain_dumps_input_trgm_idx", "brain_dumps", "input_text"),
+    ("triage_runs_summary_trgm_idx", "triage_runs", "summary_one_liner"),
+    ("triage_runs_plan_trgm_idx", "triage_runs", "action_plan_md"),
+    ("triage_tasks_title_trgm_idx", "triage_tasks", "title"),
+    ("emails_subject_trgm_idx", "emails", "subject"),
+    ("emails_to_email_trgm_idx", "emails", "to_email"),
+]
+
+
+def add_btree_indexes(apps, schema_editor):
+    # CONCURRENTLY on PostgreSQL so large tables keep taking writes while the index builds.
+    kwargs = {"concurrently": True} if schema_editor.connection.vendor == "postgresql" else {}
+    for model_name, index in BTREE_INDEXES:
+        schema_editor.add_index(apps.get_model("quick_catch", model_name), index, **kwargs)
+
+
+def remove_btree_indexes(apps, schema_editor):
+    kwargs = {"concurrently": True} if schema_editor.connection.vendor == "postgresql" else {}
+    for model_name, index in BTREE_INDEXES:
+        schema_editor.remove_index(apps.get_model("quick_catch", model_name), index, **kwargs)
+
+
+def add_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('quick_catch', '0014_backfill_profiles'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index)
+                for model_name, index in BTREE_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(add_btree_indexes, remove_btree_indexes),
+            ],
+        ),
+        migrations.RunPython(add_trigram_indexes, remove_trigram_indexes),
+    ]
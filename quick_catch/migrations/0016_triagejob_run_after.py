@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:18
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0015_admin_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triagejob',
+            name='run_after',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='triagejob',
+            index=models.Index(fields=['status', 'run_after'], name='triage_jobs_status_due_idx'),
+        ),
+    ]
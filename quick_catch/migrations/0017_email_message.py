@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0016_triagejob_run_after'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='email',
+            name='message',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
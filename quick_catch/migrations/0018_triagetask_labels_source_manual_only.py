@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:33
+
+from django.db import migrations, models
+
+
+def drop_llm_source(apps, schema_editor):
+    """No prompt asks the model for labels; values it volunteered are not training data."""
+    TriageTask = apps.get_model("quick_catch", "TriageTask")
+    TriageTask.objects.filter(labels_source="llm").update(labels_source="rules")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quick_catch', '0017_email_message'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_llm_source, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='triagetask',
+            name='labels_source',
+            field=models.CharField(blank=True, choices=[('rules', 'rules'), ('classifier', 'classifier'), ('manual', 'manual')], help_text='Most trusted source of category / estimated_minutes (rules, classifier, manual).', max_length=16, null=True),
+        ),
+    ]
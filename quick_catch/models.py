@@ -2,13 +2,25 @@ import uuid
 
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 # Choice constants (match SQL check constraints)
 ENERGY_LEVELS = ("low", "medium", "high")
 SOURCE_CHOICES = ("web", "mobile", "api")
 EMAIL_STATUS_CHOICES = ("queued", "sent", "failed", "canceled")
+EMAIL_KIND_CHOICES = ("triage", "digest", "auth")
 NEURODIVERGENT_FOCUS_CHOICES = ("adhd", "autistic", "audhd", "unspecified")
+JOB_STATUS_CHOICES = ("queued", "running", "done", "failed")
+JOB_LANE_CHOICES = ("interactive", "bulk")
+# TriageTask.labels_source: the most trusted source that set category / estimated_minutes
+# (a field it did not set keeps the rule-based value). Only "manual" labels train the classifier.
+LABEL_SOURCES = ("rules", "classifier", "manual")
+
+
+def count_words(text):
+    """Whitespace-separated word count stored on BrainDump.word_count."""
+    return len(text.split()) if text and text.strip() else 0
 
 
 class Profile(models.Model):
@@ -57,6 +69,7 @@ class BrainDump(models.Model):
         related_name="brain_dumps",
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     energy_level = models.CharField(
         max_length=10,
@@ -80,6 +93,8 @@ class BrainDump(models.Model):
         db_table = "brain_dumps"
         indexes = [
             models.Index(fields=["user", "-created_at"], name="brain_dumps_user_created_idx"),
+            models.Index(fields=["user", "updated_at"], name="brain_dumps_user_updated_idx"),
+            models.Index(fields=["-created_at"], name="brain_dumps_created_idx"),
         ]
         ordering = ["-created_at"]
 
@@ -88,7 +103,7 @@ class BrainDump(models.Model):
 
     def save(self, *args, **kwargs):
         if self.input_text is not None:
-            self.word_count = len(self.input_text.split()) if self.input_text.strip() else 0
+            self.word_count = count_words(self.input_text)
         super().save(*args, **kwargs)
 
 
@@ -107,6 +122,7 @@ class TriageRun(models.Model):
         related_name="triage_runs",
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     model_name = models.CharField(max_length=128)
     prompt_version = models.CharField(max_length=32, default="v1")
@@ -127,9 +143,25 @@ class TriageRun(models.Model):
     summary_one_liner = models.CharField(max_length=512, null=True, blank=True)
 
     detected_crisis = models.BooleanField(default=False)  # type: ignore[assignment]
+    parse_failed = models.BooleanField(default=False)  # type: ignore[assignment]
     latency_ms = models.PositiveIntegerField(null=True, blank=True)
     token_in = models.PositiveIntegerField(null=True, blank=True)
     token_out = models.PositiveIntegerField(null=True, blank=True)
+    prompt_tokens_saved = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Estimated prompt tokens removed by input compression (see quick_catch.compression).",
+    )
+    num_ctx = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Context window bucket requested from the model (see quick_catch.tokens.NUM_CTX_BUCKETS).",
+    )
+    trace = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='Stage timings: [[name, start_ms, duration_ms, depth], ...] (see quick_catch.tracing).',
+    )
 
     class Meta:
         db_table = "triage_runs"
@@ -148,6 +180,14 @@ class TriageRun(models.Model):
                 fields=["user", "-created_at"],
                 name="triage_runs_user_created_idx",
             ),
+            models.Index(
+                fields=["user", "updated_at"],
+                name="triage_runs_user_updated_idx",
+            ),
+            models.Index(
+                fields=["-created_at"],
+                name="triage_runs_created_idx",
+            ),
         ]
         ordering = ["-created_at"]
 
@@ -155,6 +195,113 @@ class TriageRun(models.Model):
         return str(self.id)
 
 
+class TriageJob(models.Model):
+    """Queued triage for a brain dump; processed out of band by the run_triage_worker command."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    dump = models.ForeignKey(
+        BrainDump,
+        on_delete=models.CASCADE,
+        related_name="triage_jobs",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="triage_jobs",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    lane = models.CharField(
+        max_length=16,
+        choices=[(x, x) for x in JOB_LANE_CHOICES],
+        default="bulk",
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=[(x, x) for x in JOB_STATUS_CHOICES],
+        default="queued",
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Not claimed before this time (retry backoff after a failed attempt).
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    triage_run = models.ForeignKey(
+        TriageRun,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    error_message = models.TextField(null=True, blank=True)
+
+    class Meta:
+        db_table = "triage_jobs"
+        indexes = [
+            models.Index(
+                fields=["status", "lane", "created_at"],
+                name="triage_jobs_status_lane_idx",
+            ),
+            models.Index(
+                fields=["status", "run_after"],
+                name="triage_jobs_status_due_idx",
+            ),
+            models.Index(
+                fields=["user", "-created_at"],
+                name="triage_jobs_user_created_idx",
+            ),
+            models.Index(
+                fields=["-created_at"],
+                name="triage_jobs_created_idx",
+            ),
+        ]
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+
+class TriageRunHourlyStats(models.Model):
+    """
+    Pre-aggregated triage performance per hour, model and prompt version.
+    Maintained as runs are saved (see quick_catch.stats) so reports never scan triage_runs.
+    """
+
+    hour = models.DateTimeField()
+    model_name = models.CharField(max_length=128)
+    prompt_version = models.CharField(max_length=32)
+
+    run_count = models.PositiveIntegerField(default=0)
+    parse_failure_count = models.PositiveIntegerField(default=0)
+    latency_count = models.PositiveIntegerField(default=0)
+    latency_sum_ms = models.BigIntegerField(default=0)
+    latency_histogram = models.JSONField(
+        default=list,
+        help_text="Run counts per latency bucket (see quick_catch.stats.LATENCY_BUCKETS_MS).",
+    )
+    token_in_sum = models.BigIntegerField(default=0)
+    token_out_sum = models.BigIntegerField(default=0)
+    tokens_saved_sum = models.BigIntegerField(default=0)
+    token_latency_sum_ms = models.BigIntegerField(
+        default=0,
+        help_text="Latency of runs that reported token_out (for tokens per second).",
+    )
+
+    class Meta:
+        db_table = "triage_run_hourly_stats"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hour", "model_name", "prompt_version"],
+                name="triage_run_hourly_stats_uniq",
+            ),
+        ]
+        ordering = ["-hour"]
+        verbose_name_plural = "triage run hourly stats"
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} {self.model_name} {self.prompt_version}"
+
+
 class TriageTask(models.Model):
     """Extracted task from a triage run (1 run : many tasks)."""
 
@@ -170,6 +317,7 @@ class TriageTask(models.Model):
         related_name="triage_tasks",
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     title = models.CharField(max_length=512)
     micro_steps = models.JSONField(default=list)
@@ -207,6 +355,19 @@ class TriageTask(models.Model):
         default=list,
         help_text='e.g. [{"start": 120, "end": 180, "text": "..."}]',
     )
+    completed_at = models.DateTimeField(null=True, blank=True)
+    score_version = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text="quick_catch.scoring.SCORE_VERSION that produced the local scores.",
+    )
+    labels_source = models.CharField(
+        max_length=16,
+        choices=[(x, x) for x in LABEL_SOURCES],
+        null=True,
+        blank=True,
+        help_text="Most trusted source of category / estimated_minutes (rules, classifier, manual).",
+    )
 
     class Meta:
         db_table = "triage_tasks"
@@ -223,6 +384,18 @@ class TriageTask(models.Model):
                 fields=["user", "is_top3", "-created_at"],
                 name="triage_tasks_is_top3_idx",
             ),
+            models.Index(
+                fields=["user", "updated_at"],
+                name="triage_tasks_user_updated_idx",
+            ),
+            models.Index(
+                fields=["user", "completed_at", "-rank_score"],
+                name="triage_tasks_user_open_idx",
+            ),
+            models.Index(
+                fields=["-created_at"],
+                name="triage_tasks_created_idx",
+            ),
         ]
         ordering = ["triage_run", "rank_order"]
 
@@ -230,8 +403,33 @@ class TriageTask(models.Model):
         return str(self.title)[:50] if self.title else str(self.id)
 
 
+class SyncTombstone(models.Model):
+    """Deletion marker for mobile delta sync (see quick_catch.sync)."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="sync_tombstones",
+    )
+    kind = models.CharField(max_length=8)  # "dump", "run" or "task"
+    object_id = models.UUIDField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "sync_tombstones"
+        indexes = [
+            models.Index(
+                fields=["user", "deleted_at"],
+                name="sync_tombstones_user_del_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id}"
+
+
 class Email(models.Model):
-    """Email delivery log (e.g. 'Email me this' queue)."""
+    """Email outbox and delivery log ('Email me this', daily digests, auth emails)."""
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
@@ -242,14 +440,25 @@ class Email(models.Model):
     triage_run = models.ForeignKey(
         TriageRun,
         on_delete=models.CASCADE,
+        null=True,
+        blank=True,
         related_name="emails",
     )
     created_at = models.DateTimeField(auto_now_add=True)
-    send_after = models.DateTimeField(auto_now_add=True)
+    # Earliest delivery time; the dispatcher also pushes it forward to lease claimed rows and back off retries.
+    send_after = models.DateTimeField(default=timezone.now)
 
+    kind = models.CharField(
+        max_length=16,
+        choices=[(x, x) for x in EMAIL_KIND_CHOICES],
+        default="triage",
+    )
     to_email = models.EmailField()
     subject = models.CharField(max_length=512)
     body_md = models.TextField()
+    # Rest of a message queued through OutboxEmailBackend (sender, reply-to, headers,
+    # alternatives, attachments); see emails.serialize_message. Null for app-built emails.
+    message = models.JSONField(null=True, blank=True)
 
     status = models.CharField(
         max_length=16,
@@ -258,6 +467,8 @@ class Email(models.Model):
     )
     provider_message_id = models.CharField(max_length=256, null=True, blank=True)
     error_message = models.TextField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    sent_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = "emails"
@@ -270,6 +481,18 @@ class Email(models.Model):
                 fields=["user", "-created_at"],
                 name="emails_user_created_idx",
             ),
+            models.Index(
+                fields=["user", "kind", "send_after"],
+                name="emails_user_kind_send_idx",
+            ),
+            models.Index(
+                fields=["-created_at"],
+                name="emails_created_idx",
+            ),
+            models.Index(
+                fields=["to_email"],
+                name="emails_to_email_idx",
+            ),
         ]
         ordering = ["-created_at"]
 
@@ -0,0 +1,90 @@
+"""
+Persist AI triage output (TriageResult) as a TriageRun with its TriageTasks.
+Shared by the interactive dump view and the background triage worker.
+"""
+
+from django.db import transaction
+
+from . import task_queue
+from .ai import JSON_PARSE_FAILED
+from .alignment import DumpIndex, task_evidence
+from .models import TriageRun, TriageTask
+from .prompts import DEFAULT_PROMPT_VERSION
+from .tracing import current_trace, span
+
+
+def save_triage_result(dump, result):
+    """
+    Create TriageRun and TriageTasks from AI TriageResult (with the active trace, if any).
+    All or nothing: a failure part-way leaves no run behind.
+    """
+    with transaction.atomic():
+        with span("persist"):
+            run, tasks_by_index = _create_run_and_tasks(dump, result)
+        top_3_ids = [
+            str(tasks_by_index[i].id)
+            for i in result.top_3_indices
+            if i in tasks_by_index
+        ]
+        run.top_3_task_ids = top_3_ids
+        trace = current_trace()
+        run.trace = trace.to_json() if trace else []
+        run.save(update_fields=["top_3_task_ids", "trace", "updated_at"])
+        tasks = list(tasks_by_index.values())
+        transaction.on_commit(lambda: task_queue.add_tasks(dump.user_id, dump.id, tasks))
+    return run
+
+
+def _create_run_and_tasks(dump, result):
+    run = TriageRun.objects.create(
+        dump=dump,
+        user=dump.user,
+        prompt_version=result.prompt_version or DEFAULT_PROMPT_VERSION,
+        model_name=result.model_name,
+        temperature=result.temperature if result.temperature is not None else 0.2,
+        action_plan_md=result.action_plan,
+        blockers=result.blockers,
+        top_3_task_ids=[],  # set after tasks exist
+        parse_failed=result.parse_error == JSON_PARSE_FAILED,
+        latency_ms=result.latency_ms,
+        token_in=result.token_in,
+        token_out=result.token_out,
+        num_ctx=result.num_ctx,
+        prompt_tokens_saved=result.compressed.tokens_saved if result.compressed else None,
+    )
+    tasks_by_index = {}
+    for i, item in enumerate(result.extracted_tasks):
+        if not isinstance(item, dict):
+            continue
+        title = (item.get("title") or "").strip() or f"Task {i + 1}"
+        micro_steps = item.get("micro_steps")
+        if not isinstance(micro_steps, list):
+            micro_steps = []
+        micro_steps = [str(s) for s in micro_steps][:20]
+        is_top3 = i in result.top_3_indices
+        rank_order = (result.top_3_indices.index(i) + 1) if is_top3 else None
+        tasks_by_index[i] = TriageTask(
+            triage_run=run,
+            user=dump.user,
+            title=title,
+            micro_steps=micro_steps,
+            is_top3=is_top3,
+            rank_order=rank_order,
+        )
+    if tasks_by_index:
+        with span("align"):
+            index = DumpIndex(dump.input_text)
+            for task in tasks_by_index.values():
+                task.evidence_spans = task_evidence(index, task.title, task.micro_steps)
+    if tasks_by_index:
+        # Deferred: scoring/classifier pull in numpy (~150 ms), which web workers should not pay at boot.
+        from .classifier import classify_tasks
+        from .scoring import apply_scores, user_category_priors
+
+        with span("score"):
+            apply_scores(tasks_by_index.values(), dump.energy_level, user_category_priors(dump.user_id))
+        with span("classify"):
+            classify_tasks(tasks_by_index.values())
+        TriageTask.objects.bulk_create(tasks_by_index.values())
+    return run, tasks_by_index
+
@@ -0,0 +1,130 @@
+"""
+Versioned triage prompts.
+Each PromptVersion bundles the system prompt, the user message template and the
+model options it was tuned with. Traffic is split between versions by
+QUICK_CATCH_PROMPT_WEIGHTS (e.g. {"v1": 90, "v2": 10}); a user always lands on
+the same version for a given weight table, so per-version stats
+(TriageRunHourlyStats is keyed by prompt_version) compare like with like.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.conf import settings
+
+
+DEFAULT_PROMPT_VERSION = "v1"
+
+# Hash space for traffic splitting; weights are scaled onto it.
+SPLIT_BUCKETS = 10_000
+
+
+@dataclass(frozen=True)
+class PromptVersion:
+    version: str
+    system: str
+    user_template: str  # str.format() with {energy} and {dump_text}
+    options: dict[str, Any] = field(default_factory=dict)
+
+    def build_messages(self, dump_text: str, energy_level: str) -> list[dict[str, str]]:
+        energy = (energy_level or "").strip().upper() or "MEDIUM"
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user_template.format(energy=energy, dump_text=dump_text)},
+        ]
+
+    @property
+    def temperature(self) -> float:
+        return self.options.get("temperature", 0.2)
+
+
+V1_SYSTEM = """You are a cognitive triage engine for neurodivergent founders.
+Input is an unfiltered brain dump.
+Your job:
+1. Extract all actionable tasks.
+2. Identify the 3 most important tasks (based on urgency, consequences, and cognitive load).
+3. Detect hidden blockers, emotional friction, or avoidance triggers.
+4. Reshape tasks into "micro-missions" based on user energy:
+   - LOW energy → tiny, non-intimidating wins
+   - MEDIUM energy → steady progress tasks
+   - HIGH energy → leverage high-focus tasks
+5. Produce a "10-Minute Action Plan" that removes overwhelm.
+
+Tone: calm, non-judgmental, shame-free, concise.
+
+You MUST respond with exactly one JSON object and no other text before or after. Use this schema:
+{
+  "extracted_tasks": [{"title": "string", "micro_steps": ["string"]}],
+  "top_3_indices": [0, 1, 2],
+  "blockers": ["string"],
+  "action_plan": "markdown string for the 10-Minute Action Plan"
+}
+- extracted_tasks: all actionable tasks from the dump; each has "title" and "micro_steps" (array of short steps).
+- top_3_indices: zero-based indices into extracted_tasks for the 3 most important.
+- blockers: list of detected blockers/emotional friction/avoidance.
+- action_plan: single markdown string, calm and concise."""
+
+V1_USER = """Brain dump (energy level: {energy}):
+
+{dump_text}
+
+Return only the JSON object as specified. No markdown code fence, no explanation."""
+
+# Same schema and tone as v1 in roughly half the prompt tokens.
+V2_SYSTEM = """Triage a neurodivergent founder's brain dump. Calm, shame-free, concise.
+Extract every actionable task as a small micro-mission sized to the stated energy
+(LOW: tiny wins, MEDIUM: steady progress, HIGH: deep focus), pick the 3 most
+important by urgency, consequences and cognitive load, name blockers or avoidance,
+and write a 10-minute action plan.
+Reply with one JSON object only:
+{"extracted_tasks":[{"title":"","micro_steps":[""]}],"top_3_indices":[0,1,2],"blockers":[""],"action_plan":"markdown"}
+top_3_indices are zero-based indices into extracted_tasks."""
+
+V2_USER = """Energy: {energy}
+{dump_text}"""
+
+
+PROMPTS: dict[str, PromptVersion] = {
+    p.version: p
+    for p in (
+        PromptVersion("v1", V1_SYSTEM, V1_USER, {"temperature": 0.2}),
+        PromptVersion("v2", V2_SYSTEM, V2_USER, {"temperature": 0.2}),
+    )
+}
+
+
+def get_prompt(version: str | None = None) -> PromptVersion:
+    """Registered prompt by version (the default version for None or unknown versions)."""
+    return PROMPTS.get(version or DEFAULT_PROMPT_VERSION) or PROMPTS[DEFAULT_PROMPT_VERSION]
+
+
+def prompt_weights() -> dict[str, int]:
+    weights = getattr(settings, "QUICK_CATCH_PROMPT_WEIGHTS", None) or {DEFAULT_PROMPT_VERSION: 100}
+    return {v: int(w) for v, w in weights.items() if v in PROMPTS and int(w) > 0}
+
+
+def split_bucket(user_id, salt: str = "") -> int:
+    """Stable bucket in [0, SPLIT_BUCKETS) for a user (independent of process and hash seed)."""
+    digest = hashlib.blake2b(f"{salt}:{user_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % SPLIT_BUCKETS
+
+
+def select_prompt(user_id=None) -> PromptVersion:
+    """
+    Prompt version for a user according to QUICK_CATCH_PROMPT_WEIGHTS.
+    Anonymous calls (user_id None) get the default version.
+    """
+    weights = prompt_weights()
+    if user_id is None or not weights:
+        return get_prompt()
+    if len(weights) == 1:
+        return get_prompt(next(iter(weights)))
+    total = sum(weights.values())
+    point = split_bucket(user_id, getattr(settings, "QUICK_CATCH_PROMPT_SPLIT_SALT", "")) * total / SPLIT_BUCKETS
+    cumulative = 0
+    for version, weight in sorted(weights.items()):
+        cumulative += weight
+        if point < cumulative:
+            return get_prompt(version)
+    return get_prompt()
@@ -0,0 +1,177 @@
+"""
+Local, deterministic task scoring.
+Fills TriageTask.rank_score, friction_score, best_energy, estimated_minutes and
+category from task text, micro-step counts, the dump's energy level and the
+user's history, without asking the model for extra output. All tasks of a run
+are scored at once with NumPy array operations.
+
+Bump SCORE_VERSION whenever the formula or lexicons change, then run the
+rescore_tasks management command to recompute stored scores.
+"""
+
+import re
+from dataclasses import dataclass
+
+import numpy as np
+from django.db.models import Count, Q
+
+from .models import ENERGY_LEVELS, TriageTask
+
+
+SCORE_VERSION = 1
+
+# TriageTask fields written by apply_scores (for bulk_update).
+SCORE_FIELDS = (
+    "rank_score", "friction_score", "best_energy", "estimated_minutes", "category",
+    "rank_order", "score_version", "labels_source", "updated_at",
+)
+# labels_source values whose category / estimated_minutes rescoring must not overwrite.
+KEPT_LABEL_SOURCES = ("classifier", "manual")
+
+CATEGORY_KEYWORDS = {
+    "admin": ("form", "paperwork", "renew", "register", "file", "submit", "tax", "insurance", "passport", "appointment"),
+    "finance": ("invoice", "pay", "bill", "budget", "bank", "refund", "expense", "payroll", "quote", "price"),
+    "sales": ("client", "customer", "lead", "pitch", "demo", "proposal", "deal", "prospect", "follow up", "outreach"),
+    "dev": ("bug", "deploy", "code", "fix", "release", "api", "database", "test", "merge", "server", "feature"),
+    "comms": ("email", "reply", "call", "message", "text", "slack", "meeting", "respond", "schedule"),
+    "health": ("doctor", "dentist", "gym", "workout", "sleep", "meds", "therapy", "walk", "run", "eat"),
+    "personal": ("mom", "dad", "family", "friend", "birthday", "gift", "clean", "laundry", "groceries", "home"),
+}
+CATEGORIES = tuple(CATEGORY_KEYWORDS)
+
+# Words that signal dread, confrontation or open-ended work (raise friction).
+AVERSIVE_KEYWORDS = (
+    "tax", "call", "confront", "apologize", "ask", "fire", "negotiate", "chase", "overdue",
+    "dentist", "doctor", "complain", "cancel", "decide", "figure out", "deal with", "sort out",
+)
+URGENT_KEYWORDS = (
+    "today", "tonight", "asap", "urgent", "now", "deadline", "overdue", "tomorrow", "due", "before",
+)
+
+# Typical minutes per micro-step by category (index aligned with CATEGORIES, then "uncategorized").
+MINUTES_PER_STEP = np.array([8.0, 7.0, 10.0, 20.0, 5.0, 15.0, 10.0, 10.0])
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+@dataclass
+class TaskScores:
+    rank_score: float
+    friction_score: float
+    best_energy: str
+    estimated_minutes: int
+    category: str | None
+
+
+def _keyword_hits(texts: list[str], word_sets: list[set[str]], keywords) -> np.ndarray:
+    """Count distinct keywords per text (multi-word keywords match as phrases)."""
+    return np.array([
+        sum(1 for k in keywords if (k in text if " " in k else k in words))
+        for text, words in zip(texts, word_sets)
+    ], dtype=float)
+
+
+def user_category_priors(user_id) -> dict[str, float]:
+    """Share of the user's past tasks in each category that made the top 3 (smoothed)."""
+    if user_id is None:
+        return {}
+    rows = (
+        TriageTask.objects.filter(user_id=user_id, category__isnull=False)
+        .order_by()
+        .values("category")
+        .annotate(n=Count("id"), top=Count("id", filter=Q(is_top3=True)))
+    )
+    return {row["category"]: (row["top"] + 1) / (row["n"] + 3) for row in rows}
+
+
+def score_tasks(
+    titles: list[str],
+    micro_steps: list[list[str]],
+    energy_level: str = "medium",
+    top3_mask: list[bool] | None = None,
+    priors: dict[str, float] | None = None,
+) -> list[TaskScores]:
+    n = len(titles)
+    if not n:
+        return []
+    texts = [
+        " ".join([str(title)] + [str(s) for s in steps]).lower()
+        for title, steps in zip(titles, micro_steps)
+    ]
+    words = [_WORD_RE.findall(t) for t in texts]
+    word_sets = [set(w) for w in words]
+    step_counts = np.array([len(steps) for steps in micro_steps], dtype=float)
+    word_counts = np.array([len(w) for w in words], dtype=float)
+
+    # Category: keyword hit matrix (tasks x categories), argmax; no hits -> uncategorized.
+    hit_matrix = np.stack([_keyword_hits(texts, word_sets, CATEGORY_KEYWORDS[c]) for c in CATEGORIES], axis=1)
+    best = hit_matrix.argmax(axis=1)
+    has_category = hit_matrix.max(axis=1) > 0
+    category_index = np.where(has_category, best, len(CATEGORIES))
+
+    aversive = _keyword_hits(texts, word_sets, AVERSIVE_KEYWORDS)
+    urgent = _keyword_hits(texts, word_sets, URGENT_KEYWORDS)
+
+    # Friction 0..10: dread words, vague scope (few steps for many words), sheer size.
+    vagueness = word_counts / (step_counts + 1)
+    friction = np.clip(2.0 + 2.2 * aversive + 0.25 * vagueness + 0.3 * np.maximum(step_counts - 4, 0), 0, 10)
+
+    minutes = np.clip(MINUTES_PER_STEP[category_index] * np.maximum(step_counts, 1) * (1 + friction / 20), 5, 240)
+    minutes = (np.round(minutes / 5) * 5).astype(int)
+
+    energy_index = np.select([friction >= 6.5, minutes >= 60, (friction < 3.5) & (minutes <= 15)], [2, 2, 0], 1)
+    best_energy = [ENERGY_LEVELS[i] for i in energy_index]
+
+    current = ENERGY_LEVELS.index(energy_level) if energy_level in ENERGY_LEVELS else 1
+    energy_fit = 1.0 - np.abs(energy_index - current) / 2
+    prior = np.array([
+        (priors or {}).get(CATEGORIES[i], 0.33) if i < len(CATEGORIES) else 0.33
+        for i in category_index
+    ])
+    top3 = np.array(top3_mask if top3_mask is not None else [False] * n, dtype=float)
+
+    rank = (
+        40 * top3
+        + 12 * np.minimum(urgent, 2)
+        + 15 * energy_fit
+        + 15 * prior
+        + 10 * (1 - friction / 10)
+        + 8 * (1 - minutes / 240)
+    )
+    return [
+        TaskScores(
+            rank_score=round(float(rank[i]), 3),
+            friction_score=round(float(friction[i]), 2),
+            best_energy=best_energy[i],
+            estimated_minutes=int(minutes[i]),
+            category=CATEGORIES[category_index[i]] if has_category[i] else None,
+        )
+        for i in range(n)
+    ]
+
+
+def apply_scores(tasks, energy_level: str, priors: dict[str, float] | None = None) -> None:
+    """
+    Score TriageTask instances in place; non-top-3 tasks get rank_order 4.. by descending score.
+    category / estimated_minutes set by the classifier, the LLM or a person are kept.
+    """
+    tasks = list(tasks)
+    scores = score_tasks(
+        [t.title for t in tasks],
+        [t.micro_steps or [] for t in tasks],
+        energy_level,
+        [t.is_top3 for t in tasks],
+        priors,
+    )
+    for task, s in zip(tasks, scores):
+        task.rank_score = s.rank_score
+        task.friction_score = s.friction_score
+        task.best_energy = s.best_energy
+        if task.labels_source not in KEPT_LABEL_SOURCES:
+            task.estimated_minutes = s.estimated_minutes
+            task.category = s.category
+            task.labels_source = "rules"
+        task.score_version = SCORE_VERSION
+    others = sorted((t for t in tasks if not t.is_top3), key=lambda t: -t.rank_score)
+    for order, task in enumerate(others, start=4):
+        task.rank_order = order
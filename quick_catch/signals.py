@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.turnstile import turnstile_checked
+
+from . import task_queue
+from .caching import latest_run_cache, profile_cache
+from .metrics import turnstile_latency, turnstile_verifications
+from .models import BrainDump, Profile, TriageRun, TriageTask
+from .stats import record_run
+from .sync import record_tombstone
+
+
+@receiver(post_save, sender=TriageRun)
+def triage_run_saved(sender, instance, created, raw=False, **kwargs):
+    """Fold new runs into the hourly performance buckets once the run is committed."""
+    if created and not raw:
+        transaction.on_commit(lambda: record_run(instance))
+
+
+@receiver(post_delete, sender=BrainDump)
+@receiver(post_delete, sender=TriageRun)
+@receiver(post_delete, sender=TriageTask)
+def synced_row_deleted(sender, instance, origin=None, **kwargs):
+    """Leave a tombstone so sync clients drop the row (not needed when the whole user is deleted)."""
+    if isinstance(origin, get_user_model()):
+        return
+    record_tombstone(instance)
+
+
+@receiver(post_save, sender=TriageTask)
+def triage_task_saved(sender, instance, raw=False, **kwargs):
+    """Keep the user's Redis open-tasks queue in step with edits, completions and rescoring."""
+    if not raw:
+        # Only reuse an already-loaded run; refresh_task reads dump_id itself if the queue needs it.
+        dump_id = instance.triage_run.dump_id if TriageTask.triage_run.is_cached(instance) else None
+        transaction.on_commit(lambda: task_queue.refresh_task(instance, dump_id))
+
+
+@receiver(post_delete, sender=TriageTask)
+def triage_task_deleted(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, get_user_model()):
+        return
+    user_id, task_id = instance.user_id, instance.id  # delete() clears instance.id before commit
+    transaction.on_commit(lambda: task_queue.remove_task(user_id, task_id))
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: task_queue.invalidate_users([user_id]))
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    """Create the Quick Catch profile with the user, so request paths only ever read it."""
+    if created and not raw:
+        Profile.objects.create(user=instance)
+
+
+def _invalidate(cache, key):
+    cache.invalidate(key)
+    # Again after commit: a concurrent reader may have cached the old row in between.
+    transaction.on_commit(lambda: cache.invalidate(key))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    _invalidate(profile_cache, instance.user_id)
+
+
+@receiver(post_save, sender=TriageRun)
+@receiver(post_delete, sender=TriageRun)
+def latest_run_changed(sender, instance, **kwargs):
+    _invalidate(latest_run_cache, instance.dump_id)
+
+
+@receiver(turnstile_checked)
+def turnstile_counted(sender, result, seconds=None, **kwargs):
+    """The auth app reports CAPTCHA checks; the metrics live here with the other Prometheus series."""
+    turnstile_verifications.inc(result=result)
+    if seconds is not None:
+        turnstile_latency.observe(seconds)
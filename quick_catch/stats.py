@@ -0,0 +1,233 @@
+"""
+Hourly performance buckets for triage runs.
+Each saved TriageRun is folded into one TriageRunHourlyStats row keyed by
+(hour, model_name, prompt_version). Reports merge buckets instead of scanning
+triage_runs, so they stay fast regardless of how many runs exist.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TriageRun, TriageRunHourlyStats
+
+
+# Upper bounds (ms) of the latency histogram buckets; one extra overflow bucket follows.
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 4000, 8000, 15000, 30000, 60000, 120000, 300000)
+
+REPORT_GROUPS = ("model_name", "prompt_version", "hour")
+
+
+def _empty_histogram() -> list[int]:
+    return [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+
+def _bucket_index(latency_ms: int) -> int:
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if latency_ms <= bound:
+            return i
+    return len(LATENCY_BUCKETS_MS)
+
+
+def truncate_to_hour(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def record_run(run: TriageRun) -> None:
+    """Fold one run into its hourly bucket (row-locked read-modify-write)."""
+    hour = truncate_to_hour(run.created_at or timezone.now())
+    with transaction.atomic():
+        bucket, _ = TriageRunHourlyStats.objects.select_for_update().get_or_create(
+            hour=hour,
+            model_name=run.model_name,
+            prompt_version=run.prompt_version,
+        )
+        _add_run(bucket, run)
+        bucket.save()
+
+
+def _add_run(bucket: TriageRunHourlyStats, run: TriageRun) -> None:
+    histogram = list(bucket.latency_histogram or []) or _empty_histogram()
+    bucket.run_count += 1
+    if run.parse_failed:
+        bucket.parse_failure_count += 1
+    if run.latency_ms is not None:
+        bucket.latency_count += 1
+        bucket.latency_sum_ms += run.latency_ms
+        histogram[_bucket_index(run.latency_ms)] += 1
+        if run.token_out:
+            bucket.token_out_sum += run.token_out
+            bucket.token_latency_sum_ms += run.latency_ms
+    if run.token_in:
+        bucket.token_in_sum += run.token_in
+    if run.prompt_tokens_saved:
+        bucket.tokens_saved_sum += run.prompt_tokens_saved
+    bucket.latency_histogram = histogram
+
+
+def rebuild_buckets(since: datetime | None = None, chunk_size: int = 2000) -> int:
+    """Recompute buckets from triage_runs (for backfills). Returns the number of runs folded in."""
+    runs = TriageRun.objects.order_by().only(
+        "created_at", "model_name", "prompt_version", "parse_failed",
+        "latency_ms", "token_in", "token_out", "prompt_tokens_saved",
+    )
+    existing = TriageRunHourlyStats.objects.all()
+    if since is not None:
+        since = truncate_to_hour(since)
+        runs = runs.filter(created_at__gte=since)
+        existing = existing.filter(hour__gte=since)
+
+    buckets: dict[tuple, TriageRunHourlyStats] = {}
+    count = 0
+    for run in runs.iterator(chunk_size=chunk_size):
+        key = (truncate_to_hour(run.created_at), run.model_name, run.prompt_version)
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TriageRunHourlyStats(
+                hour=key[0], model_name=key[1], prompt_version=key[2],
+                latency_histogram=_empty_histogram(),
+            )
+        _add_run(bucket, run)
+        count += 1
+
+    with transaction.atomic():
+        existing.delete()
+        TriageRunHourlyStats.objects.bulk_create(buckets.values(), batch_size=500)
+    return count
+
+
+def percentile(histogram: list[int], q: float) -> float | None:
+    """Estimate the q-th quantile (0..1) in ms by interpolating within histogram buckets."""
+    total = sum(histogram)
+    if not total:
+        return None
+    target = q * total
+    cumulative = 0
+    for i, n in enumerate(histogram):
+        if not n:
+            continue
+        if cumulative + n >= target:
+            if i >= len(LATENCY_BUCKETS_MS):
+                return float(LATENCY_BUCKETS_MS[-1])
+            lower = LATENCY_BUCKETS_MS[i - 1] if i else 0
+            upper = LATENCY_BUCKETS_MS[i]
+            return lower + (upper - lower) * (target - cumulative) / n
+        cumulative += n
+    return float(LATENCY_BUCKETS_MS[-1])
+
+
+@dataclass
+class ReportRow:
+    """Merged buckets for one report group."""
+
+    key: tuple
+    run_count: int = 0
+    parse_failure_count: int = 0
+    latency_count: int = 0
+    latency_sum_ms: int = 0
+    token_in_sum: int = 0
+    token_out_sum: int = 0
+    tokens_saved_sum: int = 0
+    token_latency_sum_ms: int = 0
+    window_hours: float = 1.0
+    histogram: list[int] = field(default_factory=_empty_histogram)
+
+    def add(self, bucket: TriageRunHourlyStats) -> None:
+        self.run_count += bucket.run_count
+        self.parse_failure_count += bucket.parse_failure_count
+        self.latency_count += bucket.latency_count
+        self.latency_sum_ms += bucket.latency_sum_ms
+        self.token_in_sum += bucket.token_in_sum
+        self.token_out_sum += bucket.token_out_sum
+        self.tokens_saved_sum += bucket.tokens_saved_sum
+        self.token_latency_sum_ms += bucket.token_latency_sum_ms
+        for i, n in enumerate(bucket.latency_histogram or []):
+            if i < len(self.histogram):
+                self.histogram[i] += n
+
+    @property
+    def labels(self) -> list[str]:
+        return [f"{v:%Y-%m-%d %H:00}" if isinstance(v, datetime) else str(v) for v in self.key]
+
+    @property
+    def p50_ms(self):
+        return percentile(self.histogram, 0.50)
+
+    @property
+    def p95_ms(self):
+        return percentile(self.histogram, 0.95)
+
+    @property
+    def p99_ms(self):
+        return percentile(self.histogram, 0.99)
+
+    @property
+    def avg_latency_ms(self):
+        return self.latency_sum_ms / self.latency_count if self.latency_count else None
+
+    @property
+    def parse_failure_rate(self):
+        return self.parse_failure_count / self.run_count if self.run_count else None
+
+    @property
+    def avg_token_in(self):
+        """Mean prompt (prefill) tokens per answered run."""
+        return self.token_in_sum / self.latency_count if self.latency_count else None
+
+    @property
+    def avg_token_out(self):
+        return self.token_out_sum / self.latency_count if self.latency_count else None
+
+    @property
+    def avg_tokens_saved(self):
+        """Mean prompt tokens removed by input compression per run."""
+        return self.tokens_saved_sum / self.run_count if self.run_count else None
+
+    @property
+    def tokens_per_second(self):
+        if not self.token_latency_sum_ms:
+            return None
+        return self.token_out_sum / (self.token_latency_sum_ms / 1000)
+
+    @property
+    def runs_per_hour(self):
+        return self.run_count / self.window_hours if self.window_hours else 0
+
+
+def performance_report(
+    since: datetime,
+    group_by: tuple[str, ...] = ("model_name", "prompt_version"),
+    model_name: str | None = None,
+    prompt_version: str | None = None,
+) -> list[ReportRow]:
+    """
+    Merge hourly buckets since `since` into one row per group, busiest groups first
+    (newest first when grouped by hour).
+    """
+    group_by = tuple(g for g in group_by if g in REPORT_GROUPS) or ("model_name",)
+    buckets = TriageRunHourlyStats.objects.filter(hour__gte=truncate_to_hour(since))
+    if model_name:
+        buckets = buckets.filter(model_name=model_name)
+    if prompt_version:
+        buckets = buckets.filter(prompt_version=prompt_version)
+
+    if "hour" in group_by:
+        window_hours = 1.0
+    else:
+        window_hours = max((timezone.now() - since).total_seconds() / 3600, 1.0)
+    rows: dict[tuple, ReportRow] = defaultdict(lambda: ReportRow(key=(), window_hours=window_hours))
+    for bucket in buckets.iterator():
+        key = tuple(getattr(bucket, g) for g in group_by)
+        row = rows[key]
+        row.key = key
+        row.add(bucket)
+    if "hour" in group_by:
+        return sorted(rows.values(), key=lambda r: r.key, reverse=True)
+    return sorted(rows.values(), key=lambda r: r.run_count, reverse=True)
+
+
+def report_window(days: int) -> datetime:
+    return timezone.now() - timedelta(days=days)
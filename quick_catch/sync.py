@@ -0,0 +1,191 @@
+"""
+Delta sync for offline-capable clients.
+A server-issued cursor marks the last change a client has seen in each stream as an
+(updated_at, id) keyset position; each sync returns only BrainDump, TriageRun and
+TriageTask rows after it, plus tombstones for deletions, in a compact positional
+encoding (field names are sent once per response in "k"). Rows are read through
+the (user, updated_at) indexes.
+"""
+
+import base64
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.http import parse_etags
+
+from .models import BrainDump, SyncTombstone, TriageRun, TriageTask
+
+
+# Field order of each positional row, sent to the client as "k".
+SYNC_FIELDS = {
+    "d": ("id", "created_at", "updated_at", "energy_level", "source", "word_count", "input_text"),
+    "r": (
+        "id", "dump_id", "created_at", "updated_at", "model_name", "prompt_version",
+        "summary_one_liner", "action_plan_md", "blockers", "top_3_task_ids",
+    ),
+    "t": (
+        "id", "triage_run_id", "created_at", "updated_at", "title", "micro_steps",
+        "rank_order", "is_top3", "best_energy", "estimated_minutes", "category", "completed_at",
+    ),
+    "x": ("kind", "id", "deleted_at"),
+}
+SYNC_MODELS = {"d": BrainDump, "r": TriageRun, "t": TriageTask}
+TOMBSTONE_KINDS = {BrainDump: "d", TriageRun: "r", TriageTask: "t"}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# Row types and the tombstone stream ("x"), each paged by its own (timestamp, id) position.
+STREAMS = (*SYNC_MODELS, "x")
+
+
+def _micros(dt: datetime) -> int:
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def encode_cursor(positions: dict) -> str:
+    """
+    Cursor for per-stream keyset positions {key: (timestamp, id)}. A None id means
+    "every row at or after timestamp"; otherwise rows after (timestamp, id) are returned.
+    """
+    data = {key: [_micros(dt), str(last_id or "")] for key, (dt, last_id) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if isinstance(data, int):
+            # Cursor from before keyset paging: one timestamp for every stream.
+            data = {key: [data, ""] for key in STREAMS}
+        positions = {}
+        for key in STREAMS:
+            micros, last_id = data[key]
+            if last_id:
+                last_id = int(last_id) if key == "x" else uuid.UUID(last_id)
+            positions[key] = (EPOCH + timedelta(microseconds=int(micros)), last_id or None)
+        return positions
+    except (ValueError, TypeError, KeyError, UnicodeDecodeError, OverflowError, OSError):
+        raise InvalidCursor(cursor)
+
+
+def _epoch_ms(dt):
+    return int(dt.timestamp() * 1000) if dt else None
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return _epoch_ms(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _stream(user, key):
+    """(queryset, timestamp field) for one stream of the user's rows."""
+    if key == "x":
+        return SyncTombstone.objects.filter(user=user), "deleted_at"
+    return SYNC_MODELS[key].objects.filter(user=user), "updated_at"
+
+
+def _after(qs, field, position):
+    """Rows strictly after a keyset position (served by the (user, timestamp) indexes)."""
+    if position is None:
+        return qs
+    dt, last_id = position
+    if last_id is None:
+        return qs.filter(**{f"{field}__gte": dt})
+    return qs.filter(Q(**{f"{field}__gt": dt}) | Q(**{field: dt, "pk__gt": last_id}))
+
+
+def _rows(user, key, position, limit):
+    """Up to `limit` encoded rows after `position`, and the position of the last one if truncated."""
+    qs, field = _stream(user, key)
+    columns = ("kind", "object_id", "deleted_at") if key == "x" else SYNC_FIELDS[key]
+    raw = list(_after(qs, field, position).order_by(field, "pk").values_list("pk", field, *columns)[: limit + 1])
+    rows = [[_encode_value(v) for v in row[2:]] for row in raw[:limit]]
+    if len(raw) > limit:
+        return rows, (raw[limit - 1][1], raw[limit - 1][0])
+    return rows, None
+
+
+def build_sync_payload(user, cursor: str | None = None) -> dict:
+    """
+    Changes for `user` since `cursor` (None = full snapshot). If any row type is
+    truncated by SYNC_PAGE_SIZE, "m" is 1 and the client should call again with "c".
+    Cursors older than the tombstone retention window trigger a full snapshot ("z": 1).
+    """
+    limit = getattr(settings, "QUICK_CATCH_SYNC_PAGE_SIZE", 500)
+    retention = timedelta(days=getattr(settings, "QUICK_CATCH_SYNC_TOMBSTONE_DAYS", 30))
+    overlap = timedelta(seconds=getattr(settings, "QUICK_CATCH_SYNC_OVERLAP_SECONDS", 5))
+    now = timezone.now()
+
+    positions = decode_cursor(cursor) if cursor else None
+    # Only the tombstone position matters: older rows may be paged through, but deletions
+    # before the retention window are gone.
+    if positions is not None and positions["x"][0] < now - retention:
+        positions = None
+
+    payload = {"k": {key: list(fields) for key, fields in SYNC_FIELDS.items()}, "z": int(positions is None)}
+    next_positions = {}
+    more = False
+    for key in STREAMS:
+        position = positions.get(key) if positions else None
+        if key == "x" and positions is None:
+            payload[key], truncated = [], None  # a full snapshot has nothing to delete
+        else:
+            payload[key], truncated = _rows(user, key, position, limit)
+        if truncated:
+            next_positions[key] = truncated
+            more = True
+        else:
+            # Step back a little so rows committed by in-flight transactions are not skipped.
+            next_positions[key] = (now - overlap, None)
+            if position is not None and position[0] >= now - overlap:
+                next_positions[key] = position
+    payload["m"] = int(more)
+    payload["c"] = encode_cursor(next_positions)
+    return payload
+
+
+def sync_etag(user, cursor: str | None = None) -> str:
+    """
+    ETag for the delta after `cursor`, from one aggregate per stream (count and newest
+    timestamp) instead of the rows, so an unchanged delta is answered with 304 before
+    the payload is built. Every change moves updated_at or adds a tombstone.
+    """
+    positions = decode_cursor(cursor) if cursor else {}
+    state = [cursor or ""]
+    for key in STREAMS:
+        qs, field = _stream(user, key)
+        stats = _after(qs, field, positions.get(key)).aggregate(n=Count("pk"), last=Max(field))
+        state.append([stats["n"], _micros(stats["last"]) if stats["last"] else None])
+    body = json.dumps(state, separators=(",", ":"))
+    return '"' + hashlib.blake2b(body.encode(), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    """Weak comparison of `etag` against an If-None-Match list (RFC 9110 13.1.2)."""
+    candidates = parse_etags(if_none_match or "")
+    return "*" in candidates or etag.removeprefix("W/") in (c.removeprefix("W/") for c in candidates)
+
+
+def record_tombstone(instance) -> None:
+    kind = TOMBSTONE_KINDS.get(type(instance))
+    if kind is not None:
+        SyncTombstone.objects.create(user_id=instance.user_id, kind=kind, object_id=instance.pk)
+
+
+def prune_tombstones() -> int:
+    retention = timedelta(days=getattr(settings, "QUICK_CATCH_SYNC_TOMBSTONE_DAYS", 30))
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=timezone.now() - retention).delete()
+    return deleted
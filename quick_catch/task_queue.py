@@ -0,0 +1,261 @@
+"""
+Per-user priority queue of open tasks across all dumps.
+
+With a Redis cache backend each user has one sorted set per energy level
+(member = task id, score = board_score for that energy) plus a hash of compact
+task payloads, so the open-tasks board and "next best task" are a single
+round trip (a small Lua script reads the ranked ids and their payloads). The structure is updated when runs are saved,
+kept in step with TriageTask saves and deletes (signals.triage_task_changed), dropped
+after bulk rescoring (invalidate_users), and rebuilt from the database on first use,
+when its "built" marker expires (QUICK_CATCH_TASK_QUEUE_SECONDS), or when a truncated
+queue runs short of tasks.
+Without Redis, or if Redis is unreachable, the same ranking is computed with one
+indexed query over the user's open triage_tasks rows.
+"""
+
+import json
+import logging
+
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from .models import ENERGY_LEVELS, TriageRun, TriageTask
+
+
+logger = logging.getLogger(__name__)
+
+# Open tasks kept per user in Redis; when a user has more, the queue is marked
+# "partial" and rebuilt from the database once a read finds it short.
+MAX_QUEUED_TASKS = 500
+# Score penalty per energy step between a task's best_energy and the user's current energy.
+ENERGY_MISMATCH_PENALTY = 10.0
+
+# Ranked ids and their payloads in one round trip; nil when the user's queue has not
+# been built (or has expired), or is partial and holds fewer than the requested tasks.
+TOP_TASKS_SCRIPT = """
+local built = redis.call('GET', KEYS[3])
+if not built then return false end
+local ids = redis.call('ZREVRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if built == 'partial' and #ids < tonumber(ARGV[1]) then return false end
+if #ids == 0 then return {} end
+return redis.call('HMGET', KEYS[2], unpack(ids))
+"""
+
+# Trim every energy set to ARGV[1] members, drop payloads no set still references and
+# mark a built queue partial. KEYS: the energy sets, then the payload hash, then "built".
+TRIM_SCRIPT = """
+local max = tonumber(ARGV[1])
+local sets = #KEYS - 2
+local trimmed = {}
+for i = 1, sets do
+  for _, id in ipairs(redis.call('ZREVRANGE', KEYS[i], max, -1)) do trimmed[id] = true end
+  redis.call('ZREMRANGEBYRANK', KEYS[i], 0, -max - 1)
+end
+local dropped = 0
+for id in pairs(trimmed) do
+  local kept = false
+  for i = 1, sets do
+    if redis.call('ZSCORE', KEYS[i], id) then kept = true break end
+  end
+  if not kept then
+    redis.call('HDEL', KEYS[sets + 1], id)
+    dropped = dropped + 1
+  end
+end
+if next(trimmed) then redis.call('SET', KEYS[sets + 2], 'partial', 'XX', 'KEEPTTL') end
+return dropped
+"""
+
+
+def _key(user_id, suffix):
+    return f"qc:open:{user_id}:{suffix}"
+
+
+def _keys(user_id) -> list[str]:
+    """The energy sets, the payload hash and the "built" marker (TRIM_SCRIPT relies on this order)."""
+    return [_key(user_id, e) for e in ENERGY_LEVELS] + [_key(user_id, "tasks"), _key(user_id, "built")]
+
+
+def _ttl() -> int:
+    return getattr(settings, "QUICK_CATCH_TASK_QUEUE_SECONDS", 86400)
+
+
+def _redis():
+    """Raw Redis client behind the default cache, or None when the cache is not Redis."""
+    try:
+        from django_redis import get_redis_connection
+
+        return get_redis_connection("default")
+    except (ImportError, NotImplementedError):
+        return None
+    except Exception:
+        logger.warning("Redis unavailable for task queue; using database", exc_info=True)
+        return None
+
+
+def board_score(rank_score, best_energy, energy_level) -> float:
+    rank = float(rank_score or 0)
+    if best_energy not in ENERGY_LEVELS or energy_level not in ENERGY_LEVELS:
+        return rank
+    distance = abs(ENERGY_LEVELS.index(best_energy) - ENERGY_LEVELS.index(energy_level))
+    return rank - ENERGY_MISMATCH_PENALTY * distance
+
+
+def _payload(task, dump_id) -> dict:
+    return {
+        "id": str(task.id),
+        "title": task.title,
+        "micro_steps": task.micro_steps or [],
+        "best_energy": task.best_energy,
+        "estimated_minutes": task.estimated_minutes,
+        "category": task.category,
+        "dump_id": str(dump_id),
+    }
+
+
+def _write(client, user_id, tasks_with_dump):
+    """Add (task, dump_id) pairs to the user's sets and payload hash, then trim, in one pipeline."""
+    keys = _keys(user_id)
+    pipe = client.pipeline(transaction=False)
+    payloads = {}
+    for task, dump_id in tasks_with_dump:
+        payloads[str(task.id)] = json.dumps(_payload(task, dump_id), separators=(",", ":"))
+        for energy in ENERGY_LEVELS:
+            pipe.zadd(_key(user_id, energy), {str(task.id): board_score(task.rank_score, task.best_energy, energy)})
+    if payloads:
+        pipe.hset(_key(user_id, "tasks"), mapping=payloads)
+    client.register_script(TRIM_SCRIPT)(keys=keys, args=[MAX_QUEUED_TASKS], client=pipe)
+    # Sets and hash outlive the "built" marker, so an expired queue is rebuilt, never half-read.
+    for key in keys[:-1]:
+        pipe.expire(key, _ttl())
+    pipe.execute()
+
+
+def open_tasks_queryset(user_id):
+    return TriageTask.objects.filter(user_id=user_id, completed_at__isnull=True)
+
+
+def rebuild_user_queue(user_id, client=None) -> int:
+    """Rebuild the user's Redis structure from the database. Returns the number of open tasks."""
+    client = client or _redis()
+    if client is None:
+        return 0
+    tasks = list(
+        open_tasks_queryset(user_id)
+        .annotate(dump_id=F("triage_run__dump_id"))
+        .order_by("-rank_score")[: MAX_QUEUED_TASKS + 1]
+    )
+    partial = len(tasks) > MAX_QUEUED_TASKS
+    tasks = tasks[:MAX_QUEUED_TASKS]
+    client.delete(*_keys(user_id))
+    _write(client, user_id, [(t, t.dump_id) for t in tasks])
+    client.set(_key(user_id, "built"), "partial" if partial else "full", ex=_ttl())
+    return len(tasks)
+
+
+def invalidate_users(user_ids) -> None:
+    """Drop the users' queues so the next read rebuilds them (after bulk updates that bypass signals)."""
+    client = _redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for user_id in set(user_ids):
+            pipe.delete(*_keys(user_id))
+        pipe.execute()
+    except Exception:
+        logger.warning("Could not invalidate task queues", exc_info=True)
+
+
+def add_tasks(user_id, dump_id, tasks) -> None:
+    """Queue a freshly saved run's tasks (no-op without Redis; the DB fallback sees them anyway)."""
+    client = _redis()
+    if client is None:
+        return
+    try:
+        if not client.exists(_key(user_id, "built")):
+            rebuild_user_queue(user_id, client)
+            return
+        _write(client, user_id, [(t, dump_id) for t in tasks if t.completed_at is None])
+    except Exception:
+        logger.warning("Could not update task queue for user %s", user_id, exc_info=True)
+
+
+def refresh_task(task, dump_id=None) -> None:
+    """
+    Re-queue a saved task with its current score and payload, or drop it once completed.
+    dump_id is looked up (one values_list query) only if it is not passed and the queue is built.
+    """
+    if task.completed_at is not None:
+        remove_task(task.user_id, task.id)
+        return
+    client = _redis()
+    if client is None:
+        return
+    try:
+        if client.exists(_key(task.user_id, "built")):
+            if dump_id is None:
+                dump_id = TriageRun.objects.values_list("dump_id", flat=True).get(pk=task.triage_run_id)
+            _write(client, task.user_id, [(task, dump_id)])
+    except Exception:
+        logger.warning("Could not update task queue for user %s", task.user_id, exc_info=True)
+
+
+def remove_task(user_id, task_id) -> None:
+    client = _redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for energy in ENERGY_LEVELS:
+            pipe.zrem(_key(user_id, energy), str(task_id))
+        pipe.hdel(_key(user_id, "tasks"), str(task_id))
+        pipe.execute()
+    except Exception:
+        logger.warning("Could not update task queue for user %s", user_id, exc_info=True)
+
+
+def _db_top(user_id, energy_level, limit):
+    distance = Case(
+        *[
+            When(best_energy=level, then=Value(float(abs(i - ENERGY_LEVELS.index(energy_level)))))
+            for i, level in enumerate(ENERGY_LEVELS)
+        ],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    rows = (
+        open_tasks_queryset(user_id)
+        .annotate(
+            dump_id=F("triage_run__dump_id"),
+            board=Coalesce(Cast("rank_score", FloatField()), Value(0.0)) - distance * ENERGY_MISMATCH_PENALTY,
+        )
+        .order_by("-board", "-created_at")[:limit]
+    )
+    return [_payload(task, task.dump_id) for task in rows]
+
+
+def top_tasks(user_id, energy_level="medium", limit=20) -> list[dict]:
+    """Highest-priority open tasks for the given energy level, as payload dicts."""
+    if energy_level not in ENERGY_LEVELS:
+        energy_level = "medium"
+    client = _redis()
+    if client is not None:
+        try:
+            script = client.register_script(TOP_TASKS_SCRIPT)
+            keys = [_key(user_id, energy_level), _key(user_id, "tasks"), _key(user_id, "built")]
+            payloads = script(keys=keys, args=[limit])
+            if payloads is None:
+                rebuild_user_queue(user_id, client)
+                payloads = script(keys=keys, args=[limit])
+            if payloads is not None:
+                return [json.loads(p) for p in payloads if p]
+        except Exception:
+            logger.warning("Task queue read failed for user %s; using database", user_id, exc_info=True)
+    return _db_top(user_id, energy_level, limit)
+
+
+def next_task(user_id, energy_level="medium") -> dict | None:
+    tasks = top_tasks(user_id, energy_level, limit=1)
+    return tasks[0] if tasks else None
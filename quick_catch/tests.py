@@ -1,3 +1,796 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core import mail
+from django.core.mail import send_mail
+from django.core.management import call_command
+from django.contrib import admin
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import CustomUser
+
+from . import task_queue
+from .ai import ChatResponse, TriageResult, run_triage, run_triage_batch
+from .alignment import DumpIndex, align_tasks, task_evidence
+from .caching import TwoTierCache, clear_local_caches
+from .classifier import classify_tasks
+from .compression import compress_dump
+from .digests import queue_daily_digests
+from .emails import OUTBOX_BACKEND, markdown_html, queue_email, queue_triage_email, send_batch
+from .export import iter_encoded
+from .middleware import timing_summary
+from .jobs import claim_jobs, enqueue_dumps, process_job, process_packed
+from .metrics import MetricsRegistry
+from .models import BrainDump, Email, Profile, TriageJob, TriageRun, TriageRunHourlyStats, TriageTask
+from .persistence import save_triage_result
+from .prompts import DEFAULT_PROMPT_VERSION, get_prompt, select_prompt
+from .scoring import SCORE_VERSION, score_tasks
+from .stats import performance_report, rebuild_buckets
+from .tokens import NUM_CTX_BUCKETS, NUM_PREDICT_MAX, NUM_PREDICT_MIN, choose_num_ctx, estimate_tokens, num_predict_for
+
+
+def _fake_result():
+    return TriageResult(
+        extracted_tasks=[
+            {"title": "Reply to the landlord", "micro_steps": ["Open email", "Write two lines"]},
+            {"title": "Book dentist", "micro_steps": ["Call the office"]},
+            {"title": "Ship invoice", "micro_steps": []},
+        ],
+        top_3_indices=[0, 1, 2],
+        blockers=["Dreading the phone call"],
+        action_plan="Start with the email.",
+        model_name="test-model",
+        latency_ms=42,
+    )
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Query budgets for every Quick Catch view. A failing count means a view gained
+    round trips; fix the regression or raise the budget deliberately.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("budget@example.com", "pw-123456")
+        cls.dump = BrainDump.objects.create(user=cls.user, energy_level="low", input_text="Reply to the landlord")
+        save_triage_result(cls.dump, _fake_result())
+
+    def setUp(self):
+        # Budgets are for a cold process-local cache (the shared tier is a DummyCache here).
+        clear_local_caches()
+        self.client.force_login(self.user)
+
+    def test_dump_get(self):
+        # session, user, profile
+        with self.assertNumQueries(3):
+            self.client.get(reverse("quick_catch:dump"))
+        # profile now served from the process-local tier
+        with self.assertNumQueries(2):
+            self.client.get(reverse("quick_catch:dump"))
+
+    def test_profile_cache_invalidated_on_save(self):
+        self.client.get(reverse("quick_catch:dump"))
+        profile = Profile.objects.get(user=self.user)
+        profile.default_energy_level = "high"
+        profile.save()
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("quick_catch:dump"))
+        self.assertEqual(response.context["profile"].default_energy_level, "high")
+
+    def test_dump_post(self):
+        # session, user, profile, dump insert, then in one atomic block (a savepoint pair under TestCase):
+        # run insert, category priors, task bulk insert, run update
+        with mock.patch("quick_catch.views.run_triage", return_value=_fake_result()):
+            with self.assertNumQueries(10):
+                response = self.client.post(
+                    reverse("quick_catch:dump"),
+                    {"input_text": "Book dentist", "energy_level": "medium"},
+                )
+        self.assertEqual(response.status_code, 302)
+
+    def test_result(self):
+        # session, user, dump, latest run, top 3 tasks
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("quick_catch:result", kwargs={"dump_id": self.dump.id}))
+        self.assertEqual(len(response.context["top_3_tasks"]), 3)
+
+    def test_email_result(self):
+        # session, user, dump, latest run, queued-email check, top 3 tasks, email insert
+        with self.assertNumQueries(7):
+            response = self.client.post(reverse("quick_catch:email_result", kwargs={"dump_id": self.dump.id}))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Email.objects.filter(user=self.user).count(), 1)
+
+    def test_dump_list(self):
+        with self.assertNumQueries(3):
+            self.client.get(reverse("quick_catch:dump_list"))
+
+    def test_profile(self):
+        with self.assertNumQueries(3):
+            self.client.get(reverse("quick_catch:profile"))
+
+    def test_board(self):
+        # session, user, profile (default energy), open tasks
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("quick_catch:board"))
+        self.assertEqual(len(response.context["tasks"]), 3)
+
+    def test_next_task(self):
+        # session, user, open tasks
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("quick_catch:next_task"), {"energy": "low"})
+        self.assertIsNotNone(response.json()["task"])
+
+    def test_complete_task(self):
+        task = TriageTask.objects.filter(user=self.user).first()
+        # session, user, task, update (the queue is refreshed on commit, from Redis only)
+        with self.assertNumQueries(4), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("quick_catch:complete_task", kwargs={"task_id": task.id}))
+        self.assertEqual(response.status_code, 302)
+        task.refresh_from_db()
+        self.assertIsNotNone(task.completed_at)
+
+    def test_export(self):
+        # session, user, then dumps, runs and tasks once per iterator chunk
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("quick_catch:export"))
+            b"".join(response.streaming_content)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("export@example.com", "pw-123456")
+        dump = BrainDump.objects.create(user=self.user, energy_level="low", input_text="Reply to the landlord")
+        save_triage_result(dump, _fake_result())
+        self.client.force_login(self.user)
+
+    def _export(self, accept_encoding, **params):
+        response = self.client.get(reverse("quick_catch:export"), params, HTTP_ACCEPT_ENCODING=accept_encoding)
+        self.assertIn("Accept-Encoding", response["Vary"])
+        return response, b"".join(response.streaming_content)
+
+    def test_gzip_follows_accept_encoding_q_values(self):
+        for header in ("gzip, deflate", "br;q=1.0, gzip;q=0.5", "*"):
+            response, body = self._export(header)
+            self.assertEqual(response["Content-Encoding"], "gzip", header)
+            lines = zlib.decompress(body, 16 + zlib.MAX_WBITS).decode().splitlines()
+            self.assertEqual(len(lines), 1 + 1 + 3)  # dump, run, tasks
+        for header in ("gzip;q=0", "br", "gzip;q=0, *;q=1", ""):
+            response, body = self._export(header)
+            self.assertFalse(response.has_header("Content-Encoding"), header)
+            self.assertEqual(json.loads(body.splitlines()[0])["record_type"], "dump")
+
+    def test_gzip_chunks_are_flushed_as_they_are_yielded(self):
+        lines = (f"{n:06d} {'x' * 100}\n" for n in range(2000))
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        with mock.patch("quick_catch.export.STREAM_BUFFER_BYTES", 10_000):
+            first = next(iter_encoded(lines, gzip=True))
+        self.assertGreaterEqual(len(decompressor.decompress(first)), 10_000)
+
+    def test_csv_export(self):
+        response, body = self._export("", format="csv")
+        rows = body.decode().splitlines()
+        self.assertTrue(rows[0].startswith("record_type,id,parent_id"))
+        self.assertEqual(len(rows), 1 + 5)
+
+
+class TwoTierCacheTests(TestCase):
+    def test_single_flight_per_key_without_blocking_other_keys(self):
+        profiles = TwoTierCache("test-single-flight")
+        release, loads, results = threading.Event(), [], []
+
+        def slow_load():
+            loads.append("a")
+            release.wait(5)
+            return "a-value"
+
+        threads = [
+            threading.Thread(target=lambda: results.append(profiles.get_or_load("a", slow_load))) for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        while not loads:
+            time.sleep(0.01)
+        self.assertEqual(profiles.get_or_load("b", lambda: "b-value"), "b-value")
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((loads, results), (["a"], ["a-value"] * 3))
+
+
+class RequestTimingMiddlewareTests(TestCase):
+    def test_server_timing_header_and_summary(self):
+        user = CustomUser.objects.create_user("timing@example.com", "pw-123456", is_staff=True)
+        self.client.force_login(user)
+        response = self.client.get(reverse("quick_catch:dump_list"))
+        self.assertIn('desc="3 queries"', response["Server-Timing"])
+        summary = timing_summary()["quick_catch:dump_list"]
+        self.assertGreaterEqual(summary["requests"], 1)
+        self.assertEqual(summary["queries_max"], 3)
+
+
+class MetricsTests(TestCase):
+    def test_snapshots_are_summed_and_dead_pids_dropped(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("qc_test_total", "Test counter.", ("result",))
+        latency = registry.histogram("qc_test_seconds", "Test histogram.", buckets=(1, 5))
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        with tempfile.TemporaryDirectory() as directory, override_settings(QUICK_CATCH_METRICS_DIR=directory):
+            counter.inc(result="ok")
+            latency.observe(2)
+            snapshot = {
+                "values": [["qc_test_total", ["ok"], 2.0]],
+                "histograms": [["qc_test_seconds", [], [1, 0, 0, 0.5]]],
+            }
+            for pid in (os.getppid(), exited.pid):
+                with open(os.path.join(directory, f"metrics-{pid}.json"), "w") as f:
+                    json.dump(snapshot, f)
+            text = registry.render()
+            self.assertIn('qc_test_total{result="ok"} 3', text)
+            self.assertIn('qc_test_seconds_bucket{le="5"} 2', text)
+            self.assertIn("qc_test_seconds_sum 2.5", text)
+            self.assertFalse(os.path.exists(os.path.join(directory, f"metrics-{exited.pid}.json")))
+            self.assertTrue(os.path.exists(os.path.join(directory, f"metrics-{os.getpid()}.json")))
+
+
+class StartupTests(TestCase):
+    def test_boot_defers_heavy_imports(self):
+        code = (
+            "import sys, config.wsgi; from django.urls import get_resolver; get_resolver().url_patterns; "
+            "print('numpy' in sys.modules)"
+        )
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings"}
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "False")
+
+    def test_startup_profile_reports_modules_and_budget(self):
+        out = io.StringIO()
+        call_command("startup_profile", top=3, repeat=1, budget_ms=60_000, stdout=out)
+        self.assertIn("config.wsgi", out.getvalue())
+        self.assertIn("Within the 60000 ms boot budget.", out.getvalue())
+
+
+class AdminScalingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = CustomUser.objects.create_superuser("admin@example.com", "pw-123456")
+        cls.user = CustomUser.objects.create_user("dumps@example.com", "pw-123456")
+        cls.dump = BrainDump.objects.create(user=cls.user, energy_level="low", input_text="Reply to the landlord")
+        save_triage_result(cls.dump, _fake_result())
+
+    def _changelist(self, model, **params):
+        request = RequestFactory().get("/", params)
+        request.user = self.admin_user
+        request.user.is_verified = lambda: True  # normally set by django_otp's OTPMiddleware
+        return admin.site._registry[model].changelist_view(request).render()
+
+    def test_changelist_queries_stay_flat(self):
+        # category filter choices (newest rows), count, one page of rows with runs and users joined in
+        with self.assertNumQueries(3):
+            self._changelist(TriageTask)
+        for i in range(3):
+            dump = BrainDump.objects.create(user=self.user, energy_level="low", input_text=f"Errand {i}")
+            save_triage_result(dump, _fake_result())
+        with self.assertNumQueries(3):
+            self._changelist(TriageTask)
+
+    def test_search_uses_email_or_text_fields(self):
+        model_admin = admin.site._registry[BrainDump]
+        queryset = BrainDump.objects.all()
+        for term, expected in (
+            ("dumps@example.com", 1), ("dumps@exa", 1), ("@EXAMPLE.com", 1), ("LANDLORD", 1), ("dumps", 0), ("", 1),
+        ):
+            results, _ = model_admin.get_search_results(None, queryset, term)
+            self.assertEqual(results.count(), expected, term)
+        email = Email.objects.create(user=self.user, to_email="other@example.org", subject="Hello")
+        results, _ = admin.site._registry[Email].get_search_results(None, Email.objects.all(), "other@example")
+        self.assertEqual(list(results), [email])
+
+
+class ThemeCssTests(TestCase):
+    def test_critical_css_is_inlined_and_bundle_loads_async(self):
+        html = self.client.get(reverse("home")).content.decode()
+        self.assertIn("<style>:root {", html)
+        self.assertIn('rel="preload" href="/static/css/dist/styles.css" as="style"', html)
+        with self.settings(DEBUG=True):
+            html = self.client.get(reverse("home")).content.decode()
+        self.assertNotIn("<style>", html)
+
+
+class TriageStatsTests(TestCase):
+    def test_runs_are_folded_into_hourly_buckets(self):
+        user = CustomUser.objects.create_user("stats@example.com", "pw-123456")
+        for latency_ms in (42, 700):
+            dump = BrainDump.objects.create(user=user, energy_level="low", input_text="Book dentist")
+            result = _fake_result()
+            result.latency_ms, result.token_out = latency_ms, 70
+            with self.captureOnCommitCallbacks(execute=True):
+                save_triage_result(dump, result)
+        fields = ("run_count", "latency_count", "latency_sum_ms", "token_out_sum", "latency_histogram")
+        live = TriageRunHourlyStats.objects.values_list(*fields).get()
+        self.assertEqual(live[:4], (2, 2, 742, 140))
+        self.assertEqual(rebuild_buckets(), 2)
+        self.assertEqual(TriageRunHourlyStats.objects.values_list(*fields).get(), live)
+
+        (row,) = performance_report(timezone.now() - timedelta(days=1))
+        self.assertEqual((row.key, row.run_count, row.avg_latency_ms), (("test-model", "v1"), 2, 371))
+        self.assertEqual(row.tokens_per_second, 140 / 0.742)
+        self.assertTrue(0 < row.p50_ms <= 250 < row.p95_ms <= 1000)
+
+
+class ScoringTests(TestCase):
+    def test_scores_are_deterministic_and_bounded(self):
+        titles = ["Pay the overdue tax bill today", "Text mom happy birthday", "Refactor the billing API"]
+        steps = [["Find the letter", "Log in to the bank"], [], ["Write tests", "Split module", "Deploy", "Fix bugs", "Review"]]
+        first = score_tasks(titles, steps, "low", [True, False, False])
+        self.assertEqual(first, score_tasks(titles, steps, "low", [True, False, False]))
+        self.assertEqual([s.category for s in first], ["finance", "personal", "dev"])
+        for s in first:
+            self.assertTrue(0 <= s.friction_score <= 10)
+            self.assertTrue(5 <= s.estimated_minutes <= 240)
+        self.assertGreater(first[0].rank_score, first[1].rank_score)
+
+    def test_saved_tasks_are_scored(self):
+        user = CustomUser.objects.create_user("scoring@example.com", "pw-123456")
+        dump = BrainDump.objects.create(user=user, energy_level="medium", input_text="Book dentist")
+        run = save_triage_result(dump, _fake_result())
+        tasks = list(run.triage_tasks.all())
+        self.assertTrue(all(t.score_version == SCORE_VERSION and t.rank_score is not None for t in tasks))
+
+
+class CompressionTests(TestCase):
+    DUMP = (
+        "Call   the dentist\tabout Friday\n"
+        "see https://example.com/track?utm_source=newsletter&utm_medium=email&id=123456\n\n"
+        "Call   the dentist\tabout Friday\n"
+        "see https://example.com/track?utm_source=newsletter&utm_medium=email&id=123456\n\n"
+        "On Mon, Ann wrote:\n> can you send it\n> thanks\n\n"
+        "Pay rent\n--\nSam\nCEO"
+    )
+
+    def test_noise_is_removed_before_the_model_call(self):
+        compressed = compress_dump(self.DUMP)
+        self.assertEqual(
+            compressed.text,
+            "Call the dentist about Friday\nsee [link: example.com]\n\n[quoted text]\n\nPay rent\n[signature]",
+        )
+        self.assertGreater(compressed.tokens_saved, 0)
+
+    def test_evidence_spans_point_into_the_original_dump(self):
+        user = CustomUser.objects.create_user("compress@example.com", "pw-123456")
+        dump = BrainDump.objects.create(user=user, energy_level="low", input_text=self.DUMP)
+        result = _fake_result()
+        result.extracted_tasks = [{"title": "Pay rent", "micro_steps": []}]
+        result.top_3_indices = [0]
+        run = save_triage_result(dump, result)
+        (span,) = run.triage_tasks.get().evidence_spans
+        self.assertEqual(self.DUMP[span["start"]:span["end"]], "Pay rent")
+
+
+class AlignmentTests(TestCase):
+    DUMP = (
+        "Groceries later.\n"
+        "I need to call the dentist about booking a cleaning, ugh.\n"
+        "Also the invoice for Acme is overdue!"
+    )
+
+    def test_paraphrased_tasks_are_found_in_the_dump(self):
+        index = DumpIndex(self.DUMP)
+        spans = task_evidence(index, "Book dentist appointment", ["Call the office"])
+        self.assertIn("dentist about booking", [span["text"] for span in spans])
+        for span in spans + task_evidence(index, "Ship Acme invoice"):
+            self.assertEqual(self.DUMP[span["start"]:span["end"]], span["text"])
+        self.assertEqual(task_evidence(index, "Learn the violin"), [])
+
+    def test_align_tasks_returns_spans_per_task(self):
+        spans = align_tasks(self.DUMP, [("Ship Acme invoice", []), ("Learn the violin", None)])
+        self.assertEqual([[span["text"] for span in task] for task in spans], [["invoice for Acme"], []])
+
+
+class TaskClassifierTests(TestCase):
+    def test_trained_classifier_labels_confident_tasks(self):
+        user = CustomUser.objects.create_user("classifier@example.com", "pw-123456")
+        dump = BrainDump.objects.create(user=user, energy_level="medium", input_text="x")
+        run = save_triage_result(dump, _fake_result())
+        examples = [("Water the garden plants", "garden", 30), ("Renew library card", "errands", 10)]
+        TriageTask.objects.bulk_create([
+            TriageTask(triage_run=run, user=user, title=f"{title} {n}", category=category,
+                       estimated_minutes=minutes, labels_source="manual")
+            for n in range(5) for title, category, minutes in examples
+        ])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.npz")
+            call_command("train_task_classifier", output=path, min_examples=3, holdout=0, stdout=io.StringIO())
+            with self.settings(QUICK_CATCH_CLASSIFIER_PATH=path):
+                tasks = [TriageTask(title="Water the garden"), TriageTask(title="Pay rent", category="finance")]
+                classify_tasks(tasks)
+        self.assertEqual((tasks[0].category, tasks[0].estimated_minutes, tasks[0].labels_source), ("garden", 30, "classifier"))
+        # Unseen words: not confident, so the rule-based category stays.
+        self.assertEqual(tasks[1].category, "finance")
+
+
+@override_settings(QUICK_CATCH_JOB_MAX_ATTEMPTS=2, QUICK_CATCH_JOB_RETRY_SECONDS=30, QUICK_CATCH_JOB_LEASE_SECONDS=600)
+class TriageJobQueueTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user("jobs@example.com", "pw-123456")
+        self.dump = BrainDump.objects.create(user=user, energy_level="low", input_text="Reply to the landlord")
+        (self.job,) = enqueue_dumps([self.dump])
+
+    def test_failed_attempt_backs_off_then_fails(self):
+        (job,) = claim_jobs(10)
+        self.assertEqual((job.status, job.attempts), ("running", 1))
+        self.assertEqual(claim_jobs(10), [])
+        with mock.patch("quick_catch.jobs.run_triage", side_effect=RuntimeError("model down")), \
+                self.assertLogs("quick_catch.jobs", "ERROR"):
+            self.assertIsNone(process_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "queued")
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=25))
+        self.assertEqual(claim_jobs(10), [])
+        TriageJob.objects.update(run_after=timezone.now())
+        (job,) = claim_jobs(10)
+        with mock.patch("quick_catch.jobs.run_triage", side_effect=RuntimeError("model down")), \
+                self.assertLogs("quick_catch.jobs", "ERROR"):
+            process_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error_message), ("failed", 2, "model down"))
+
+    def test_model_request_failure_is_retried_not_saved(self):
+        (job,) = claim_jobs(10)
+        with mock.patch("quick_catch.ai._ollama_chat", side_effect=requests.Timeout("read timed out")), \
+                self.assertLogs("quick_catch.jobs", "ERROR"):
+            self.assertIsNone(process_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error_message), ("queued", "read timed out"))
+        self.assertFalse(TriageRun.objects.filter(dump=self.dump).exists())
+
+    def test_expired_lease_is_reclaimed_and_stale_worker_result_dropped(self):
+        (stale,) = claim_jobs(10)
+        TriageJob.objects.update(started_at=timezone.now() - timedelta(seconds=601))
+        (job,) = claim_jobs(10)
+        self.assertEqual(job.attempts, 2)
+        with mock.patch("quick_catch.jobs.run_triage", return_value=_fake_result()), \
+                self.assertLogs("quick_catch.jobs", "WARNING"):
+            self.assertIsNone(process_job(stale))  # lease lost: its run is rolled back
+            self.assertIsNotNone(process_job(job))
+        self.assertEqual(TriageRun.objects.filter(dump=self.dump).count(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        # last attempt crashed too: the job is failed rather than run a third time
+        TriageJob.objects.update(status="running", started_at=timezone.now() - timedelta(seconds=601))
+        self.assertEqual(claim_jobs(10), [])
+        self.assertEqual(TriageJob.objects.get().status, "failed")
+
+    def test_stage_trace_is_stored_and_exported(self):
+        (job,) = claim_jobs(10)
+        with mock.patch("quick_catch.jobs.run_triage", return_value=_fake_result()):
+            run = process_job(job)
+        self.assertLessEqual({"queue.wait", "triage", "persist"}, {row[0] for row in run.trace})
+        out = io.StringIO()
+        call_command("export_triage_traces", stdout=out)
+        events = json.loads(out.getvalue())["traceEvents"]
+        self.assertEqual([e["ph"] for e in events].count("M"), 1)
+        self.assertIn("triage", {e["name"] for e in events if e["ph"] == "X"})
+
+    def test_persistence_failure_leaves_no_partial_run(self):
+        (job,) = claim_jobs(10)
+        with mock.patch("quick_catch.jobs.run_triage", return_value=_fake_result()), \
+                mock.patch("quick_catch.persistence.TriageTask.objects.bulk_create", side_effect=RuntimeError("disk")), \
+                self.assertLogs("quick_catch.jobs", "ERROR"):
+            self.assertIsNone(process_job(job))
+        self.assertFalse(TriageRun.objects.exists())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error_message), ("queued", "disk"))
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("queue@example.com", "pw-123456")
+        dump = BrainDump.objects.create(user=self.user, energy_level="low", input_text="Reply to the landlord")
+        save_triage_result(dump, _fake_result())
+        self.task = TriageTask.objects.filter(user=self.user).order_by("-rank_score").first()
+
+    def test_database_ranking_without_redis(self):
+        top = task_queue.top_tasks(self.user.id, "low", limit=50)
+        self.assertEqual(len(top), 3)
+        self.assertEqual(top[0]["id"], str(self.task.id))
+        self.task.completed_at = timezone.now()
+        self.task.save()
+        self.assertNotIn(str(self.task.id), [t["id"] for t in task_queue.top_tasks(self.user.id, "low")])
+
+    def test_task_saves_and_deletes_update_the_queue(self):
+        with mock.patch("quick_catch.task_queue.refresh_task") as refresh, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.task.title = "Reply to the landlord today"
+            self.task.save()
+        refresh.assert_called_once_with(self.task, None)
+        with mock.patch("quick_catch.task_queue.remove_task") as remove, \
+                self.captureOnCommitCallbacks(execute=True):
+            task_id = self.task.id
+            self.task.delete()
+        remove.assert_called_once_with(self.user.id, task_id)
+
+    def test_refresh_reads_dump_id_without_loading_the_run(self):
+        client = mock.MagicMock()
+        with mock.patch("quick_catch.task_queue._redis", return_value=client), \
+                mock.patch("quick_catch.task_queue._write") as write:
+            task = TriageTask.objects.get(pk=self.task.pk)
+            with self.assertNumQueries(1):
+                task_queue.refresh_task(task)
+            with self.assertNumQueries(0):
+                task_queue.refresh_task(task, dump_id="known")
+        self.assertEqual(write.call_args_list[0].args[2], [(task, self.task.triage_run.dump_id)])
+        self.assertFalse(TriageTask.triage_run.is_cached(task))
+
+    def test_rescore_invalidates_queues(self):
+        with mock.patch("quick_catch.task_queue.invalidate_users") as invalidate:
+            call_command("rescore_tasks", "--all", stdout=io.StringIO())
+        invalidate.assert_called_once_with({self.user.id})
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("sync@example.com", "pw-123456")
+        self.client.force_login(self.user)
+        self.url = "/api/sync"
+
+    def _sync(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    @override_settings(QUICK_CATCH_SYNC_PAGE_SIZE=2)
+    def test_keyset_paging_does_not_skip_rows_sharing_a_timestamp(self):
+        for n in range(5):
+            BrainDump.objects.create(user=self.user, energy_level="low", input_text=f"dump {n}")
+        BrainDump.objects.update(updated_at=timezone.now() - timedelta(days=90))
+        seen, cursor = [], None
+        for _ in range(5):
+            payload = self._sync(**({"cursor": cursor} if cursor else {}))
+            seen += [row[0] for row in payload["d"]]
+            cursor = payload["c"]
+            if not payload["m"]:
+                break
+        self.assertEqual(sorted(seen), sorted(str(pk) for pk in BrainDump.objects.values_list("id", flat=True)))
+        self.assertEqual(len(seen), 5)
+
+    def test_deletions_are_sent_as_tombstones(self):
+        dump = BrainDump.objects.create(user=self.user, energy_level="low", input_text="Book dentist")
+        payload = self._sync()
+        self.assertEqual((payload["z"], payload["x"]), (1, []))
+        dump_id = str(dump.id)
+        dump.delete()
+        payload = self._sync(cursor=payload["c"])
+        self.assertEqual(payload["z"], 0)
+        self.assertEqual([row[:2] for row in payload["x"]], [["d", dump_id]])
+
+    def test_invalid_and_overflowing_cursors_are_rejected(self):
+        for raw in (b"not json", b"[1, 2]", b'{"d": [1e400, ""]}', str(10 ** 30).encode()):
+            cursor = base64.urlsafe_b64encode(raw).decode()
+            with self.assertLogs("django.request", "WARNING"):
+                self.assertEqual(self.client.get(self.url, {"cursor": cursor}).status_code, 400, raw)
+
+    def test_if_none_match_is_parsed_and_compared_exactly(self):
+        BrainDump.objects.create(user=self.user, energy_level="low", input_text="Book dentist")
+        etag = self.client.get(self.url)["ETag"]
+        for header in (etag, f'"other", {etag}', f"W/{etag}", "*"):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=header).status_code, 304, header)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"x{etag[1:]}').status_code, 200)
+        BrainDump.objects.create(user=self.user, energy_level="low", input_text="Reply to the landlord")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class PromptSplitTests(TestCase):
+    @override_settings(QUICK_CATCH_PROMPT_WEIGHTS={"v1": 50, "v2": 50}, QUICK_CATCH_PROMPT_SPLIT_SALT="s1")
+    def test_split_is_stable_and_follows_weights(self):
+        versions = [select_prompt(user_id).version for user_id in range(2000)]
+        self.assertEqual(versions, [select_prompt(user_id).version for user_id in range(2000)])
+        self.assertTrue(800 < versions.count("v2") < 1200, versions.count("v2"))
+        self.assertEqual(select_prompt(None).version, DEFAULT_PROMPT_VERSION)
+        with self.settings(QUICK_CATCH_PROMPT_SPLIT_SALT="s2"):
+            reshuffled = [select_prompt(user_id).version for user_id in range(2000)]
+        self.assertNotEqual(versions, reshuffled)
+
+    def test_unknown_and_zero_weights_are_ignored(self):
+        with self.settings(QUICK_CATCH_PROMPT_WEIGHTS={"v2": 100, "v9": 100, "v1": 0}):
+            self.assertEqual({select_prompt(user_id).version for user_id in range(50)}, {"v2"})
+        with self.settings(QUICK_CATCH_PROMPT_WEIGHTS={"v9": 100}):
+            self.assertEqual(select_prompt(1).version, DEFAULT_PROMPT_VERSION)
+        self.assertEqual(get_prompt("v9").version, DEFAULT_PROMPT_VERSION)
+
+
+class TokenBudgetTests(TestCase):
+    def test_num_ctx_is_the_smallest_bucket_that_fits(self):
+        self.assertEqual(choose_num_ctx(1000, 1024), 4096)
+        self.assertEqual(choose_num_ctx(4000, 1024), 8192)
+        self.assertEqual(choose_num_ctx(100_000, 4096), max(NUM_CTX_BUCKETS))
+        self.assertEqual(choose_num_ctx(1000, 1024, buckets=(2048, 8192)), 8192)
+
+    def test_num_predict_grows_with_input_within_bounds(self):
+        self.assertEqual(num_predict_for(0), NUM_PREDICT_MIN)
+        self.assertLess(num_predict_for(500), num_predict_for(1500))
+        self.assertEqual(num_predict_for(100_000), NUM_PREDICT_MAX)
+        self.assertGreater(estimate_tokens("Reply to the landlord about the boiler"), 5)
+
+    @override_settings(QUICK_CATCH_NUM_CTX_BUCKETS=(4096, 8192))
+    def test_request_options_and_run_record_the_bucket(self):
+        response = ChatResponse(json.dumps({
+            "extracted_tasks": [{"title": "Book dentist", "micro_steps": []}], "top_3_indices": [0],
+            "blockers": [], "action_plan": "Call.",
+        }))
+        with mock.patch("quick_catch.ai._ollama_chat", return_value=response) as chat, \
+                self.assertLogs("quick_catch.ai", "WARNING"):  # larger than the biggest bucket
+            result = run_triage("Book dentist " * 2000, "low", get_prompt("v1"))
+        options = chat.call_args.kwargs["options"]
+        self.assertEqual((options["num_ctx"], options["num_predict"], result.num_ctx), (8192, NUM_PREDICT_MAX, 8192))
+        self.assertEqual(options["temperature"], 0.2)
+
+
+class PackedTriageTests(TestCase):
+    def _chat(self, keys):
+        def chat(**kwargs):
+            time.sleep(0.2)
+            results = {key: {"extracted_tasks": [{"title": f"Task {key}", "micro_steps": []}], "top_3_indices": [0],
+                             "blockers": [], "action_plan": "Go."} for key in keys}
+            return ChatResponse(json.dumps({"results": results}), prompt_eval_count=300, eval_count=90)
+        return mock.patch("quick_catch.ai._ollama_chat", side_effect=chat)
+
+    def test_pack_uses_user_template_and_apportions_tokens(self):
+        items = [("a", "Book dentist", "low"), ("b", "Reply to the landlord about the boiler and the rent", "high")]
+        with self._chat(["a", "b"]) as chat:
+            results = run_triage_batch(items, get_prompt("v1"))
+        content = chat.call_args.kwargs["messages"][1]["content"]
+        self.assertIn("### DUMP a\nBrain dump (energy level: LOW):", content)
+        self.assertIn("### DUMP b\nBrain dump (energy level: HIGH):", content)
+        self.assertAlmostEqual(results["a"].token_in + results["b"].token_in, 300, delta=1)
+        self.assertLess(results["a"].token_in, results["b"].token_in)
+        # latency is the real wait for the shared request, not a share of it
+        self.assertEqual(results["a"].latency_ms, results["b"].latency_ms)
+        self.assertGreaterEqual(results["a"].latency_ms, 199)
+
+    def test_dump_missing_from_pack_is_triaged_alone(self):
+        with self._chat(["a"]), mock.patch("quick_catch.ai.run_triage", return_value=_fake_result()) as single:
+            results = run_triage_batch([("a", "Book dentist", "low"), ("b", "Ship invoice", "low")], get_prompt("v1"))
+        single.assert_called_once_with("Ship invoice", "low", get_prompt("v1"))
+        self.assertEqual(results["a"].extracted_tasks[0]["title"], "Task a")
+
+    def test_failed_pack_falls_back_to_single_jobs(self):
+        user = CustomUser.objects.create_user("packed@example.com", "pw-123456")
+        dumps = [BrainDump.objects.create(user=user, energy_level="low", input_text=text) for text in ("One", "Two")]
+        enqueue_dumps(dumps)
+        jobs = claim_jobs(10)
+        with mock.patch("quick_catch.jobs.run_triage_batch", side_effect=RuntimeError("model down")), \
+                mock.patch("quick_catch.jobs.run_triage", return_value=_fake_result()) as single, \
+                self.assertLogs("quick_catch.jobs", "ERROR"):
+            runs = process_packed(jobs, get_prompt())
+        self.assertEqual(single.call_count, 2)
+        self.assertEqual(len([run for run in runs if run]), 2)
+        self.assertEqual(set(TriageJob.objects.values_list("status", flat=True)), {"done"})
+
+
+class EmailOutboxTests(TestCase):
+    def test_email_me_this_is_queued_and_sent_once(self):
+        user = CustomUser.objects.create_user("outbox@example.com", "pw-123456")
+        dump = BrainDump.objects.create(user=user, energy_level="medium", input_text="Book dentist")
+        save_triage_result(dump, _fake_result())
+        self.client.force_login(user)
+        url = reverse("quick_catch:email_result", args=[dump.id])
+        self.client.post(url)
+        self.client.post(url)
+        self.assertEqual(Email.objects.filter(user=user, status="queued").count(), 1)
+
+        self.assertEqual(send_batch(), (1, 0))
+        self.assertEqual(send_batch(), (0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        email = Email.objects.get(user=user)
+        self.assertEqual((email.status, email.attempts), ("sent", 1))
+        self.assertEqual(email.provider_message_id, mail.outbox[0].extra_headers["Message-ID"])
+        html, mimetype = mail.outbox[0].alternatives[0]
+        self.assertEqual(mimetype, "text/html")
+        self.assertIn("<h2>Top 3 tasks</h2>\n<ul><li>Reply to the landlord</li>", html)
+        self.assertNotIn("## ", html)
+
+    def test_markdown_html_renders_the_action_plan_subset(self):
+        plan = (
+            "Start **small** today.\n\n"
+            "## First <10> minutes\n"
+            "1. Open the email\n"
+            "2. Write two lines\n"
+            "   - keep it short\n"
+            "- Reply *now* & `send`\n"
+            "#hashtag <script>"
+        )
+        self.assertEqual(markdown_html(plan), "\n".join([
+            "<p>Start <strong>small</strong> today.</p>",
+            "<h2>First &lt;10&gt; minutes</h2>",
+            "<ol><li>Open the email</li><li>Write two lines</li></ol>",
+            "<ul><li>keep it short</li><li>Reply *now* &amp; `send`</li></ul>",
+            "<p>#hashtag &lt;script&gt;</p>",
+        ]))
+
+    def test_failed_send_backs_off(self):
+        user = CustomUser.objects.create_user("retry@example.com", "pw-123456")
+        dump = BrainDump.objects.create(user=user, energy_level="medium", input_text="Book dentist")
+        email = queue_triage_email(save_triage_result(dump, _fake_result()), user)
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=OSError("down")):
+            self.assertEqual(send_batch(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.error_message), ("queued", 1, "down"))
+        self.assertGreater(email.send_after, timezone.now())
+
+    @override_settings(
+        EMAIL_BACKEND=OUTBOX_BACKEND,
+        QUICK_CATCH_EMAIL_DELIVERY_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    )
+    def test_outbox_backend_defers_mail_to_users(self):
+        user = CustomUser.objects.create_user("otp@example.com", "pw-123456")
+        send_mail(
+            "OTP token", "123456", "security@example.com", [user.email], html_message="<b>123456</b>",
+        )
+        send_mail("Hello", "not a user", None, ["stranger@example.com"])
+        self.assertEqual([m.to for m in mail.outbox], [["stranger@example.com"]])
+        self.assertEqual(send_batch(kind="auth"), (1, 0))
+        sent = mail.outbox[-1]
+        self.assertEqual((sent.body, sent.from_email), ("123456", "security@example.com"))
+        self.assertEqual(sent.alternatives, [("<b>123456</b>", "text/html")])
+        email = Email.objects.get(user=user)
+        self.assertEqual((email.body_md, email.message), ("", None))
+
+    @override_settings(QUICK_CATCH_EMAIL_MAX_ATTEMPTS=1)
+    def test_failed_auth_email_is_scrubbed(self):
+        user = CustomUser.objects.create_user("link@example.com", "pw-123456")
+        queue_email(user, "Your login link", "https://example.com/login/secret")
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=OSError("down")):
+            self.assertEqual(send_batch(), (0, 1))
+        email = Email.objects.get(user=user)
+        self.assertEqual((email.status, email.body_md), ("failed", ""))
+
+
+class DigestTests(TestCase):
+    def test_digest_queued_once_at_local_send_hour(self):
+        users = []
+        for n in range(3):
+            user = CustomUser.objects.create_user(f"digest{n}@example.com", "pw-123456")
+            Profile.objects.update_or_create(user=user, defaults={"timezone": "Europe/Berlin"})
+            dump = BrainDump.objects.create(user=user, energy_level="medium", input_text="Book dentist")
+            save_triage_result(dump, _fake_result())
+            users.append(user)
+        now = datetime(2026, 3, 2, 5, 30, tzinfo=dt_timezone.utc)  # 06:30 in Berlin
+        with self.assertNumQueries(2 + 4):  # zones, profile page, then four per chunk
+            created = queue_daily_digests(now=now, hour=7, chunk_size=10)
+        self.assertEqual(list(created.values()), [3])
+        email = Email.objects.filter(kind="digest").first()
+        self.assertEqual(email.send_after, datetime(2026, 3, 2, 6, 0, tzinfo=dt_timezone.utc))
+        self.assertIn("- ", email.body_md)
+        self.assertEqual(queue_daily_digests(now=now, hour=7, chunk_size=10), {email.send_after: 0})
+        self.assertEqual(queue_daily_digests(now=now, hour=9, chunk_size=10), {})
+
+    def test_digest_keeps_each_users_latest_runs(self):
+        user = CustomUser.objects.create_user("busy@example.com", "pw-123456")
+        Profile.objects.update_or_create(user=user, defaults={"timezone": "Europe/Berlin"})
+        runs = []
+        for day in range(1, 6):
+            dump = BrainDump.objects.create(user=user, energy_level="medium", input_text=f"Dump {day}")
+            run = save_triage_result(dump, _fake_result())
+            TriageRun.objects.filter(pk=run.pk).update(created_at=datetime(2026, 3, day, 12, tzinfo=dt_timezone.utc))
+            runs.append(run)
+        queue_daily_digests(now=datetime(2026, 3, 6, 5, 30, tzinfo=dt_timezone.utc), hour=7, chunk_size=10)
+        email = Email.objects.get(kind="digest")
+        self.assertEqual(email.triage_run_id, runs[-1].id)
+        headings = [line for line in email.body_md.splitlines() if line.startswith("## ")]
+        self.assertEqual(headings, ["## Mar 5", "## Mar 4", "## Mar 3"])
@@ -0,0 +1,55 @@
+"""
+Fast local token estimates for prompt sizing and savings reports.
+Approximates a BPE tokenizer without loading one: short words are one token,
+longer words cost an extra token per few characters, digits and punctuation are
+counted separately. Good to within ~10-15% on English prose, which is enough to
+compare prompt variants and pick context sizes.
+"""
+
+import re
+
+
+_TOKEN_RE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_", re.UNICODE)
+
+# Context sizes requests are rounded up to. Ollama reloads a model when num_ctx
+# changes, so a small fixed set keeps loaded instances reusable.
+NUM_CTX_BUCKETS = (4096, 8192, 16384, 32768)
+# Headroom for chat template tokens and estimator error.
+NUM_CTX_MARGIN = 256
+
+NUM_PREDICT_MIN = 512
+NUM_PREDICT_MAX = 4096
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    total = 0
+    for m in _TOKEN_RE.finditer(text):
+        piece = m.group()
+        if piece[0].isdigit():
+            total += (len(piece) + 2) // 3
+        elif piece[0].isalpha():
+            total += 1 + (len(piece) - 1) // 6
+        else:
+            total += 1
+    return total
+
+
+def estimate_messages_tokens(messages: list[dict[str, str]]) -> int:
+    """Estimate for a chat request, including a few tokens of per-message template overhead."""
+    return sum(estimate_tokens(m.get("content", "")) + 4 for m in messages)
+
+
+def num_predict_for(input_tokens: int) -> int:
+    """Output cap: triage JSON grows roughly with the number of tasks, i.e. with dump size."""
+    return max(NUM_PREDICT_MIN, min(NUM_PREDICT_MAX, 384 + int(input_tokens * 1.5)))
+
+
+def choose_num_ctx(prompt_tokens: int, num_predict: int, buckets=NUM_CTX_BUCKETS) -> int:
+    """Smallest bucket that fits prompt + output; the largest bucket if nothing fits."""
+    needed = prompt_tokens + num_predict + NUM_CTX_MARGIN
+    for size in sorted(buckets):
+        if needed <= size:
+            return size
+    return max(buckets)
@@ -0,0 +1,117 @@
+"""
+Per-stage timing for the triage pipeline.
+
+    with tracing.trace():
+        with tracing.span("prompt.build"):
+            ...
+
+Spans are recorded on the trace active in the current context (a ContextVar), so
+pipeline functions can be instrumented without threading a trace object through
+their signatures; outside trace() spans are no-ops. A finished trace is stored on
+TriageRun.trace as compact rows [name, start_ms, duration_ms, depth] relative to
+the start of the trace.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+
+
+_current_trace = contextvars.ContextVar("quick_catch_trace", default=None)
+
+
+class Trace:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans: list[list] = []
+        self.depth = 0
+
+    def add(self, name: str, start_ms: float, duration_ms: float, depth: int | None = None) -> None:
+        self.spans.append([
+            name,
+            round(start_ms, 2),
+            round(duration_ms, 2),
+            self.depth if depth is None else depth,
+        ])
+
+    def to_json(self) -> list[list]:
+        return sorted(self.spans, key=lambda s: (s[1], s[3]))
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace(parent: Trace | None = None):
+    """
+    Start a trace for the current context (reuses an already active one).
+    With parent, start a fresh trace that begins with a copy of parent's spans
+    (e.g. one trace per run for stages shared by a packed batch).
+    """
+    existing = _current_trace.get()
+    if existing is not None and parent is None:
+        yield existing
+        return
+    t = Trace()
+    if parent is not None:
+        t.origin = parent.origin
+        t.spans = [list(s) for s in parent.spans]
+    token = _current_trace.set(t)
+    try:
+        yield t
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str):
+    t = _current_trace.get()
+    if t is None:
+        yield
+        return
+    start = time.perf_counter()
+    depth = t.depth
+    t.depth += 1
+    try:
+        yield
+    finally:
+        t.depth = depth
+        end = time.perf_counter()
+        t.add(name, (start - t.origin) * 1000, (end - start) * 1000, depth)
+
+
+def add_span(name: str, start_ms: float, duration_ms: float) -> None:
+    """Record a stage measured elsewhere (e.g. queue wait, from timestamps) on the active trace."""
+    t = _current_trace.get()
+    if t is not None:
+        t.add(name, start_ms, duration_ms, 0)
+
+
+def trace_events(runs) -> dict:
+    """
+    Trace Event Format (chrome://tracing, Perfetto) for TriageRuns with stored traces.
+    One thread per run; timestamps are microseconds since the epoch.
+    """
+    events = []
+    for tid, run in enumerate(runs, start=1):
+        base_us = run.created_at.timestamp() * 1_000_000
+        events.append({
+            "name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+            "args": {"name": f"run {run.id} ({run.model_name}, {run.prompt_version})"},
+        })
+        # Spans are relative to trace start, which precedes run creation by the persist offset.
+        persist = next((s for s in run.trace if s[0] == "persist"), None)
+        origin_us = base_us - (persist[1] * 1000 if persist else 0)
+        for name, start_ms, duration_ms, depth in run.trace:
+            events.append({
+                "name": name,
+                "cat": "triage",
+                "ph": "X",
+                "ts": round(origin_us + start_ms * 1000),
+                "dur": round(duration_ms * 1000),
+                "pid": 1,
+                "tid": tid,
+                "args": {"depth": depth, "run_id": str(run.id)},
+            })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
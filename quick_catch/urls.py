@@ -7,6 +7,11 @@ app_name = "quick_catch"
 urlpatterns = [
     path("", views.dump_view, name="dump"),
     path("result/<uuid:dump_id>/", views.result_view, name="result"),
+    path("result/<uuid:dump_id>/email/", views.email_result_view, name="email_result"),
     path("history/", views.dump_list_view, name="dump_list"),
     path("profile/", views.profile_view, name="profile"),
+    path("export/", views.export_view, name="export"),
+    path("tasks/", views.board_view, name="board"),
+    path("tasks/next/", views.next_task_view, name="next_task"),
+    path("tasks/<uuid:task_id>/complete/", views.complete_task_view, name="complete_task"),
 ]
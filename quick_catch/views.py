@@ -1,68 +1,58 @@
+import hmac
+
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
 
 from .ai import run_triage
+from .caching import latest_run_cache, profile_cache
+from .emails import queue_triage_email
+from .export import EXPORT_FORMATS, gzip_accepted, stream_history
 from .forms import BrainDumpForm
-from .models import BrainDump, Profile, TriageRun, TriageTask
+from .metrics import registry
+from . import task_queue
+from .models import ENERGY_LEVELS, BrainDump, Profile, TriageTask
+from .persistence import save_triage_result
+from .prompts import select_prompt
+from .tracing import span, trace
 
 
-def _get_profile(user):
-    """Get or create Quick Catch profile for user."""
-    profile, _ = Profile.objects.get_or_create(
-        user=user,
-        defaults={
-            "default_energy_level": "medium",
-            "timezone": "America/New_York",
-            "email_opt_in": True,
-            "neurodivergent_focus": "unspecified",
-        },
-    )
+def _load_profile(user):
+    # Profiles are created with the user (signals.user_saved); get_or_create only covers stragglers.
+    profile = Profile.objects.filter(user=user).first()
+    if profile is None:
+        profile, _ = Profile.objects.get_or_create(
+            user=user,
+            defaults={
+                "default_energy_level": "medium",
+                "timezone": "America/New_York",
+                "email_opt_in": True,
+                "neurodivergent_focus": "unspecified",
+            },
+        )
     return profile
 
 
-def _save_triage_result(dump, result):
-    """Create TriageRun and TriageTasks from AI TriageResult."""
-    run = TriageRun.objects.create(
-        dump=dump,
-        user=dump.user,
-        prompt_version="v1",
-        model_name=result.model_name,
-        temperature=0.2,
-        action_plan_md=result.action_plan,
-        blockers=result.blockers,
-        top_3_task_ids=[],  # set after tasks exist
-        latency_ms=result.latency_ms,
-    )
-    tasks_by_index = {}
-    for i, item in enumerate(result.extracted_tasks):
-        if not isinstance(item, dict):
-            continue
-        title = (item.get("title") or "").strip() or f"Task {i + 1}"
-        micro_steps = item.get("micro_steps")
-        if not isinstance(micro_steps, list):
-            micro_steps = []
-        micro_steps = [str(s) for s in micro_steps][:20]
-        is_top3 = i in result.top_3_indices
-        rank_order = (result.top_3_indices.index(i) + 1) if is_top3 else None
-        task = TriageTask.objects.create(
-            triage_run=run,
-            user=dump.user,
-            title=title,
-            micro_steps=micro_steps,
-            is_top3=is_top3,
-            rank_order=rank_order,
-        )
-        tasks_by_index[i] = task
-    top_3_ids = [
-        str(tasks_by_index[i].id)
-        for i in result.top_3_indices
-        if i in tasks_by_index
-    ]
-    run.top_3_task_ids = top_3_ids
-    run.save(update_fields=["top_3_task_ids"])
-    return run
+def _get_profile(user):
+    """Quick Catch profile for user (two-tier cached)."""
+    return profile_cache.get_or_load(user.id, lambda: _load_profile(user))
+
+
+def _latest_run(dump):
+    """Latest TriageRun of the dump, or None (two-tier cached)."""
+    return latest_run_cache.get_or_load(dump.id, lambda: dump.triage_runs.order_by("-created_at").first())
 
 
 def _wants_json_response(request):
@@ -80,12 +70,15 @@ def dump_view(request):
     if request.method == "POST":
         form = BrainDumpForm(request.POST)
         if form.is_valid():
-            dump = form.save(commit=False)
-            dump.user = request.user
-            dump.source = "web"
-            dump.save()
-            result = run_triage(dump.input_text, dump.energy_level)
-            _save_triage_result(dump, result)
+            with trace():
+                with span("dump.save"):
+                    dump = form.save(commit=False)
+                    dump.user = request.user
+                    dump.source = "web"
+                    dump.save()
+                with span("triage"):
+                    result = run_triage(dump.input_text, dump.energy_level, select_prompt(request.user.id))
+                save_triage_result(dump, result)
             if _wants_json_response(request):
                 return JsonResponse(
                     {"redirect": reverse("quick_catch:result", kwargs={"dump_id": str(dump.id)})}
@@ -109,10 +102,7 @@ def dump_view(request):
 def result_view(request, dump_id):
     """Show action plan and top 3 for a brain dump (user must own the dump)."""
     dump = get_object_or_404(BrainDump, id=dump_id, user=request.user)
-    triage_run = (
-        dump.triage_runs.order_by("-created_at").first()
-        if hasattr(dump, "triage_runs") else None
-    )
+    triage_run = _latest_run(dump)
     top_3_tasks = []
     if triage_run and triage_run.top_3_task_ids:
         task_ids = triage_run.top_3_task_ids
@@ -135,6 +125,19 @@ def result_view(request, dump_id):
     )
 
 
+@login_required
+@require_POST
+def email_result_view(request, dump_id):
+    """Queue the dump's latest action plan for delivery to the user (sent by send_queued_emails)."""
+    dump = get_object_or_404(BrainDump, id=dump_id, user=request.user)
+    triage_run = _latest_run(dump)
+    if triage_run is None or not request.user.email:
+        return HttpResponseBadRequest("Nothing to email.")
+    queue_triage_email(triage_run, request.user)
+    messages.success(request, f"Your action plan is on its way to {request.user.email}.")
+    return redirect("quick_catch:result", dump_id=dump.id)
+
+
 @login_required
 def dump_list_view(request):
     """List current user's brain dumps, most recent first."""
@@ -147,3 +150,73 @@ def profile_view(request):
     """Quick Catch profile/settings (default energy, timezone, email opt-in, neurodivergent focus)."""
     profile = _get_profile(request.user)
     return render(request, "quick_catch/profile.html", {"profile": profile})
+
+
+@login_required
+def export_view(request):
+    """Stream the user's full history (dumps, runs, tasks) as NDJSON or CSV; gzip if accepted."""
+    fmt = request.GET.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    gzip = gzip_accepted(request.headers.get("Accept-Encoding"))
+    response = StreamingHttpResponse(
+        stream_history(request.user, fmt=fmt, gzip=gzip),
+        content_type="text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson",
+    )
+    response["Content-Disposition"] = f'attachment; filename="quick-catch-history.{fmt}"'
+    response["Vary"] = "Accept-Encoding"
+    if gzip:
+        response["Content-Encoding"] = "gzip"
+    return response
+
+
+def _board_energy(request):
+    energy = request.GET.get("energy")
+    if energy in ENERGY_LEVELS:
+        return energy
+    return _get_profile(request.user).default_energy_level
+
+
+@login_required
+def board_view(request):
+    """Open tasks across all dumps, ranked for the chosen energy level (default: profile energy)."""
+    energy = _board_energy(request)
+    tasks = task_queue.top_tasks(request.user.id, energy, limit=50)
+    return render(
+        request,
+        "quick_catch/board.html",
+        {"tasks": tasks, "energy": energy, "energy_levels": ENERGY_LEVELS},
+    )
+
+
+@login_required
+def next_task_view(request):
+    """JSON: the single best open task for the given energy level (task is null when none are open)."""
+    energy = _board_energy(request)
+    return JsonResponse({"energy": energy, "task": task_queue.next_task(request.user.id, energy)})
+
+
+@login_required
+@require_POST
+def complete_task_view(request, task_id):
+    """Mark one of the user's tasks done and drop it from the open-tasks queue."""
+    task = get_object_or_404(TriageTask, id=task_id, user=request.user)
+    if task.completed_at is None:
+        task.completed_at = timezone.now()
+        task.save(update_fields=["completed_at", "updated_at"])  # signals drop it from the queue
+    if _wants_json_response(request):
+        return JsonResponse({"id": str(task.id), "completed_at": task.completed_at.isoformat()})
+    next_url = request.POST.get("next")
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect("quick_catch:board")
+
+
+def metrics_view(request):
+    """Prometheus metrics; requires `Authorization: Bearer <QUICK_CATCH_METRICS_TOKEN>` or a staff session."""
+    token = getattr(settings, "QUICK_CATCH_METRICS_TOKEN", None)
+    auth = request.headers.get("Authorization") or ""
+    authorized = bool(token) and hmac.compare_digest(auth, f"Bearer {token}")
+    if not authorized and not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponseForbidden("Forbidden")
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
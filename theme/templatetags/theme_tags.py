@@ -0,0 +1,49 @@
+import re
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+from tailwind import get_config
+from tailwind.utils import is_path_absolute
+
+register = template.Library()
+
+CRITICAL_CSS_PATH = 'css/critical.css'
+
+
+def _minify(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    return ' '.join(line.strip() for line in css.splitlines() if line.strip())
+
+
+@lru_cache(maxsize=None)
+def _read_critical_css(path):
+    """Minified stylesheet from STATIC_ROOT (after collectstatic) or the app's static dir; '' if missing."""
+    try:
+        with staticfiles_storage.open(path) as f:
+            return _minify(f.read().decode())
+    except OSError:
+        pass
+    found = finders.find(path)
+    if not found:
+        return ''
+    with open(found, encoding='utf-8') as f:
+        return _minify(f.read())
+
+
+@register.inclusion_tag('theme/tags/css.html')
+def theme_css():
+    """
+    Inline the critical CSS and load the full Tailwind bundle without blocking first paint.
+    Falls back to the plain blocking stylesheet in DEBUG, for an absolute TAILWIND_CSS_PATH,
+    or when no critical CSS is available.
+    """
+    tailwind_css_path = get_config('TAILWIND_CSS_PATH')
+    inline = not settings.DEBUG and not is_path_absolute(tailwind_css_path)
+    return {
+        'critical_css': _read_critical_css(CRITICAL_CSS_PATH) if inline else '',
+        'tailwind_css_path': tailwind_css_path,
+    }
@@ -2,13 +2,12 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import authenticate
 from .models import CustomUser
-from .turnstile import verify_turnstile, is_turnstile_enabled
+from .turnstile import TurnstileFormMixin
 
-class CustomUserCreationForm(UserCreationForm):
+class CustomUserCreationForm(TurnstileFormMixin, UserCreationForm):
     email = forms.EmailField(required=True)
     first_name = forms.CharField(max_length=30, required=False)
     last_name = forms.CharField(max_length=30, required=False)
-    cf_turnstile_response = forms.CharField(widget=forms.HiddenInput(), required=False)
 
     class Meta:
         model = CustomUser
@@ -20,25 +19,7 @@ class CustomUserCreationForm(UserCreationForm):
 
     def clean(self):
         cleaned_data = super().clean()
-        
-        # Validate Turnstile if enabled
-        if is_turnstile_enabled():
-            turnstile_response = cleaned_data.get('cf_turnstile_response')
-            if not turnstile_response:
-                raise forms.ValidationError('Please complete the CAPTCHA verification.')
-            
-            # Get user's IP address
-            remote_ip = None
-            if self.request:
-                x_forwarded_for = self.request.META.get('HTTP_X_FORWARDED_FOR')
-                if x_forwarded_for:
-                    remote_ip = x_forwarded_for.split(',')[0]
-                else:
-                    remote_ip = self.request.META.get('REMOTE_ADDR')
-            
-            if not verify_turnstile(turnstile_response, remote_ip):
-                raise forms.ValidationError('CAPTCHA verification failed. Please try again.')
-        
+        self.clean_turnstile()
         return cleaned_data
 
     def save(self, commit=True):
@@ -50,12 +31,11 @@ class CustomUserCreationForm(UserCreationForm):
             user.save()
         return user
 
-class CustomAuthenticationForm(AuthenticationForm):
+class CustomAuthenticationForm(TurnstileFormMixin, AuthenticationForm):
     username = forms.EmailField(
         widget=forms.EmailInput(attrs={'autofocus': True}),
         label='Email'
     )
-    cf_turnstile_response = forms.CharField(widget=forms.HiddenInput(), required=False)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -67,23 +47,7 @@ class CustomAuthenticationForm(AuthenticationForm):
         email = cleaned_data.get('username')  # Django form still uses 'username' internally
         password = cleaned_data.get('password')
 
-        # Validate Turnstile if enabled
-        if is_turnstile_enabled():
-            turnstile_response = cleaned_data.get('cf_turnstile_response')
-            if not turnstile_response:
-                raise forms.ValidationError('Please complete the CAPTCHA verification.')
-            
-            # Get user's IP address
-            remote_ip = None
-            if self.request:
-                x_forwarded_for = self.request.META.get('HTTP_X_FORWARDED_FOR')
-                if x_forwarded_for:
-                    remote_ip = x_forwarded_for.split(',')[0]
-                else:
-                    remote_ip = self.request.META.get('REMOTE_ADDR')
-            
-            if not verify_turnstile(turnstile_response, remote_ip):
-                raise forms.ValidationError('CAPTCHA verification failed. Please try again.')
+        self.clean_turnstile()
 
         if email and password:
             self.user_cache = authenticate(
@@ -0,0 +1,74 @@
+"""
+Helpers for CustomUser history (django-simple-history).
+
+bulk_update_users writes one history row per changed user in the same
+transaction as the bulk UPDATE, and skips history when only
+HISTORY_EXCLUDED_FIELDS change. The dedupe/prune functions back the
+prune_user_history command. They work in small primary-key batches, each
+in its own short transaction, so the history table is never locked for long.
+"""
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from simple_history.utils import bulk_update_with_history  # type: ignore[import]
+
+from .models import HISTORY_EXCLUDED_FIELDS, CustomUser
+
+HistoricalCustomUser = CustomUser.history.model
+
+# history_* bookkeeping columns; everything else is a snapshot of the user row
+HISTORY_META_FIELDS = {'history_id', 'history_date', 'history_change_reason', 'history_type', 'history_user'}
+
+
+def bulk_update_users(users, fields, batch_size=500, change_reason=None):
+    """bulk_update() for users that also bulk-creates their history rows (unless only excluded fields change)."""
+    users = list(users)
+    if set(fields) <= set(HISTORY_EXCLUDED_FIELDS):
+        return CustomUser.objects.bulk_update(users, fields, batch_size=batch_size)
+    return bulk_update_with_history(
+        users, CustomUser, fields, batch_size=batch_size, default_change_reason=change_reason,
+    )
+
+
+def snapshot_fields():
+    return [f.attname for f in HistoricalCustomUser._meta.concrete_fields if f.name not in HISTORY_META_FIELDS]
+
+
+def duplicate_history_ids(user_ids):
+    """history_ids of '~' rows identical to the previous row of the same user (in history_date order)."""
+    fields = snapshot_fields()
+    rows = (
+        HistoricalCustomUser.objects.filter(id__in=user_ids)
+        .order_by('id', 'history_date', 'history_id')
+        .values_list('history_id', 'history_type', *fields)
+    )
+    duplicates = []
+    previous_user, previous_values = None, None
+    for history_id, history_type, *values in rows.iterator(chunk_size=2000):
+        user_id = values[fields.index('id')]
+        if user_id == previous_user and history_type == '~' and values == previous_values:
+            duplicates.append(history_id)
+        previous_user, previous_values = user_id, values
+    return duplicates
+
+
+def delete_history_rows(history_ids, batch_size=1000, pause=None):
+    """Delete history rows by primary key, batch_size rows per transaction. Returns rows deleted."""
+    deleted = 0
+    for start in range(0, len(history_ids), batch_size):
+        with transaction.atomic():
+            deleted += HistoricalCustomUser.objects.filter(history_id__in=history_ids[start:start + batch_size]).delete()[0]
+        if pause:
+            pause()
+    return deleted
+
+
+def expired_history_ids(cutoff, limit):
+    """Up to `limit` rows older than cutoff that have a newer row for the same user (the latest is always kept)."""
+    newer = HistoricalCustomUser.objects.filter(id=OuterRef('id'), history_date__gt=OuterRef('history_date'))
+    return list(
+        HistoricalCustomUser.objects.filter(history_date__lt=cutoff)
+        .filter(Exists(newer))
+        .order_by('history_date')
+        .values_list('history_id', flat=True)[:limit]
+    )
@@ -0,0 +1,58 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.history import delete_history_rows, duplicate_history_ids, expired_history_ids
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Shrink users_historicalcustomuser: drop '~' rows identical to the previous row of the same user, "
+        "then rows older than the retention period (each user's latest row is kept). Deletes run in small batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Retention in days (default: USER_HISTORY_RETENTION_DAYS; 0 disables the retention pass).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows deleted per transaction.")
+        parser.add_argument("--users-per-scan", type=int, default=500, help="Users whose history is compared at once.")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between delete batches.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be deleted.")
+
+    def handle(self, *args, **options):
+        pause = (lambda: time.sleep(options["sleep"])) if options["sleep"] else None
+        batch_size = options["batch_size"]
+
+        duplicates = 0
+        user_ids = CustomUser.objects.order_by("id").values_list("id", flat=True)
+        last_id = 0
+        while True:
+            chunk = list(user_ids.filter(id__gt=last_id)[:options["users_per_scan"]])
+            if not chunk:
+                break
+            ids = duplicate_history_ids(chunk)
+            duplicates += len(ids) if options["dry_run"] else delete_history_rows(ids, batch_size, pause)
+            last_id = chunk[-1]
+
+        days = options["days"] if options["days"] is not None else getattr(settings, "USER_HISTORY_RETENTION_DAYS", 365)
+        expired = 0
+        if days:
+            cutoff = timezone.now() - timedelta(days=days)
+            if options["dry_run"]:
+                expired = len(expired_history_ids(cutoff, limit=None))
+            else:
+                while ids := expired_history_ids(cutoff, limit=batch_size):
+                    expired += delete_history_rows(ids, batch_size, pause)
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {duplicates} duplicate and {expired} expired history row(s)."
+        ))
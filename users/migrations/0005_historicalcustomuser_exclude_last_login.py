@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_alter_customuser_options_historicalcustomuser'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='historicalcustomuser',
+            name='last_login',
+        ),
+    ]
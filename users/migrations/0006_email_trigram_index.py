@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# PostgreSQL only: pg_trgm GIN index for substring email search (admin search on
+# user__email). Django compiles icontains to UPPER("email"::text) LIKE UPPER(%s).
+INDEX_NAME = "users_customuser_email_trgm_idx"
+
+
+def add_email_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = apps.get_model("users", "CustomUser")._meta.db_table
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{INDEX_NAME}" ON "{table}" '
+        f'USING gin (UPPER("email"::text) gin_trgm_ops)'
+    )
+
+
+def remove_email_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{INDEX_NAME}"')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('users', '0005_historicalcustomuser_exclude_last_login'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_trigram_index, remove_email_trigram_index),
+    ]
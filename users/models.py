@@ -30,6 +30,9 @@ class CustomUserManager(BaseUserManager):
 
         return self.create_user(email, password, **extra_fields)
 
+# Fields whose changes alone do not create a history row (last_login changes on every sign-in).
+HISTORY_EXCLUDED_FIELDS = ('last_login',)
+
 class CustomUser(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(unique=True)
     first_name = models.CharField(max_length=30, blank=True)
@@ -37,7 +40,7 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)  # type: ignore[assignment]
     is_staff = models.BooleanField(default=False)  # type: ignore[assignment]
     date_joined = models.DateTimeField(auto_now_add=True)
-    history = HistoricalRecords()
+    history = HistoricalRecords(excluded_fields=list(HISTORY_EXCLUDED_FIELDS))
     objects = CustomUserManager()
 
     class Meta:  # type: ignore[override]
@@ -50,6 +53,37 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self) -> str:
         return str(self.email)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Snapshot of loaded values, to tell whether a save changes any history-tracked field
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _history_tracked_changes(self, update_fields=None) -> bool:
+        """False when the save only touches HISTORY_EXCLUDED_FIELDS."""
+        if update_fields is not None:
+            return not set(update_fields) <= set(HISTORY_EXCLUDED_FIELDS)
+        loaded = getattr(self, '_loaded_values', None)
+        if self._state.adding or loaded is None:
+            return True
+        return any(
+            getattr(self, f.attname) != loaded.get(f.attname)
+            for f in self._meta.concrete_fields
+            if f.attname in loaded and f.name not in HISTORY_EXCLUDED_FIELDS
+        )
+
+    def save(self, *args, **kwargs):
+        skip = not hasattr(self, 'skip_history_when_saving') and not self._history_tracked_changes(kwargs.get('update_fields'))
+        if skip:
+            self.skip_history_when_saving = True
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            if skip:
+                del self.skip_history_when_saving
+        self._loaded_values = {f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields}
+
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
 
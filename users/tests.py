@@ -1,3 +1,139 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+import sesame.utils
+
+from .forms import CustomAuthenticationForm
+from .models import CustomUser
+from .turnstile import get_verifier, turnstile_checked, verify_turnstile
+
+
+class QueryBudgetTests(TestCase):
+    """Query budgets for every users view; see quick_catch.tests.QueryBudgetTests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("budget@example.com", "pw-123456")
+
+    def test_register_get(self):
+        with self.assertNumQueries(0):
+            self.client.get(reverse("register"))
+
+    def test_login_get(self):
+        with self.assertNumQueries(0):
+            self.client.get(reverse("login"))
+
+    def test_login_magic_link(self):
+        # user lookup, outbox insert (no SMTP in the request)
+        with self.assertNumQueries(2):
+            self.client.post(reverse("login"), {"magic_link": "1", "email": self.user.email})
+
+    def test_logout(self):
+        self.client.force_login(self.user)
+        # session, user, session flush
+        with self.assertNumQueries(4):
+            self.client.get(reverse("logout"))
+
+    def test_dashboard(self):
+        self.client.force_login(self.user)
+        with self.assertNumQueries(2):
+            self.client.get(reverse("dashboard"))
+
+    def test_user_settings(self):
+        self.client.force_login(self.user)
+        with self.assertNumQueries(2):
+            self.client.get(reverse("user_settings"))
+
+    def test_magic_login(self):
+        token = sesame.utils.get_token(self.user)
+        # token user lookup, then sesame and login() each update last_login (no history row), session save
+        with self.assertNumQueries(10):
+            self.client.get(reverse("magic_login", kwargs={"token": token}))
+
+
+@override_settings(
+    TURNSTILE_VERIFIER="users.turnstile.StubTurnstileVerifier",
+    TURNSTILE_SITE_KEY="site-key",
+    TURNSTILE_SECRET_KEY="secret",
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "turnstile-tests"}},
+)
+class TurnstileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_verifier.cache_clear()
+        self.addCleanup(get_verifier.cache_clear)
+
+    def test_verified_tokens_are_cached(self):
+        self.assertTrue(verify_turnstile("ok-token", "203.0.113.1"))
+        self.assertTrue(verify_turnstile("ok-token", "203.0.113.1"))
+        self.assertFalse(verify_turnstile("fail-token"))
+        self.assertEqual(len(get_verifier().calls), 2)
+
+    def test_tokens_are_single_use_and_bound_to_the_client(self):
+        self.assertTrue(verify_turnstile("ok-token", "203.0.113.1", "session-a"))
+        # replayed from another client or session, without asking Cloudflare
+        self.assertFalse(verify_turnstile("ok-token", "198.51.100.7", "session-a"))
+        self.assertFalse(verify_turnstile("ok-token", "203.0.113.1", "session-b"))
+        # the verifying client may repeat it once (double submit), then it is consumed
+        self.assertTrue(verify_turnstile("ok-token", "203.0.113.1", "session-a"))
+        self.assertFalse(verify_turnstile("ok-token", "203.0.113.1", "session-a"))
+        self.assertEqual(len(get_verifier().calls), 1)
+
+    def test_checks_are_reported_through_a_signal(self):
+        received = []
+        handler = lambda sender, result, seconds=None, **kwargs: received.append(result)  # noqa: E731
+        turnstile_checked.connect(handler)
+        self.addCleanup(turnstile_checked.disconnect, handler)
+        verify_turnstile("ok-token")
+        verify_turnstile("")
+        self.assertEqual(received, ["success", "missing"])
+
+    def test_failure_policy_applies_when_verifier_is_unreachable(self):
+        self.assertFalse(verify_turnstile("error-token"))
+        get_verifier.cache_clear()
+        with self.settings(TURNSTILE_FAILURE_POLICY="open"):
+            self.assertTrue(verify_turnstile("error-token-2"))
+            self.assertFalse(verify_turnstile("error-token-2", "198.51.100.7"))
+            self.assertFalse(verify_turnstile("fail-token"))
+
+    def test_login_form_requires_token(self):
+        CustomUser.objects.create_user("captcha@example.com", "pw-123456")
+        data = {"username": "captcha@example.com", "password": "pw-123456"}
+        self.assertFalse(CustomAuthenticationForm(data=data).is_valid())
+        self.assertTrue(CustomAuthenticationForm(data={**data, "cf_turnstile_response": "ok"}).is_valid())
+
+
+class UserHistoryTests(TestCase):
+    def test_last_login_only_saves_skip_history(self):
+        user = CustomUser.objects.create_user("history@example.com", "pw-123456")
+        self.assertEqual(user.history.count(), 1)
+        user.last_login = timezone.now()
+        user.save(update_fields=["last_login"])
+        user = CustomUser.objects.get(pk=user.pk)
+        user.last_login = timezone.now()
+        user.save()
+        self.assertEqual(user.history.count(), 1)
+        user.first_name = "Ada"
+        user.save()
+        self.assertEqual(user.history.count(), 2)
+
+    def test_prune_removes_consecutive_duplicates_and_expired_rows(self):
+        user = CustomUser.objects.create_user("prune@example.com", "pw-123456")
+        for _ in range(3):
+            user.save_without_historical_record()
+            user.history.first().instance.save()  # same values, forced history row
+        user.first_name = "Ada"
+        user.save()
+        self.assertEqual(user.history.count(), 5)
+        call_command("prune_user_history", days=0, stdout=io.StringIO())
+        self.assertEqual(user.history.count(), 2)
+        for age, row in enumerate(user.history.order_by("history_date")):
+            user.history.filter(pk=row.pk).update(history_date=timezone.now() - timedelta(days=400 - age))
+        call_command("prune_user_history", days=365, stdout=io.StringIO())
+        self.assertEqual(user.history.count(), 1)
@@ -1,43 +1,174 @@
-import os
+"""
+Cloudflare Turnstile verification.
+
+One verifier per process (TURNSTILE_VERIFIER) keeps a pooled requests session to
+siteverify and answers within TURNSTILE_TIMEOUT seconds. Tokens that already
+verified are cached for TURNSTILE_CACHE_SECONDS, so a double submit does not
+call Cloudflare again: tokens are single-use and would fail there.
+The cached result is bound to the client IP and session, and a token is marked
+consumed on first use: another client presenting it is refused, and the same
+client may repeat it only once (a double submit).
+When Cloudflare is slow or unreachable, TURNSTILE_FAILURE_POLICY decides:
+'closed' rejects the submission, 'open' lets it through. A token Cloudflare
+explicitly rejects is always refused.
+"""
+
+import hashlib
+import time
+from functools import lru_cache
+
 import requests
+from django import forms
 from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import Signal
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+VERIFY_URL = 'https://challenges.cloudflare.com/turnstile/v0/siteverify'
+CACHE_PREFIX = 'turnstile:ok:'
+USED_PREFIX = 'turnstile:used:'
+# Cloudflare tokens expire after 300 seconds, so a consumed marker never needs to outlive that
+TOKEN_LIFETIME_SECONDS = 300
+
+# Sent after every check with result= (success, failure, cached, missing, replayed,
+# error_allowed, error_rejected) and seconds= (siteverify round trip, or None).
+turnstile_checked = Signal()
+
+
+class TurnstileVerifier:
+    """Verifies tokens against Cloudflare siteverify over a pooled session."""
+
+    def __init__(self):
+        self.secret_key = settings.TURNSTILE_SECRET_KEY
+        self.timeout = settings.TURNSTILE_TIMEOUT
+        self.failure_policy = settings.TURNSTILE_FAILURE_POLICY
+        self.cache_seconds = settings.TURNSTILE_CACHE_SECONDS
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=10, max_retries=0))
+            self._session = session
+        return self._session
+
+    def _checked(self, result: str, seconds: float = None) -> None:
+        turnstile_checked.send(sender=self.__class__, result=result, seconds=seconds)
+
+    def verify(self, token: str, remote_ip: str = None, session_key: str = None) -> bool:
+        """
+        Verify a Turnstile token
+
+        Args:
+            token: The Turnstile token from the client
+            remote_ip: The user's IP address (optional)
+            session_key: The client's session key (optional); binds the token to the session
+
+        Returns:
+            bool: True if verification successful (or skipped/allowed by policy), False otherwise
+        """
+        if not self.secret_key:
+            return True  # Skip verification if not configured
+        if not token:
+            self._checked('missing')
+            return False
+        digest = hashlib.sha256(token.encode()).hexdigest()
+        binding = hashlib.sha256(f'{digest}|{remote_ip or ""}|{session_key or ""}'.encode()).hexdigest()
+        if not cache.add(USED_PREFIX + digest, binding, TOKEN_LIFETIME_SECONDS):
+            # Seen before: only the client that verified it may repeat it, and only once.
+            if cache.get(USED_PREFIX + digest) == binding and cache.delete(CACHE_PREFIX + binding):
+                self._checked('cached')
+                return True
+            self._checked('replayed')
+            return False
+
+        started = time.monotonic()
+        try:
+            success = self.siteverify(token, remote_ip)
+        except (requests.RequestException, ValueError):
+            allowed = self.failure_policy == 'open'
+            self._checked('error_allowed' if allowed else 'error_rejected', time.monotonic() - started)
+            return allowed
+        self._checked('success' if success else 'failure', time.monotonic() - started)
+        if success and self.cache_seconds:
+            cache.set(CACHE_PREFIX + binding, True, self.cache_seconds)
+        return success
+
+    def siteverify(self, token: str, remote_ip: str = None) -> bool:
+        """One siteverify call; raises requests/ValueError errors when Cloudflare is slow or unreachable."""
+        data = {
+            'secret': self.secret_key,
+            'response': token,
+        }
+        if remote_ip:
+            data['remoteip'] = remote_ip
+        response = self.session.post(VERIFY_URL, data=data, timeout=self.timeout)
+        response.raise_for_status()
+        return bool(response.json().get('success', False))
 
-def verify_turnstile(token: str, remote_ip: str = None) -> bool:
+
+class StubTurnstileVerifier(TurnstileVerifier):
     """
-    Verify Cloudflare Turnstile CAPTCHA token
-    
-    Args:
-        token: The Turnstile token from the client
-        remote_ip: The user's IP address (optional)
-    
-    Returns:
-        bool: True if verification successful, False otherwise
+    Local verifier for tests and development (TURNSTILE_VERIFIER = 'users.turnstile.StubTurnstileVerifier').
+    Tokens starting with 'fail' are rejected, 'error' simulates an unreachable Cloudflare.
     """
-    secret_key = os.environ.get('TURNSTILE_SECRET_KEY')
-    if not secret_key:
-        return True  # Skip verification if not configured
-    
-    verify_url = 'https://challenges.cloudflare.com/turnstile/v0/siteverify'
-    
-    data = {
-        'secret': secret_key,
-        'response': token,
-    }
-    
-    if remote_ip:
-        data['remoteip'] = remote_ip
-    
-    try:
-        response = requests.post(verify_url, data=data, timeout=10)
-        result = response.json()
-        return result.get('success', False)
-    except (requests.RequestException, ValueError):
-        return False
+
+    def __init__(self):
+        super().__init__()
+        self.secret_key = self.secret_key or 'stub'
+        self.calls = []
+
+    def siteverify(self, token: str, remote_ip: str = None) -> bool:
+        self.calls.append((token, remote_ip))
+        if token.startswith('error'):
+            raise requests.Timeout('stub timeout')
+        return not token.startswith('fail')
+
+
+@lru_cache(maxsize=1)
+def get_verifier() -> TurnstileVerifier:
+    """The process-wide verifier named by TURNSTILE_VERIFIER."""
+    return import_string(settings.TURNSTILE_VERIFIER)()
+
+
+def verify_turnstile(token: str, remote_ip: str = None, session_key: str = None) -> bool:
+    """Verify Cloudflare Turnstile CAPTCHA token with the shared verifier"""
+    return get_verifier().verify(token, remote_ip, session_key)
+
+
+def get_client_ip(request) -> str:
+    """Client IP (first X-Forwarded-For hop when behind a proxy)"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR')
+
 
 def get_turnstile_site_key() -> str:
     """Get the Turnstile site key for frontend use"""
-    return os.environ.get('TURNSTILE_SITE_KEY', '')
+    return settings.TURNSTILE_SITE_KEY
 
 def is_turnstile_enabled() -> bool:
     """Check if Turnstile is properly configured"""
-    return bool(get_turnstile_site_key() and os.environ.get('TURNSTILE_SECRET_KEY'))
\ No newline at end of file
+    return bool(get_turnstile_site_key() and settings.TURNSTILE_SECRET_KEY)
+
+
+class TurnstileFormMixin(forms.Form):
+    """Adds the hidden Turnstile field; call clean_turnstile() from clean(). Expects self.request."""
+
+    cf_turnstile_response = forms.CharField(widget=forms.HiddenInput(), required=False)
+
+    def clean_turnstile(self):
+        if not is_turnstile_enabled():
+            return
+        turnstile_response = self.cleaned_data.get('cf_turnstile_response')
+        if not turnstile_response:
+            raise forms.ValidationError('Please complete the CAPTCHA verification.')
+        request = getattr(self, 'request', None)
+        remote_ip = get_client_ip(request) if request else None
+        session = getattr(request, 'session', None)
+        session_key = session.session_key if session is not None else None
+        if not verify_turnstile(turnstile_response, remote_ip, session_key):
+            raise forms.ValidationError('CAPTCHA verification failed. Please try again.')
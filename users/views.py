@@ -3,11 +3,10 @@ from django.contrib.auth import login, logout, get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
-from django.core.mail import send_mail
-from django.conf import settings
 from django.urls import reverse
 from .forms import CustomUserCreationForm, CustomAuthenticationForm
 from .turnstile import get_turnstile_site_key, is_turnstile_enabled
+from quick_catch.emails import queue_email
 import sesame.utils
 import os
 
@@ -35,6 +34,7 @@ def login_view(request):
     if request.method == 'POST':
         # Check if this is a magic link request
         if 'magic_link' in request.POST:
+            form = CustomAuthenticationForm(request)
             email = request.POST.get('email')
             if email:
                 try:
@@ -45,13 +45,12 @@ def login_view(request):
                         reverse('magic_login', kwargs={'token': token})
                     )
                     
-                    # Send email with magic link
-                    send_mail(
+                    # Queue the magic link in the outbox; send_queued_emails delivers it
+                    queue_email(
+                        user,
                         'Your Magic Login Link',
                         f'Click this link to log in: {magic_link}',
-                        settings.DEFAULT_FROM_EMAIL,
-                        [email],
-                        fail_silently=False,
+                        kind='auth',
                     )
                     messages.success(request, 'Magic link sent to your email!')
                 except User.DoesNotExist: